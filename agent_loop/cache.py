@@ -0,0 +1,83 @@
+"""
+Small persistent key/value cache with optional TTLs, shared by the tools that
+talk to remote services (HTTP responses, Jira, search results, cloud CLIs).
+
+Each cache is a SQLite database under the agent-loop cache directory holding
+JSON values. Entries past their expiry are invisible to get() but still
+available to get_entry(), so HTTP responses can be revalidated with
+ETag/Last-Modified instead of being downloaded again.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from agent_loop.utils import get_cache_dir
+
+MAX_ENTRIES = 5000
+
+
+class DiskCache:
+    def __init__(self, name: str, max_entries: int = MAX_ENTRIES):
+        self.path = os.path.join(get_cache_dir(), f"{name}.sqlite")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, stored REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """(value, expires) for `key` whether or not it has expired, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get(self, key: str) -> Optional[Any]:
+        """The value for `key` if present and not expired, else None."""
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serialisable value; ttl=None keeps it until evicted."""
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                # Drop the oldest tenth in one go rather than one row per insert
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY stored LIMIT ?)",
+                    (count - self.max_entries + self.max_entries // 10,),
+                )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
@@ -0,0 +1,148 @@
+"""
+Result cache and fan-out for the read-only cloud CLI tools (aws_cli, azure_cli).
+
+The CLIs are slow to start and the same read-only commands are repeated
+constantly, so successful runs are kept in a DiskCache keyed on the normalised
+arguments (option order does not matter) and on the environment variables
+that select the account, profile or region. Only commands that passed the
+tool's read-only check reach this module. Commands that hand out credentials
+(`sts get-session-token`, `ecr get-login-password`, `eks get-token`,
+`az account get-access-token`, `az aks get-credentials`, ...) always run and
+are never written to disk.
+
+`fan_out` runs one command once per region or subscription, a few at a time,
+and merges the outputs into a single JSON document keyed by target.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Sequence
+
+from agent_loop.cache import DiskCache
+from agent_loop.projection import compact_json
+from agent_loop.subprocess_runner import MAX_OUTPUT_BYTES, run_command
+
+MAX_PARALLEL = 8
+MAX_TARGETS = 32
+
+# Subcommand words of operations whose output is a secret or has side effects
+_CREDENTIAL_OPERATION = re.compile(r"token|password|credential|secret|login", re.I)
+
+_caches: Dict[str, DiskCache] = {}
+
+
+def _get_cache(name: str) -> DiskCache:
+    if name not in _caches:
+        _caches[name] = DiskCache(name)
+    return _caches[name]
+
+
+def normalize_args(args: Sequence[str]) -> List:
+    """Positional arguments in order, then each option with its values, sorted."""
+    positional: List[str] = []
+    options: List[List[str]] = []
+    for arg in args:
+        if arg.startswith("-"):
+            options.append([arg])
+        elif options:
+            options[-1].append(arg)
+        else:
+            positional.append(arg)
+    return positional + sorted(options)
+
+
+def is_credential_operation(argv: Sequence[str]) -> bool:
+    """Whether the subcommand (the words before the first option) issues credentials."""
+    for arg in argv[1:]:
+        if arg.startswith("-"):
+            return False
+        if _CREDENTIAL_OPERATION.search(arg):
+            return True
+    return False
+
+
+def cache_key(argv: Sequence[str], env_keys: Sequence[str]) -> str:
+    identity = {key: os.environ.get(key) for key in env_keys}
+    payload = [argv[0], normalize_args(argv[1:]), identity]
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def run_cached(
+    cache_name: str,
+    argv: Sequence[str],
+    timeout: float,
+    ttl: float,
+    fresh: bool = False,
+    env_keys: Sequence[str] = (),
+    max_output: int = MAX_OUTPUT_BYTES,
+) -> Dict:
+    """
+    run_command result for argv, served from the cache when an identical
+    command succeeded less than `ttl` seconds ago. Adds "cached": bool.
+    Failed and timed-out runs, and credential operations, are never cached.
+    """
+    if is_credential_operation(argv):
+        result = await run_command(argv, timeout, max_output=max_output)
+        return {**result, "cached": False}
+    cache = _get_cache(cache_name)
+    key = cache_key(argv, env_keys)
+    if not fresh:
+        hit = await asyncio.to_thread(cache.get, key)
+        if hit is not None:
+            return {**hit, "cached": True}
+    result = await run_command(argv, timeout, max_output=max_output)
+    if result["exit_code"] == 0 and not result["timed_out"]:
+        await asyncio.to_thread(cache.set, key, result, ttl)
+    return {**result, "cached": False}
+
+
+def _parse(stdout: str):
+    try:
+        return json.loads(stdout)
+    except ValueError:
+        return stdout.strip()
+
+
+async def fan_out(
+    cache_name: str,
+    argv: Sequence[str],
+    flag: str,
+    targets: Sequence[str],
+    timeout: float,
+    ttl: float,
+    fresh: bool = False,
+    env_keys: Sequence[str] = (),
+) -> str:
+    """
+    Run argv with `flag <target>` appended for every target, at most
+    MAX_PARALLEL at a time, and merge the outputs as
+    {"results": {target: output}, "errors": {target: message}, "cached": [...]}.
+    JSON outputs are parsed so the merged document stays valid JSON.
+    """
+    semaphore = asyncio.Semaphore(MAX_PARALLEL)
+
+    async def run_one(target):
+        async with semaphore:
+            return await run_cached(
+                cache_name, [*argv, flag, target], timeout, ttl, fresh, env_keys
+            )
+
+    unique = list(dict.fromkeys(targets))
+    outcomes = await asyncio.gather(*(run_one(target) for target in unique))
+
+    merged: Dict = {"results": {}, "errors": {}, "cached": []}
+    for target, result in zip(unique, outcomes):
+        if result["timed_out"]:
+            merged["errors"][target] = f"timed out after {timeout}s"
+        elif result["exit_code"] != 0:
+            merged["errors"][target] = (
+                result["stderr"].strip() or f"exit code {result['exit_code']}"
+            )
+        else:
+            merged["results"][target] = _parse(result["stdout"])
+        if result["cached"]:
+            merged["cached"].append(target)
+    return compact_json({key: value for key, value in merged.items() if value})
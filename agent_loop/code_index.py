@@ -0,0 +1,359 @@
+"""
+Offline code retrieval engine backing the codebase_search tool.
+
+Source files are chunked at function/class boundaries (see code_structure) and
+indexed in SQLite FTS5, which ranks matches with BM25. The index is stored in
+the agent-loop cache directory, one database per root, and is refreshed
+incrementally on every query by comparing file mtimes and sizes.
+
+An optional local vector component re-ranks the BM25 candidates with hashed
+sub-word/trigram vectors, which helps queries phrased differently from the code.
+Vectors are computed lazily for candidates and persisted next to the chunks.
+"""
+
+import array
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+from agent_loop.code_structure import CLASS_KINDS, extract_definitions, is_indexable
+from agent_loop.utils import get_cache_dir
+from agent_loop.walker import walk
+
+MAX_FILE_BYTES = 1_000_000
+MAX_CHUNK_LINES = 80
+WINDOW_LINES = 40
+SNIPPET_LINES = 12
+VECTOR_DIMS = 256
+HYBRID_CANDIDATES = 50
+VECTOR_WEIGHT = 0.4
+
+STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "are",
+    "code",
+    "does",
+    "for",
+    "how",
+    "in",
+    "is",
+    "of",
+    "or",
+    "the",
+    "to",
+    "what",
+    "where",
+    "which",
+    "with",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    name TEXT,
+    kind TEXT,
+    vector BLOB
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(name, body);
+"""
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def index_terms(text: str) -> List[str]:
+    """
+    Split text into search terms. Identifiers are kept whole (lowercased, without
+    underscores) and also split into their snake_case/camelCase parts.
+    """
+    terms = []
+    for word in _IDENTIFIER.findall(text):
+        terms.append(word.lower().replace("_", ""))
+        parts = _WORD_PART.findall(word)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return [term for term in terms if term]
+
+
+def embed(text: str) -> array.array:
+    """Hashed, L2-normalised bag of terms and character trigrams."""
+    vector = [0.0] * VECTOR_DIMS
+    for term in index_terms(text):
+        features = [term] + [term[i : i + 3] for i in range(len(term) - 2)]
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vector[digest % VECTOR_DIMS] += 1.0 if digest & 0x10000 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array.array("f", (value / norm for value in vector))
+
+
+def chunk_source(path: str, text: str) -> List[Dict]:
+    """
+    Split a file into chunks at definition boundaries.
+    Large classes are split into their members; code between definitions and
+    files without definitions are split into fixed line windows.
+    """
+    lines = text.splitlines()
+    children: Dict = {}
+    for definition in extract_definitions(path, text):
+        if definition["kind"] != "variable":
+            children.setdefault(definition["parent"], []).append(definition)
+
+    units = []
+
+    def expand(parent):
+        for definition in children.get(parent, []):
+            size = definition["end_line"] - definition["line"] + 1
+            members = children.get(definition["qualname"])
+            if definition["kind"] in CLASS_KINDS and size > MAX_CHUNK_LINES and members:
+                header_end = max(definition["line"], members[0]["line"] - 1)
+                units.append((definition["line"], header_end, definition))
+                expand(definition["qualname"])
+            else:
+                units.append((definition["line"], definition["end_line"], definition))
+
+    expand(None)
+    units.sort(key=lambda unit: unit[0])
+
+    chunks = []
+    cursor = 1
+    for start, end, definition in units:
+        if start > cursor:
+            chunks.extend(_windows(lines, cursor, start - 1, None, None))
+        if end >= cursor:
+            chunks.extend(
+                _windows(
+                    lines,
+                    max(start, cursor),
+                    end,
+                    definition["qualname"],
+                    definition["kind"],
+                )
+            )
+        cursor = max(cursor, end + 1)
+    if cursor <= len(lines):
+        chunks.extend(_windows(lines, cursor, len(lines), None, None))
+    return chunks
+
+
+def _windows(lines: List[str], start: int, end: int, name, kind) -> List[Dict]:
+    size = MAX_CHUNK_LINES if name else WINDOW_LINES
+    windows = []
+    for window_start in range(start, end + 1, size):
+        window_end = min(end, window_start + size - 1)
+        body = "\n".join(lines[window_start - 1 : window_end])
+        if body.strip():
+            windows.append(
+                {
+                    "start_line": window_start,
+                    "end_line": window_end,
+                    "name": name,
+                    "kind": kind,
+                    "text": body,
+                }
+            )
+    return windows
+
+
+def index_path_for(root: str) -> str:
+    """Location of the on-disk index for a root directory."""
+    key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_dir("code_index"), f"{key}.sqlite")
+
+
+def open_index(root: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(index_path_for(root))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def iter_source_files(root: str) -> Iterator[Tuple[str, int, int]]:
+    """Yield (relative path, mtime_ns, size) for indexable, non-ignored files under root."""
+    for entry in walk(root):
+        if (
+            entry["type"] == "file"
+            and entry["size"] <= MAX_FILE_BYTES
+            and is_indexable(entry["path"])
+        ):
+            yield entry["path"], entry["mtime_ns"], entry["size"]
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _drop_file(conn: sqlite3.Connection, rel_path: str) -> None:
+    conn.execute(
+        "DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE path = ?)",
+        (rel_path,),
+    )
+    conn.execute("DELETE FROM chunks WHERE path = ?", (rel_path,))
+    conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+
+
+def _index_file(
+    conn: sqlite3.Connection, root: str, rel_path: str, mtime_ns: int, size: int
+) -> None:
+    _drop_file(conn, rel_path)
+    conn.execute(
+        "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+        (rel_path, mtime_ns, size),
+    )
+    try:
+        text = _read_text(os.path.join(root, rel_path))
+    except OSError:
+        return
+    if "\x00" in text[:8192]:
+        return
+    path_terms = " ".join(index_terms(rel_path))
+    for chunk in chunk_source(rel_path, text):
+        cursor = conn.execute(
+            "INSERT INTO chunks (path, start_line, end_line, name, kind) VALUES (?, ?, ?, ?, ?)",
+            (
+                rel_path,
+                chunk["start_line"],
+                chunk["end_line"],
+                chunk["name"],
+                chunk["kind"],
+            ),
+        )
+        name_terms = " ".join(index_terms(chunk["name"] or ""))
+        conn.execute(
+            "INSERT INTO chunks_fts (rowid, name, body) VALUES (?, ?, ?)",
+            (
+                cursor.lastrowid,
+                f"{name_terms} {path_terms}",
+                " ".join(index_terms(chunk["text"])),
+            ),
+        )
+
+
+def refresh_index(conn: sqlite3.Connection, root: str) -> Dict:
+    """Bring the index in line with the files on disk; only changed files are re-read."""
+    known = {
+        path: (mtime_ns, size)
+        for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM files"
+        )
+    }
+    seen = set()
+    updated = 0
+    with conn:
+        for rel_path, mtime_ns, size in iter_source_files(root):
+            seen.add(rel_path)
+            if known.get(rel_path) == (mtime_ns, size):
+                continue
+            _index_file(conn, root, rel_path, mtime_ns, size)
+            updated += 1
+        removed = [path for path in known if path not in seen]
+        for rel_path in removed:
+            _drop_file(conn, rel_path)
+    return {"files": len(seen), "updated": updated, "removed": len(removed)}
+
+
+def _match_expression(query: str) -> str:
+    terms = list(dict.fromkeys(index_terms(query)))
+    meaningful = [term for term in terms if term not in STOPWORDS] or terms
+    return " OR ".join(f'"{term}"' for term in meaningful)
+
+
+def search_codebase(
+    root: str, query: str, limit: int = 10, mode: str = "bm25"
+) -> List[Dict]:
+    """
+    Return the best matching chunks under root as dicts with location, symbol,
+    score and snippet. mode is "bm25" or "hybrid" (BM25 re-ranked by vectors).
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    root = os.path.abspath(root)
+    conn = open_index(root)
+    try:
+        refresh_index(conn, root)
+        candidates = limit if mode != "hybrid" else max(limit * 5, HYBRID_CANDIDATES)
+        rows = conn.execute(
+            """
+            SELECT c.id, c.path, c.start_line, c.end_line, c.name, c.kind, c.vector,
+                   bm25(chunks_fts, 4.0, 1.0) AS rank
+            FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+            WHERE chunks_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (expression, candidates),
+        ).fetchall()
+        texts: Dict[str, List[str]] = {}
+
+        def chunk_lines(rel_path: str, start: int, end: int) -> List[str]:
+            if rel_path not in texts:
+                try:
+                    texts[rel_path] = _read_text(
+                        os.path.join(root, rel_path)
+                    ).splitlines()
+                except OSError:
+                    texts[rel_path] = []
+            return texts[rel_path][start - 1 : end]
+
+        scored = [(-rank, row) for *row, rank in rows]
+        if mode == "hybrid" and scored:
+            scored = _rerank(conn, query, scored, chunk_lines)
+        results = []
+        for score, (_, rel_path, start, end, name, kind, _) in scored[:limit]:
+            lines = chunk_lines(rel_path, start, end)
+            snippet = "\n".join(lines[:SNIPPET_LINES])
+            if len(lines) > SNIPPET_LINES:
+                snippet += "\n..."
+            results.append(
+                {
+                    "location": f"{os.path.relpath(os.path.join(root, rel_path))}:{start}-{end}",
+                    "symbol": name,
+                    "kind": kind,
+                    "score": round(score, 3),
+                    "snippet": snippet,
+                }
+            )
+        return results
+    finally:
+        conn.close()
+
+
+def _rerank(conn, query: str, scored: List, chunk_lines) -> List:
+    query_vector = embed(query)
+    best = max(score for score, _ in scored) or 1.0
+    reranked = []
+    with conn:
+        for score, row in scored:
+            chunk_id, rel_path, start, end, _, _, blob = row
+            if blob:
+                vector = array.array("f")
+                vector.frombytes(blob)
+            else:
+                vector = embed("\n".join(chunk_lines(rel_path, start, end)))
+                conn.execute(
+                    "UPDATE chunks SET vector = ? WHERE id = ?",
+                    (vector.tobytes(), chunk_id),
+                )
+            similarity = max(0.0, sum(a * b for a, b in zip(query_vector, vector)))
+            combined = (1 - VECTOR_WEIGHT) * score / best + VECTOR_WEIGHT * similarity
+            reranked.append((combined, row))
+    reranked.sort(key=lambda item: item[0], reverse=True)
+    return reranked
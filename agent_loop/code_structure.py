@@ -0,0 +1,769 @@
+"""
+Lightweight structural parsing of source files.
+Python is parsed with `ast`; other common languages use line-based patterns
+plus brace/indentation matching to find where each definition ends.
+Definitions are plain dicts so they can be stored or returned to the model as-is.
+Outlines add signatures and docstring first lines and are cached by content hash.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from agent_loop.utils import get_cache_dir
+
+# Bump when the outline format changes so stale cache entries are ignored
+OUTLINE_VERSION = 1
+MAX_CACHED_OUTLINES = 256
+MAX_SIGNATURE_CHARS = 160
+MAX_DOC_CHARS = 120
+
+LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".pyi": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".kts": "kotlin",
+    ".scala": "scala",
+    ".cs": "csharp",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".cxx": "cpp",
+    ".hpp": "cpp",
+    ".rb": "ruby",
+    ".php": "php",
+    ".swift": "swift",
+    ".sh": "shell",
+    ".bash": "shell",
+    ".zsh": "shell",
+}
+
+# Files that carry no definitions but are still worth searching as text
+TEXT_EXTENSIONS = {
+    ".md",
+    ".rst",
+    ".txt",
+    ".toml",
+    ".yaml",
+    ".yml",
+    ".json",
+    ".ini",
+    ".cfg",
+    ".sql",
+    ".html",
+    ".css",
+    ".scss",
+    ".vue",
+    ".svelte",
+    ".tf",
+    ".proto",
+    ".graphql",
+    ".dockerfile",
+}
+
+CLASS_KINDS = {"class", "interface", "struct", "enum", "trait", "module", "impl"}
+
+_MODIFIERS = (
+    r"(?:(?:public|private|protected|internal|static|final|abstract|override|"
+    r"virtual|async|synchronized|sealed|partial|open|data|suspend|inline|export|"
+    r"default|readonly|unsafe|extern|const)\s+)*"
+)
+
+# (regex, kind) pairs; group "name" holds the symbol name
+_PATTERNS = {
+    "javascript": [
+        (
+            r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[A-Za-z_$][\w$]*)",
+            "function",
+        ),
+        (
+            r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>[A-Za-z_$][\w$]*)",
+            "class",
+        ),
+        (
+            r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)",
+            "function",
+        ),
+        (
+            r"^\s+(?:(?:static|async|public|private|protected|readonly|get|set)\s+)*(?P<name>[A-Za-z_$][\w$]*)\s*\([^)]*\)\s*(?::\s*[^{]+)?\{\s*$",
+            "method",
+        ),
+    ],
+    "typescript": [
+        (
+            r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+(?P<name>[A-Za-z_$][\w$]*)",
+            "interface",
+        ),
+        (
+            r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+(?P<name>[A-Za-z_$][\w$]*)",
+            "enum",
+        ),
+        (
+            r"^\s*(?:export\s+)?(?:declare\s+)?type\s+(?P<name>[A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*=",
+            "type",
+        ),
+    ],
+    "go": [
+        (r"^func\s+\([^)]*\)\s*(?P<name>[A-Za-z_]\w*)", "method"),
+        (r"^func\s+(?P<name>[A-Za-z_]\w*)", "function"),
+        (r"^type\s+(?P<name>[A-Za-z_]\w*)\s+struct\b", "struct"),
+        (r"^type\s+(?P<name>[A-Za-z_]\w*)\s+interface\b", "interface"),
+        (r"^type\s+(?P<name>[A-Za-z_]\w*)\b", "type"),
+    ],
+    "rust": [
+        (
+            r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?fn\s+(?P<name>\w+)",
+            "function",
+        ),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?struct\s+(?P<name>\w+)", "struct"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?enum\s+(?P<name>\w+)", "enum"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:unsafe\s+)?trait\s+(?P<name>\w+)", "trait"),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(?P<name>\w+)\s*\{", "module"),
+        (
+            r"^\s*(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:<>, ]+\s+for\s+)?(?P<name>\w+)",
+            "impl",
+        ),
+        (r"^\s*(?:pub(?:\([^)]*\))?\s+)?type\s+(?P<name>\w+)", "type"),
+    ],
+    "java": [
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"(?P<kind>class|interface|enum|record)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"(?:<[^>]+>\s+)?[\w<>\[\],.?]+\s+(?P<name>\w+)\s*\([^;]*$",
+            "method",
+        ),
+    ],
+    "kotlin": [
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"(?:enum\s+|data\s+|sealed\s+)?(?P<kind>class|interface|object)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?(?P<name>\w+)\s*\(",
+            "function",
+        ),
+    ],
+    "scala": [
+        (
+            r"^\s*(?:(?:case|abstract|sealed|final|private|protected|implicit)\s+)*(?P<kind>class|trait|object)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*(?:(?:override|private|protected|final|implicit)\s+)*def\s+(?P<name>\w+)",
+            "function",
+        ),
+    ],
+    "csharp": [
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"(?P<kind>class|interface|enum|struct|record)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*"
+            + _MODIFIERS
+            + r"(?:<[^>]+>\s+)?[\w<>\[\],.?]+\s+(?P<name>\w+)\s*\([^;]*$",
+            "method",
+        ),
+    ],
+    "c": [
+        (
+            r"^\s*(?:typedef\s+)?(?P<kind>struct|union|enum)\s+(?P<name>\w+)\s*\{?\s*$",
+            None,
+        ),
+        (
+            r"^(?!\s)(?!(?:return|else|if|for|while|switch|do)\b)[\w\s\*&]*?\b(?P<name>[A-Za-z_]\w*)\s*\([^;]*$",
+            "function",
+        ),
+    ],
+    "cpp": [
+        (
+            r"^\s*(?:template\s*<[^>]*>\s*)?(?:typedef\s+)?(?P<kind>class|struct|union|enum(?:\s+class)?)\s+(?P<name>\w+)[^;]*$",
+            None,
+        ),
+        (r"^\s*namespace\s+(?P<name>\w+)", "module"),
+        (
+            r"^(?!\s)(?!(?:return|else|if|for|while|switch|do)\b)[\w\s\*&:<>,~]*?\b(?P<name>[A-Za-z_~][\w:~]*)\s*\([^;]*$",
+            "function",
+        ),
+    ],
+    "ruby": [
+        (r"^\s*(?P<kind>class|module)\s+(?P<name>[\w:]+)", None),
+        (r"^\s*def\s+(?:self\.)?(?P<name>[\w?!=\[\]]+)", "function"),
+    ],
+    "php": [
+        (
+            r"^\s*(?:(?:abstract|final)\s+)?(?P<kind>class|interface|trait|enum)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?(?P<name>\w+)",
+            "function",
+        ),
+    ],
+    "swift": [
+        (
+            r"^\s*(?:(?:public|private|fileprivate|internal|open|final)\s+)*(?P<kind>class|struct|enum|protocol|extension|actor)\s+(?P<name>\w+)",
+            None,
+        ),
+        (
+            r"^\s*(?:(?:public|private|fileprivate|internal|open|final|static|class|override|mutating)\s+)*func\s+(?P<name>\w+)",
+            "function",
+        ),
+    ],
+    "shell": [
+        (r"^\s*function\s+(?P<name>[\w:.-]+)", "function"),
+        (r"^\s*(?P<name>[\w:.-]+)\s*\(\)\s*\{?", "function"),
+    ],
+}
+# TypeScript is JavaScript plus type-level declarations
+_PATTERNS["typescript"] = _PATTERNS["typescript"] + _PATTERNS["javascript"]
+
+_COMPILED = {
+    lang: [(re.compile(pattern), kind) for pattern, kind in patterns]
+    for lang, patterns in _PATTERNS.items()
+}
+
+_KEYWORDS = {
+    "if",
+    "for",
+    "while",
+    "switch",
+    "catch",
+    "return",
+    "function",
+    "else",
+    "do",
+    "try",
+    "new",
+    "sizeof",
+    "defined",
+}
+
+_KIND_ALIASES = {
+    "protocol": "interface",
+    "object": "class",
+    "record": "class",
+    "actor": "class",
+    "extension": "impl",
+    "union": "struct",
+    "enum class": "enum",
+}
+
+_STRING_LITERALS = r"\"(?:[^\"\\\n]|\\.)*\"|'(?:[^'\\\n]|\\.)*'|`[^`\n]*`"
+_HASH_COMMENT_NOISE = re.compile(_STRING_LITERALS + r"|#.*")
+_SLASH_COMMENT_NOISE = re.compile(_STRING_LITERALS + r"|//.*|/\*.*?\*/")
+_HASH_COMMENT_LANGUAGES = {"python", "ruby", "shell"}
+
+_REFERENCE_TOKEN = re.compile(r"[A-Za-z_$][\w$]*")
+
+# Words that are never worth reporting as symbol references
+REFERENCE_STOPWORDS = {
+    "and",
+    "as",
+    "async",
+    "await",
+    "break",
+    "case",
+    "catch",
+    "class",
+    "const",
+    "continue",
+    "def",
+    "default",
+    "defer",
+    "del",
+    "do",
+    "elif",
+    "else",
+    "end",
+    "enum",
+    "except",
+    "export",
+    "extends",
+    "false",
+    "False",
+    "finally",
+    "fn",
+    "for",
+    "from",
+    "func",
+    "function",
+    "go",
+    "if",
+    "impl",
+    "import",
+    "in",
+    "interface",
+    "is",
+    "let",
+    "match",
+    "mut",
+    "new",
+    "nil",
+    "None",
+    "not",
+    "null",
+    "or",
+    "package",
+    "pass",
+    "private",
+    "protected",
+    "pub",
+    "public",
+    "raise",
+    "return",
+    "self",
+    "static",
+    "struct",
+    "super",
+    "switch",
+    "this",
+    "throw",
+    "true",
+    "True",
+    "try",
+    "type",
+    "use",
+    "var",
+    "void",
+    "while",
+    "with",
+    "yield",
+}
+
+
+def detect_language(path: str) -> Optional[str]:
+    """Return the language name for a path based on its extension, or None."""
+    name = os.path.basename(path)
+    if name == "Dockerfile":
+        return None
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(name)[1].lower())
+
+
+def is_indexable(path: str) -> bool:
+    """Whether a file is worth parsing or indexing as source/text."""
+    ext = os.path.splitext(path)[1].lower()
+    return ext in LANGUAGE_BY_EXTENSION or ext in TEXT_EXTENSIONS
+
+
+def extract_definitions(path: str, text: str) -> List[Dict]:
+    """
+    Return the definitions found in a source file, ordered by line.
+    Each dict has name, qualname, kind, line, end_line (1-based, inclusive) and parent.
+    """
+    language = detect_language(path)
+    if language == "python":
+        try:
+            return _python_definitions(ast.parse(text))
+        except (SyntaxError, ValueError):
+            return _indent_block_definitions(text.splitlines(), _PYTHON_FALLBACK)
+    if language in _COMPILED:
+        return _pattern_definitions(text.splitlines(), language)
+    return []
+
+
+def extract_outline(path: str, text: str) -> List[Dict]:
+    """
+    Definitions as returned by extract_definitions, plus a one-line `signature`
+    and the first line of the docstring (or leading comment) as `doc`.
+    """
+    if detect_language(path) == "python":
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            tree = None
+        if tree is not None:
+            nodes = _python_outline_nodes(tree)
+            outline = []
+            for definition in _python_definitions(tree):
+                node = nodes.get((definition["qualname"], definition["line"]))
+                outline.append(
+                    {
+                        **definition,
+                        "signature": _python_signature(node, definition),
+                        "doc": _python_doc(node),
+                    }
+                )
+            return outline
+    lines = text.splitlines()
+    return [
+        {
+            **definition,
+            "signature": _line_signature(lines[definition["line"] - 1]),
+            "doc": _leading_comment(lines, definition["line"] - 1),
+        }
+        for definition in extract_definitions(path, text)
+    ]
+
+
+# (abspath, size, mtime_ns) -> outline
+_outline_cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+
+
+def outline_file(path: str) -> List[Dict]:
+    """
+    Outline a file, cached in memory by (path, size, mtime) and on disk by
+    content hash, so unchanged files are never parsed twice.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key in _outline_cache:
+        _outline_cache.move_to_end(key)
+        return _outline_cache[key]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    cache_dir = get_cache_dir("outlines", f"v{OUTLINE_VERSION}", digest[:2])
+    # The extension decides the parser, so it is part of the cache key
+    ext = os.path.splitext(path)[1].lower().lstrip(".") or "none"
+    cache_path = os.path.join(cache_dir, f"{digest}.{ext}.json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            outline = json.load(f)
+    except (OSError, ValueError):
+        outline = extract_outline(path, data.decode("utf-8", errors="replace"))
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(outline, f)
+        except OSError:
+            pass
+
+    _outline_cache[key] = outline
+    if len(_outline_cache) > MAX_CACHED_OUTLINES:
+        _outline_cache.popitem(last=False)
+    return outline
+
+
+def extract_references(path: str, text: str) -> List[Dict]:
+    """
+    Return identifier occurrences in a source file as dicts with name, line and
+    col (both 1-based). Python uses the AST; other languages use a tokenizer
+    that blanks out strings and comments first so columns stay accurate.
+    """
+    language = detect_language(path)
+    if language is None:
+        return []
+    if language == "python":
+        try:
+            return _python_references(ast.parse(text))
+        except (SyntaxError, ValueError):
+            pass
+    noise = (
+        _HASH_COMMENT_NOISE
+        if language in _HASH_COMMENT_LANGUAGES
+        else _SLASH_COMMENT_NOISE
+    )
+    references = []
+    for number, line in enumerate(text.splitlines(), 1):
+        code = noise.sub(lambda match: " " * len(match.group(0)), line)
+        for token in _REFERENCE_TOKEN.finditer(code):
+            name = token.group(0)
+            if len(name) > 1 and name not in REFERENCE_STOPWORDS:
+                references.append(
+                    {"name": name, "line": number, "col": token.start() + 1}
+                )
+    return references
+
+
+# --- Python -------------------------------------------------------------------
+
+
+def _python_definitions(tree: ast.AST) -> List[Dict]:
+    definitions = []
+
+    def visit(node, parent: Optional[str], in_class: bool):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+            elif isinstance(child, ast.ClassDef):
+                kind = "class"
+            else:
+                if parent is None and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                    definitions.extend(_python_assignments(child))
+                continue
+            qualname = f"{parent}.{child.name}" if parent else child.name
+            start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+            definitions.append(
+                {
+                    "name": child.name,
+                    "qualname": qualname,
+                    "kind": kind,
+                    "line": start,
+                    "end_line": child.end_lineno or child.lineno,
+                    "parent": parent,
+                }
+            )
+            visit(child, qualname, kind == "class")
+
+    visit(tree, None, False)
+    definitions.sort(key=lambda d: (d["line"], d["end_line"]))
+    return definitions
+
+
+def _python_assignments(node) -> List[Dict]:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    found = []
+    for target in targets:
+        for name_node in ast.walk(target):
+            if isinstance(name_node, ast.Name):
+                found.append(
+                    {
+                        "name": name_node.id,
+                        "qualname": name_node.id,
+                        "kind": "variable",
+                        "line": node.lineno,
+                        "end_line": node.end_lineno or node.lineno,
+                        "parent": None,
+                    }
+                )
+    return found
+
+
+def _python_references(tree: ast.AST) -> List[Dict]:
+    references = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            references.append(
+                {"name": node.id, "line": node.lineno, "col": node.col_offset + 1}
+            )
+        elif isinstance(node, ast.Attribute) and node.end_lineno is not None:
+            references.append(
+                {
+                    "name": node.attr,
+                    "line": node.end_lineno,
+                    "col": node.end_col_offset - len(node.attr) + 1,
+                }
+            )
+        elif isinstance(node, ast.alias):
+            for part in node.name.split("."):
+                references.append(
+                    {"name": part, "line": node.lineno, "col": node.col_offset + 1}
+                )
+    references.sort(key=lambda ref: (ref["line"], ref["col"]))
+    return references
+
+
+def _python_outline_nodes(tree: ast.AST) -> Dict[tuple, ast.AST]:
+    """Map (qualname, first line) to the def/class/assignment node, mirroring _python_definitions."""
+    nodes = {}
+
+    def visit(node, parent: Optional[str]):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = f"{parent}.{child.name}" if parent else child.name
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                nodes[(qualname, start)] = child
+                visit(child, qualname)
+            elif parent is None and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                for definition in _python_assignments(child):
+                    nodes[(definition["qualname"], definition["line"])] = child
+
+    visit(tree, None)
+    return nodes
+
+
+def _python_signature(node, definition: Dict) -> str:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+        if node.returns is not None:
+            signature += f" -> {ast.unparse(node.returns)}"
+    elif isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(b) for b in node.bases + node.keywords]
+        signature = (
+            f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+        )
+    elif isinstance(node, ast.AnnAssign):
+        signature = f"{definition['name']}: {ast.unparse(node.annotation)}"
+    else:
+        signature = definition["name"]
+    return _shorten(signature, MAX_SIGNATURE_CHARS)
+
+
+def _python_doc(node) -> Optional[str]:
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return None
+    docstring = ast.get_docstring(node)
+    if not docstring:
+        return None
+    return _shorten(docstring.strip().splitlines()[0], MAX_DOC_CHARS)
+
+
+_PYTHON_FALLBACK = [
+    (re.compile(r"^\s*(?:async\s+)?def\s+(?P<name>\w+)"), "function"),
+    (re.compile(r"^\s*class\s+(?P<name>\w+)"), "class"),
+]
+
+
+# --- Pattern-based languages ----------------------------------------------------
+
+
+def _match_line(line: str, patterns) -> Optional[tuple]:
+    for regex, kind in patterns:
+        match = regex.match(line)
+        if not match:
+            continue
+        name = match.group("name")
+        if name in _KEYWORDS:
+            continue
+        if kind is None:
+            kind = match.group("kind")
+        return name, _KIND_ALIASES.get(kind, kind)
+    return None
+
+
+def _pattern_definitions(lines: List[str], language: str) -> List[Dict]:
+    if language == "ruby":
+        return _indent_block_definitions(lines, _COMPILED["ruby"], closer="end")
+    patterns = _COMPILED[language]
+    found = []
+    for index, line in enumerate(lines):
+        matched = _match_line(line, patterns)
+        if matched:
+            name, kind = matched
+            end = _brace_block_end(lines, index)
+            found.append(
+                {"name": name, "kind": kind, "line": index + 1, "end_line": end}
+            )
+    return _nest(found)
+
+
+def _brace_block_end(lines: List[str], start: int, lookahead: int = 3) -> int:
+    """Return the 1-based last line of the brace block opened at or just after start."""
+    depth = 0
+    opened = False
+    for index in range(start, len(lines)):
+        if not opened and index - start > lookahead:
+            return start + 1
+        code = _SLASH_COMMENT_NOISE.sub("", lines[index])
+        for char in code:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+                if opened and depth <= 0:
+                    return index + 1
+        if not opened and code.rstrip().endswith(";"):
+            return start + 1
+    return len(lines) if opened else start + 1
+
+
+def _indent_block_definitions(
+    lines: List[str], patterns, closer: Optional[str] = None
+) -> List[Dict]:
+    """Definitions whose extent is given by indentation (Python fallback, Ruby `end`)."""
+    found = []
+    for index, line in enumerate(lines):
+        matched = _match_line(line, patterns)
+        if not matched:
+            continue
+        name, kind = matched
+        indent = len(line) - len(line.lstrip())
+        end = index + 1
+        for probe in range(index + 1, len(lines)):
+            current = lines[probe]
+            if not current.strip():
+                continue
+            current_indent = len(current) - len(current.lstrip())
+            if current_indent <= indent:
+                if closer and current.strip().startswith(closer):
+                    end = probe + 1
+                break
+            end = probe + 1
+        found.append({"name": name, "kind": kind, "line": index + 1, "end_line": end})
+    return _nest(found)
+
+
+_COMMENT_LINE = re.compile(r"^\s*(?://+!?|#+|/\*+|\*+/?|--)\s?(.*?)\s*(?:\*/)?$")
+
+
+def _line_signature(line: str) -> str:
+    return _shorten(line.strip().rstrip("{").rstrip(), MAX_SIGNATURE_CHARS)
+
+
+def _leading_comment(lines: List[str], index: int) -> Optional[str]:
+    """First line of the comment block directly above lines[index], if any."""
+    probe = index - 1
+    # Skip attributes/annotations/decorators between the comment and the definition
+    while probe >= 0 and lines[probe].lstrip().startswith(("@", "#[")):
+        probe -= 1
+    text = None
+    while probe >= 0:
+        match = _COMMENT_LINE.match(lines[probe])
+        if not match or lines[probe].lstrip().startswith("#["):
+            break
+        if match.group(1).strip("*/ "):
+            text = match.group(1).strip("*/ ")
+        probe -= 1
+    return _shorten(text, MAX_DOC_CHARS) if text else None
+
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _nest(found: List[Dict]) -> List[Dict]:
+    """Attach parent/qualname by line-range containment and tag class members as methods."""
+    stack: List[Dict] = []
+    for definition in found:
+        while stack and stack[-1]["end_line"] < definition["line"]:
+            stack.pop()
+        parent = stack[-1] if stack else None
+        if parent and definition["end_line"] > parent["end_line"]:
+            definition["end_line"] = parent["end_line"]
+        definition["parent"] = parent["qualname"] if parent else None
+        definition["qualname"] = (
+            f"{parent['qualname']}.{definition['name']}"
+            if parent
+            else definition["name"]
+        )
+        if (
+            parent
+            and parent["kind"] in CLASS_KINDS
+            and definition["kind"] == "function"
+        ):
+            definition["kind"] = "method"
+        if (
+            definition["end_line"] > definition["line"]
+            or definition["kind"] in CLASS_KINDS
+        ):
+            stack.append(definition)
+    return [
+        {
+            "name": d["name"],
+            "qualname": d["qualname"],
+            "kind": d["kind"],
+            "line": d["line"],
+            "end_line": d["end_line"],
+            "parent": d["parent"],
+        }
+        for d in found
+    ]
@@ -0,0 +1,322 @@
+"""
+Local mirror and full-text index of Confluence spaces, used by the confluence
+tool's sync mode and by the confluence_search tool.
+
+A sync lists every page of a space with only its version metadata, then
+downloads bodies for the pages whose version number or last-modified time
+differ from the mirror, and drops pages that no longer exist. Storage-format
+HTML is converted to compact text (headings, list items, table rows and code
+blocks kept; markup and macro parameters dropped) and indexed in SQLite FTS5,
+so searches are answered locally with BM25 ranking.
+
+The REST calls go through a `get_json(endpoint, params)` callable, which keeps
+this module independent of credentials and lets it run against a stand-in server.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from agent_loop.utils import get_cache_dir
+
+PAGE_LIMIT = 100
+MAX_PARALLEL_FETCHES = 6
+SNIPPET_TOKENS = 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    space TEXT NOT NULL,
+    title TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    modified TEXT,
+    url TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_space ON pages(space);
+CREATE TABLE IF NOT EXISTS spaces (
+    key TEXT PRIMARY KEY,
+    synced REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    title, body, tokenize = 'porter unicode61'
+);
+"""
+
+_BLOCK_TAGS = {
+    "p",
+    "div",
+    "br",
+    "tr",
+    "table",
+    "ul",
+    "ol",
+    "pre",
+    "blockquote",
+    "section",
+    "hr",
+    "ac:structured-macro",
+    "ac:task",
+}
+_SKIP_TAGS = {"ac:parameter", "style", "script", "ri:attachment"}
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class _StorageText(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def _newline(self):
+        if self.parts and not self.parts[-1].endswith("\n"):
+            self.parts.append("\n")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif re.fullmatch(r"h[1-6]", tag):
+            self._newline()
+            self.parts.append("#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self._newline()
+            self.parts.append("- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+        elif tag == "ri:page":
+            title = dict(attrs).get("ri:content-title")
+            if title:
+                self.parts.append(f"[{title}]")
+        elif tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif re.fullmatch(r"h[1-6]", tag) or tag == "li" or tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+    def unknown_decl(self, data):
+        # Code macros keep their body in CDATA sections
+        if data.startswith("CDATA[") and not self._skip:
+            self._newline()
+            # HTMLParser passes the section without its closing "]]>"
+            self.parts.append(data[len("CDATA[") :])
+            self._newline()
+
+
+def storage_to_text(html: str) -> str:
+    """Compact plain text for a Confluence storage-format (XHTML) body."""
+    parser = _StorageText()
+    parser.feed(html or "")
+    parser.close()
+    lines = (line.strip() for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line and line != "|")
+
+
+def mirror_path_for(base_url: str) -> str:
+    """Location of the on-disk mirror for a Confluence site."""
+    key = hashlib.sha1(base_url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_dir("confluence"), f"{key}.sqlite")
+
+
+def open_mirror(base_url: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(mirror_path_for(base_url), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _list_pages(get_json: Callable, space: str) -> Iterator[Dict]:
+    start = 0
+    while True:
+        data = get_json(
+            "/wiki/rest/api/content",
+            {
+                "spaceKey": space,
+                "type": "page",
+                "status": "current",
+                "expand": "version",
+                "start": start,
+                "limit": PAGE_LIMIT,
+            },
+        )
+        results = data.get("results", [])
+        yield from results
+        if not results or "next" not in data.get("_links", {}):
+            return
+        start += len(results)
+
+
+def _fetch_page(get_json: Callable, page_id: str) -> Dict:
+    return get_json(
+        f"/wiki/rest/api/content/{page_id}",
+        {"expand": "body.storage,version,space"},
+    )
+
+
+def _store_page(conn: sqlite3.Connection, space: str, page: Dict) -> None:
+    version = page.get("version", {})
+    text = storage_to_text(page.get("body", {}).get("storage", {}).get("value", ""))
+    _drop_page(conn, page["id"])
+    cursor = conn.execute(
+        "INSERT INTO pages (id, space, title, version, modified, url, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            page["id"],
+            space,
+            page.get("title", ""),
+            version.get("number", 0),
+            version.get("when"),
+            page.get("_links", {}).get("webui"),
+            text,
+        ),
+    )
+    conn.execute(
+        "INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)",
+        (cursor.lastrowid, page.get("title", ""), text),
+    )
+
+
+def _drop_page(conn: sqlite3.Connection, page_id: str) -> None:
+    conn.execute(
+        "DELETE FROM pages_fts WHERE rowid IN (SELECT rowid FROM pages WHERE id = ?)",
+        (page_id,),
+    )
+    conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
+
+def sync_space(
+    conn: sqlite3.Connection, get_json: Callable, space: str, full: bool = False
+) -> Dict:
+    """
+    Bring the mirror of one space up to date. Only pages whose version or
+    last-modified time changed are downloaded; `full` re-downloads everything.
+    Each page is stored as soon as it arrives, and a page that fails to
+    download keeps its old copy (so the next sync retries it).
+    Returns {"space", "pages", "updated", "removed", "seconds"}, plus
+    "failed": {page_id: error} when some pages could not be fetched.
+    """
+    started = time.monotonic()
+    known = {
+        page_id: (version, modified)
+        for page_id, version, modified in conn.execute(
+            "SELECT id, version, modified FROM pages WHERE space = ?", (space,)
+        )
+    }
+    listed = {}
+    for page in _list_pages(get_json, space):
+        version = page.get("version", {})
+        listed[page["id"]] = (version.get("number", 0), version.get("when"))
+    changed = [
+        page_id
+        for page_id, state in listed.items()
+        if full or known.get(page_id) != state
+    ]
+    removed = [page_id for page_id in known if page_id not in listed]
+
+    updated = 0
+    failed = {}
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_FETCHES) as executor:
+        futures = {
+            executor.submit(_fetch_page, get_json, page_id): page_id
+            for page_id in changed
+        }
+        for future in as_completed(futures):
+            try:
+                page = future.result()
+            except Exception as e:
+                failed[futures[future]] = str(e)
+                continue
+            with conn:
+                _store_page(conn, space, page)
+            updated += 1
+    with conn:
+        for page_id in removed:
+            _drop_page(conn, page_id)
+        conn.execute(
+            "INSERT OR REPLACE INTO spaces (key, synced) VALUES (?, ?)",
+            (space, time.time()),
+        )
+    result = {
+        "space": space,
+        "pages": len(listed),
+        "updated": updated,
+        "removed": len(removed),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    if failed:
+        result["failed"] = failed
+    return result
+
+
+def synced_spaces(conn: sqlite3.Connection) -> Dict[str, float]:
+    """Space key -> time of its last sync."""
+    return dict(conn.execute("SELECT key, synced FROM spaces ORDER BY key"))
+
+
+def _match_expression(query: str) -> str:
+    terms = list(dict.fromkeys(word.lower() for word in _WORD.findall(query)))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def search_mirror(
+    conn: sqlite3.Connection,
+    query: str,
+    spaces: Optional[Iterable[str]] = None,
+    limit: int = 10,
+) -> List[Dict]:
+    """Best matching mirrored pages with a highlighted snippet, title matches weighted up."""
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    sql = """
+        SELECT p.id, p.space, p.title, p.modified, p.url,
+               snippet(pages_fts, 1, '[', ']', ' ... ', ?) AS snippet,
+               bm25(pages_fts, 5.0, 1.0) AS rank
+        FROM pages_fts JOIN pages p ON p.rowid = pages_fts.rowid
+        WHERE pages_fts MATCH ?
+    """
+    args: List = [SNIPPET_TOKENS, expression]
+    spaces = list(spaces or [])
+    if spaces:
+        sql += f" AND p.space IN ({', '.join('?' for _ in spaces)})"
+        args.extend(spaces)
+    sql += " ORDER BY rank LIMIT ?"
+    args.append(limit)
+    return [
+        {
+            "id": page_id,
+            "space": space,
+            "title": title,
+            "modified": modified,
+            "url": url,
+            "score": round(-rank, 3),
+            "snippet": snippet,
+        }
+        for page_id, space, title, modified, url, snippet, rank in conn.execute(
+            sql, args
+        )
+    ]
+
+
+def get_page(conn: sqlite3.Connection, page_id: str) -> Optional[Dict]:
+    """A mirrored page with its full text, or None."""
+    row = conn.execute(
+        "SELECT id, space, title, version, modified, url, text FROM pages WHERE id = ?",
+        (page_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    keys = ("id", "space", "title", "version", "modified", "url", "text")
+    return dict(zip(keys, row))
@@ -0,0 +1,180 @@
+"""
+Streaming column reader for local CSV, TSV and JSON-lines files.
+
+The file is memory-mapped and scanned line by line, keeping only the requested
+columns of the rows that pass the filters, so a large metrics file can be
+charted without being loaded whole or passed through the model. Values are
+returned as raw strings (CSV/TSV) or JSON scalars; `to_numbers` and
+`to_timestamps` convert a column when it is needed numerically.
+"""
+
+import csv
+import json
+import mmap
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+MAX_ROWS = 5_000_000
+
+_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".tab": "tsv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+_OPERATORS = ("==", "!=", ">", ">=", "<", "<=", "contains")
+
+
+class DataFileError(ValueError):
+    pass
+
+
+def detect_format(path: str) -> str:
+    fmt = _FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise DataFileError(
+            f"Cannot tell the format of {path}; pass format csv, tsv or jsonl"
+        )
+    return fmt
+
+
+def _lines(mapped: mmap.mmap) -> Iterator[str]:
+    for line in iter(mapped.readline, b""):
+        yield line.decode("utf-8", errors="replace")
+
+
+def _delimited_rows(mapped: mmap.mmap, delimiter: str) -> Iterator[Dict]:
+    reader = csv.reader(_lines(mapped), delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip().lstrip("\ufeff") for name in header]
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def _json_rows(mapped: mmap.mmap) -> Iterator[Dict]:
+    for number, line in enumerate(_lines(mapped), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise DataFileError(f"line {number} is not valid JSON: {e}")
+        if isinstance(row, dict):
+            yield row
+
+
+def _lookup(row: Dict, column: str):
+    """Column value, following dotted paths into nested JSON objects."""
+    if column in row:
+        return row[column]
+    value = row
+    for part in column.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _matches(row: Dict, where: Sequence[Sequence]) -> bool:
+    for column, op, expected in where:
+        value = _lookup(row, column)
+        if op == "contains":
+            if value is None or str(expected) not in str(value):
+                return False
+            continue
+        left, right = _as_number(value), _as_number(expected)
+        if left is None or right is None:
+            left, right = ("" if value is None else str(value)), str(expected)
+        if not {
+            "==": left == right,
+            "!=": left != right,
+            ">": left > right,
+            ">=": left >= right,
+            "<": left < right,
+            "<=": left <= right,
+        }[op]:
+            return False
+    return True
+
+
+def read_columns(
+    path: str,
+    columns: Sequence[str],
+    where: Sequence[Sequence] = (),
+    fmt: Optional[str] = None,
+) -> Dict[str, List]:
+    """
+    Values of `columns` for every row of the file that satisfies all `where`
+    conditions ([column, operator, value], operator one of ==, !=, >, >=, <,
+    <=, contains). Missing values come back as None.
+    """
+    path = os.path.expanduser(path)
+    fmt = fmt or detect_format(path)
+    for condition in where:
+        if len(condition) != 3 or condition[1] not in _OPERATORS:
+            raise DataFileError(
+                f"Invalid filter {condition!r}; use [column, operator, value] with one of {', '.join(_OPERATORS)}"
+            )
+    result: Dict[str, List] = {column: [] for column in columns}
+    if os.path.getsize(path) == 0:
+        return result
+    with (
+        open(path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+    ):
+        if fmt == "jsonl":
+            rows = _json_rows(mapped)
+        elif fmt in ("csv", "tsv"):
+            rows = _delimited_rows(mapped, "," if fmt == "csv" else "\t")
+        else:
+            raise DataFileError(f"Unsupported format: {fmt}")
+        count = 0
+        for row in rows:
+            if where and not _matches(row, where):
+                continue
+            for column in columns:
+                result[column].append(_lookup(row, column))
+            count += 1
+            if count >= MAX_ROWS:
+                break
+    for column, values in result.items():
+        if values and all(value is None for value in values):
+            raise DataFileError(f"Column '{column}' not found in {path}")
+    return result
+
+
+def to_numbers(values: Sequence) -> List[float]:
+    """Floats for a column; blanks and non-numeric cells become NaN."""
+    numbers = []
+    for value in values:
+        number = _as_number(value)
+        numbers.append(float("nan") if number is None else number)
+    return numbers
+
+
+def to_timestamps(values: Sequence) -> Optional[List[float]]:
+    """Epoch seconds for a column of ISO-8601 datetimes, or None if it is not one."""
+    timestamps = []
+    for value in values:
+        try:
+            moment = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        timestamps.append(moment.timestamp())
+    return timestamps
@@ -0,0 +1,151 @@
+"""
+Minimal Docker Engine API client over the daemon's Unix socket.
+
+The docker tool uses it for the common read paths (containers, images,
+inspect, logs, stats) instead of starting the CLI for every call. Connections
+are HTTP/1.1 keep-alive and are pooled, so repeated calls reuse an open
+socket. Streaming endpoints (logs) get a connection of their own that is
+closed when the caller stops reading, which is how byte caps are enforced
+without draining a chatty container's whole log.
+
+The socket comes from DOCKER_HOST when it is a unix:// URL, otherwise
+/var/run/docker.sock; other DOCKER_HOST schemes are left to the CLI.
+"""
+
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import urllib.parse
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+TIMEOUT = 15
+CHUNK_SIZE = 65536
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def socket_path() -> Optional[str]:
+    """The daemon socket to use, or None when DOCKER_HOST is not a Unix socket."""
+    host = os.environ.get("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://") :]
+    return None if host else DEFAULT_SOCKET
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def _error_message(body: bytes) -> str:
+    try:
+        return json.loads(body).get("message") or body.decode("utf-8", "replace")
+    except (ValueError, AttributeError):
+        return body.decode("utf-8", "replace").strip()
+
+
+class DockerClient:
+    def __init__(self, path: str, timeout: float = TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._idle: List[_UnixConnection] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Tuple[_UnixConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return _UnixConnection(self.path, self.timeout), False
+
+    def _release(self, conn: _UnixConnection) -> None:
+        with self._lock:
+            self._idle.append(conn)
+
+    def _request(
+        self, path: str, params: Optional[Dict]
+    ) -> Tuple[_UnixConnection, http.client.HTTPResponse]:
+        url = path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        conn, reused = self._acquire()
+        try:
+            conn.request("GET", url)
+            return conn, conn.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            conn.close()
+            if not reused:
+                raise
+        # The daemon closed an idle keep-alive connection; retry on a new one
+        conn = _UnixConnection(self.path, self.timeout)
+        conn.request("GET", url)
+        return conn, conn.getresponse()
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Any:
+        conn, response = self._request(path, params)
+        try:
+            body = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        if response.status >= 400:
+            raise DockerAPIError(response.status, _error_message(body))
+        return json.loads(body) if body else None
+
+    def stream(self, path: str, params: Optional[Dict] = None) -> Iterator[bytes]:
+        """Raw response body in chunks; the connection is closed when iteration stops."""
+        conn, response = self._request(path, params)
+        try:
+            if response.status >= 400:
+                raise DockerAPIError(response.status, _error_message(response.read()))
+            while True:
+                chunk = response.read1(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def demux(chunks: Iterator[bytes]) -> Iterator[Tuple[int, bytes]]:
+    """
+    Split a multiplexed attach/logs stream (containers without a TTY) into
+    (stream, payload) frames; stream is 1 for stdout and 2 for stderr.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= 8:
+            kind, size = struct.unpack(">BxxxL", buffer[:8])
+            if len(buffer) < 8 + size:
+                break
+            yield kind, bytes(buffer[8 : 8 + size])
+            del buffer[: 8 + size]
@@ -0,0 +1,134 @@
+"""
+Shape-preserving reduction of large series to the resolution of a terminal chart.
+
+`lttb` (Largest-Triangle-Three-Buckets) keeps the points that carry the
+visible shape of a line: peaks, troughs and steps survive, where plain
+striding would skip them. `histogram` pre-bins raw samples so only the bin
+counts reach the plotting library.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+AGGREGATES = ("mean", "sum", "min", "max", "count")
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of at most `threshold` points that best preserve the line's shape."""
+    n = len(ys)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # Average of the next bucket is the third corner of the triangle
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((ax - avg_x) * (ys[i] - ay) - (ax - xs[i]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def histogram(values: Sequence[float], bins: int) -> Tuple[List[float], List[int]]:
+    """(bin centers, counts) of the finite values over `bins` equal-width bins."""
+    finite = [v for v in values if math.isfinite(v)]
+    if not finite:
+        return [], []
+    low, high = min(finite), max(finite)
+    width = (high - low) / bins or 1.0
+    counts = [0] * bins
+    for value in finite:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    centers = [low + (i + 0.5) * width for i in range(bins)]
+    return centers, counts
+
+
+def grid_thin(
+    xs: Sequence[float], ys: Sequence[float], columns: int, rows: int
+) -> List[int]:
+    """Indices of one point per occupied cell of a columns x rows grid (for scatter plots)."""
+    if not xs:
+        return []
+    x_low, x_high = min(xs), max(xs)
+    y_low, y_high = min(ys), max(ys)
+    x_step = (x_high - x_low) / columns or 1.0
+    y_step = (y_high - y_low) / rows or 1.0
+    seen = {}
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        seen.setdefault((int((x - x_low) / x_step), int((y - y_low) / y_step)), i)
+    return sorted(seen.values())
+
+
+def _combine(values: List[float], how: str) -> float:
+    if how == "count":
+        return float(len(values))
+    if how == "sum":
+        return sum(values)
+    if how == "min":
+        return min(values)
+    if how == "max":
+        return max(values)
+    return sum(values) / len(values)
+
+
+def bin_aggregate(
+    xs: Sequence[float], ys: Optional[Sequence[float]], bins: int, how: str
+) -> Tuple[List[float], List[float]]:
+    """
+    (bin centers, aggregated y) over `bins` equal-width bins of x, or per exact
+    x value when there are no more than `bins` of them. Empty bins are
+    skipped; with how="count" `ys` may be None.
+    """
+    points = [
+        (x, y)
+        for x, y in zip(xs, ys if ys is not None else [0.0] * len(xs))
+        if math.isfinite(x) and (how == "count" or math.isfinite(y))
+    ]
+    if not points:
+        return [], []
+    distinct = {x for x, _ in points}
+    if len(distinct) <= bins:
+        # Few x values (status codes, days): aggregate per exact value
+        exact: Dict[float, List[float]] = {}
+        for x, y in points:
+            exact.setdefault(x, []).append(y)
+        ordered_x = sorted(exact)
+        return ordered_x, [_combine(exact[x], how) for x in ordered_x]
+    low = min(x for x, _ in points)
+    high = max(x for x, _ in points)
+    width = (high - low) / bins or 1.0
+    buckets: Dict[int, List[float]] = {}
+    for x, y in points:
+        buckets.setdefault(min(int((x - low) / width), bins - 1), []).append(y)
+    ordered = sorted(buckets)
+    return (
+        [low + (i + 0.5) * width for i in ordered],
+        [_combine(buckets[i], how) for i in ordered],
+    )
+
+
+def group_aggregate(
+    keys: Sequence, ys: Optional[Sequence[float]], how: str
+) -> Tuple[List[str], List[float]]:
+    """(category, aggregated y) per distinct key, in order of first appearance."""
+    groups: Dict[str, List[float]] = {}
+    for index, key in enumerate(keys):
+        y = ys[index] if ys is not None else 0.0
+        if how == "count" or math.isfinite(y):
+            groups.setdefault(str(key), []).append(y)
+    return list(groups), [_combine(values, how) for values in groups.values()]
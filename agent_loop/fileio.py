@@ -0,0 +1,205 @@
+"""
+File access helpers for large files and crash-safe writes.
+
+Range reads go through mmap with a sparse line index: the newline count at the
+start of every fixed-size block, built once per (path, size, mtime) with
+C-speed bytes.count. Locating a line then costs one binary search plus a scan
+of at most one block, so reading lines 1,000,000-1,000,100 is O(range).
+
+Writes go to a temporary file in the same directory, which is fsynced and then
+atomically renamed over the target, so a crash never leaves a truncated file.
+"""
+
+import array
+import bisect
+import mmap
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+BLOCK_SIZE = 64 * 1024
+MAX_CACHED_INDEXES = 16
+
+# (abspath) -> (size, mtime_ns, newline counts at block starts, total newlines)
+_line_indexes: "OrderedDict[str, Tuple]" = OrderedDict()
+
+
+def _line_index(path: str, mm: mmap.mmap) -> Tuple[array.array, int]:
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = _line_indexes.get(key)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        _line_indexes.move_to_end(key)
+        return cached[2], cached[3]
+
+    block_starts = array.array("Q")
+    newlines = 0
+    for offset in range(0, len(mm), BLOCK_SIZE):
+        block_starts.append(newlines)
+        newlines += mm[offset : offset + BLOCK_SIZE].count(b"\n")
+
+    _line_indexes[key] = (stat.st_size, stat.st_mtime_ns, block_starts, newlines)
+    if len(_line_indexes) > MAX_CACHED_INDEXES:
+        _line_indexes.popitem(last=False)
+    return block_starts, newlines
+
+
+def _line_start(mm: mmap.mmap, block_starts: array.array, line: int) -> int:
+    """Byte offset where 0-based `line` starts (len(mm) if past the end)."""
+    if line == 0:
+        return 0
+    # Last block that starts before the newline ending line-1
+    block = bisect.bisect_left(block_starts, line) - 1
+    position = block * BLOCK_SIZE
+    remaining = line - block_starts[block]
+    while remaining > 0:
+        found = mm.find(b"\n", position)
+        if found == -1:
+            return len(mm)
+        position = found + 1
+        remaining -= 1
+    return position
+
+
+def count_lines(newlines: int, size: int, last_byte: Optional[bytes]) -> int:
+    """Number of lines given the newline count, counting a final unterminated line."""
+    if size == 0:
+        return 0
+    return newlines + (0 if last_byte == b"\n" else 1)
+
+
+def read_line_range(path: str, start: int, end: Optional[int] = None) -> Dict:
+    """
+    Read 1-based inclusive lines [start, end] (end defaults to the last line).
+    Returns a dict with text, start, end and total_lines.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return {"text": "", "start": start, "end": start - 1, "total_lines": 0}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        block_starts, newlines = _line_index(path, mm)
+        total = count_lines(newlines, size, mm[size - 1 : size])
+        start = max(1, start)
+        end = total if end is None else min(end, total)
+        if start > end:
+            return {"text": "", "start": start, "end": end, "total_lines": total}
+        begin = _line_start(mm, block_starts, start - 1)
+        finish = _line_start(mm, block_starts, end) if end < total else size
+        text = mm[begin:finish].decode("utf-8", errors="replace")
+    return {"text": text, "start": start, "end": end, "total_lines": total}
+
+
+def read_byte_range(path: str, offset: int, length: int) -> Dict:
+    """Read `length` bytes starting at `offset`, decoded as UTF-8 with replacement."""
+    size = os.path.getsize(path)
+    offset = max(0, min(offset, size))
+    if size == 0:
+        return {"text": "", "offset": 0, "length": 0, "size": 0}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[offset : offset + max(0, length)]
+    return {
+        "text": data.decode("utf-8", errors="replace"),
+        "offset": offset,
+        "length": len(data),
+        "size": size,
+    }
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", encoding: Optional[str] = "utf-8"):
+    """
+    Open a temporary sibling of `path` for writing; on a clean exit it is fsynced
+    and renamed over `path` (keeping the original permissions), otherwise removed.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        kwargs = {} if "b" in mode else {"encoding": encoding, "newline": ""}
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path: str, content: str) -> None:
+    with atomic_open(path) as f:
+        f.write(content)
+
+
+class LineEditError(ValueError):
+    """Raised when a line edit does not fit the file; the file is left untouched."""
+
+
+def apply_line_edits(path: str, edits: List[Dict]) -> Dict:
+    """
+    Apply line edits in a single streaming pass into a temp file, then rename it.
+    Each edit is {"op": "insert"|"delete"|"replace", "line_number": int (0-based,
+    relative to the original file), "content": str}. Inserts at the same line keep
+    their order; a line can be deleted or replaced at most once.
+    Returns {"lines_before", "lines_after", "removed": {line_number: text}}.
+    """
+    inserts: Dict[int, List[str]] = {}
+    changes: Dict[int, Dict] = {}
+    for edit in edits:
+        op = edit.get("op")
+        line_number = edit.get("line_number")
+        if op not in ("insert", "delete", "replace"):
+            raise LineEditError(f"Unsupported edit op: {op}")
+        if not isinstance(line_number, int) or line_number < 0:
+            raise LineEditError(f"Invalid line number: {line_number}")
+        if op == "insert":
+            inserts.setdefault(line_number, []).append(edit.get("content", ""))
+        elif line_number in changes:
+            raise LineEditError(f"Line {line_number} is edited more than once")
+        else:
+            changes[line_number] = edit
+
+    removed = {}
+    total = 0
+    with open(path, "rb") as source, atomic_open(path, "wb") as target:
+        missing_newline = False
+        for index, line in enumerate(source):
+            total = index + 1
+            for content in inserts.pop(index, []):
+                target.write(content.encode("utf-8") + b"\n")
+            change = changes.pop(index, None)
+            if change is None:
+                target.write(line)
+                missing_newline = not line.endswith(b"\n")
+            elif change["op"] == "delete":
+                removed[index] = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            else:
+                ending = b"\r\n" if line.endswith(b"\r\n") else b"\n"
+                target.write(change.get("content", "").encode("utf-8") + ending)
+                missing_newline = False
+        trailing = inserts.pop(total, [])
+        if trailing and missing_newline:
+            target.write(b"\n")
+        for content in trailing:
+            target.write(content.encode("utf-8") + b"\n")
+        if inserts or changes:
+            bad = sorted(list(inserts) + list(changes))
+            raise LineEditError(
+                f"Invalid line number(s) for a file with {total} lines: {bad}"
+            )
+
+    added = sum(1 for edit in edits if edit["op"] == "insert")
+    return {
+        "lines_before": total,
+        "lines_after": total + added - len(removed),
+        "removed": removed,
+    }
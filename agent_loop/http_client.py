@@ -0,0 +1,238 @@
+"""
+In-process HTTP client shared by the tools that call web APIs.
+
+Requests go through one requests.Session whose adapters keep connections
+alive in a pool with a per-host limit, so repeated calls skip the TCP/TLS
+handshake. Bodies are streamed and cut off at a size cap. GET responses that
+carry an ETag, Last-Modified or max-age are kept in a disk cache unless they
+are private, no-store or set cookies; fresh entries are served locally and
+stale ones are revalidated with If-None-Match/If-Modified-Since, so a 304
+costs no body transfer. The cache key covers the URL and the request headers,
+and requests that send cookies or credentials bypass the cache.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import get_cookie_header
+from requests.structures import CaseInsensitiveDict
+
+from agent_loop.cache import DiskCache
+
+POOL_HOSTS = 32
+MAX_CONNECTIONS_PER_HOST = 8
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_BYTES = 1_000_000
+
+_TEXT_TYPES = re.compile(
+    r"^(text/|application/(json|.*\+json|xml|.*\+xml|javascript|x-www-form-urlencoded|yaml|x-yaml))"
+)
+
+# Request headers that do not change the response, left out of the cache key
+_UNKEYED_HEADERS = {"user-agent"}
+# Requests with these headers are never cached: the response is per-user
+_CREDENTIAL_HEADER = re.compile(
+    r"cookie|auth|token|key|secret|session|password|signature", re.I
+)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_cache: Optional[DiskCache] = None
+
+
+def get_session() -> requests.Session:
+    """The shared keep-alive session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "agent-loop"
+            _session = session
+        return _session
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache("http")
+    return _cache
+
+
+def _sends_credentials(prepared: requests.PreparedRequest) -> bool:
+    """Whether the request sends cookies (its own or the session's) or credentials."""
+    if get_cookie_header(get_session().cookies, prepared):
+        return True
+    return any(_CREDENTIAL_HEADER.search(name) for name in prepared.headers)
+
+
+def _cache_key(prepared: requests.PreparedRequest) -> str:
+    # Every header that can change the response is part of the key, which
+    # covers any Vary the server declares
+    keyed = {
+        name.lower(): value
+        for name, value in prepared.headers.items()
+        if name.lower() not in _UNKEYED_HEADERS
+    }
+    raw = json.dumps([prepared.url, sorted(keyed.items())])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _max_age(cache_control: str) -> Optional[int]:
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+
+def _shareable(cache_control: str, headers) -> bool:
+    """
+    Whether a response may be kept: not private, not no-store, sets no
+    cookies and does not vary on something outside the request (Vary: *).
+    """
+    directives = cache_control.lower()
+    return (
+        "no-store" not in directives
+        and "private" not in directives
+        and "Set-Cookie" not in headers
+        and headers.get("Vary", "").strip() != "*"
+    )
+
+
+def _read_body(response: requests.Response, max_bytes: int):
+    data = bytearray()
+    truncated = False
+    for chunk in response.iter_content(chunk_size=65536):
+        data += chunk
+        if len(data) > max_bytes:
+            del data[max_bytes:]
+            truncated = True
+            break
+    return bytes(data), truncated
+
+
+def _decode(data: bytes, content_type: str) -> str:
+    if not data:
+        return ""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type and not _TEXT_TYPES.match(media_type):
+        return f"[binary body: {len(data)} bytes of {media_type}]"
+    # Default to UTF-8 rather than requests' ISO-8859-1 guess for text/*
+    charset = re.search(r"charset=([\w.-]+)", content_type, re.I)
+    try:
+        return data.decode(charset.group(1) if charset else "utf-8", errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def request(
+    method: str,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    params: Optional[Dict] = None,
+    data: Optional[str] = None,
+    json_body=None,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    use_cache: bool = True,
+    allow_redirects: bool = True,
+) -> Dict:
+    """
+    Perform a request and return {status, reason, url, headers, body, truncated,
+    elapsed_ms, cache}. `cache` is "hit" (served locally), "revalidated" (304),
+    "stored", or None.
+    """
+    method = method.upper()
+    headers = dict(headers or {})
+    cacheable = use_cache and method == "GET"
+    cache_key = cached = None
+    if cacheable:
+        prepared = get_session().prepare_request(
+            requests.Request("GET", url, params=params, headers=headers)
+        )
+        cacheable = not _sends_credentials(prepared)
+    if cacheable:
+        cache_key = _cache_key(prepared)
+        entry = _get_cache().get_entry(cache_key)
+        if entry is not None:
+            cached, expires = entry
+            if expires is not None and expires > time.time():
+                return {**cached, "elapsed_ms": 0, "cache": "hit"}
+            # Header names are case-insensitive but the entry stores a plain dict
+            validators = CaseInsensitiveDict(cached["headers"])
+            if validators.get("ETag"):
+                headers.setdefault("If-None-Match", validators["ETag"])
+            if validators.get("Last-Modified"):
+                headers.setdefault("If-Modified-Since", validators["Last-Modified"])
+
+    started = time.monotonic()
+    with get_session().request(
+        method,
+        url,
+        headers=headers,
+        params=params,
+        data=data.encode("utf-8") if isinstance(data, str) else data,
+        json=json_body,
+        timeout=timeout,
+        stream=True,
+        allow_redirects=allow_redirects,
+    ) as response:
+        if cached is not None and response.status_code == 304:
+            response.close()
+            cache_control = response.headers.get("Cache-Control", "")
+            if _shareable(cache_control, response.headers):
+                _store(cache_key, cached, cache_control)
+            else:
+                _get_cache().delete(cache_key)
+            elapsed = round((time.monotonic() - started) * 1000)
+            return {**cached, "elapsed_ms": elapsed, "cache": "revalidated"}
+        body, truncated = _read_body(response, max_bytes)
+
+    result = {
+        "status": response.status_code,
+        "reason": response.reason,
+        "url": response.url,
+        "headers": dict(response.headers),
+        "body": _decode(body, response.headers.get("Content-Type", "")),
+        "truncated": truncated,
+    }
+    cache_state = None
+    cache_control = response.headers.get("Cache-Control", "")
+    if (
+        cacheable
+        and response.status_code == 200
+        and not truncated
+        and _shareable(cache_control, response.headers)
+        and (
+            response.headers.get("ETag")
+            or response.headers.get("Last-Modified")
+            or _max_age(cache_control)
+        )
+    ):
+        _store(cache_key, result, cache_control)
+        cache_state = "stored"
+    return {
+        **result,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+        "cache": cache_state,
+    }
+
+
+def _store(key: str, result: Dict, cache_control: str) -> None:
+    max_age = _max_age(cache_control)
+    if "no-cache" in cache_control or not max_age:
+        # Always revalidate; keep the entry only for conditional requests
+        ttl = 0
+    else:
+        ttl = max_age
+    _get_cache().set(key, result, ttl=ttl)
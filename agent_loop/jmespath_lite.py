@@ -0,0 +1,433 @@
+"""
+A dependency-free subset of JMESPath, used when the jmespath package is not
+installed. It covers what AWS CLI `--query` expressions normally use:
+
+- fields, quoted fields, sub-expressions and pipes: `a.b`, `"odd key"`, `a | b`;
+- indexes, slices and projections: `a[0]`, `a[1:3]`, `a[*].b`, `a[].b`, `*.b`;
+- filters: `a[?State.Name == 'running' && !Tags]` with ==, !=, <, <=, >, >=,
+  &&, ||, ! and parentheses;
+- multi-selects: `[a, b]`, `{id: InstanceId, state: State.Name}`;
+- literals: `'raw'`, `` `{"json": true}` ``, `@`;
+- functions: length, contains, starts_with, ends_with, keys, values, join,
+  to_string, not_null, sort, sort_by, max_by, min_by.
+
+Projection and null-dropping semantics follow the JMESPath specification, so
+`search` returns the same result as jmespath.search for these expressions.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<quoted>"(?:[^"\\]|\\.)*")
+      | (?P<raw>'(?:[^'\\]|\\.)*')
+      | (?P<literal>`(?:[^`\\]|\\.)*`)
+      | (?P<op>\[\?|\[\]|\|\||&&|==|!=|<=|>=|[<>!.*\[\]{}(),:|@&])
+    )""",
+    re.VERBOSE,
+)
+
+# Left binding powers, as in the JMESPath reference grammar
+_POWER = {
+    "|": 1,
+    "||": 2,
+    "&&": 3,
+    "==": 5,
+    "!=": 5,
+    "<": 5,
+    "<=": 5,
+    ">": 5,
+    ">=": 5,
+    "[]": 9,
+    "*": 20,
+    "[?": 21,
+    ".": 40,
+    "!": 45,
+    "{": 50,
+    "[": 55,
+    "(": 60,
+}
+_COMPARATORS = ("==", "!=", "<", "<=", ">", ">=")
+
+
+class JMESPathError(ValueError):
+    pass
+
+
+def _tokenize(expression: str) -> List:
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise JMESPathError(
+                f"unexpected character at {pos}: {expression[pos:pos + 10]!r}"
+            )
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            tokens.append(("number", int(text)))
+        elif kind == "name":
+            tokens.append(("name", text))
+        elif kind == "quoted":
+            tokens.append(("name", json.loads(text)))
+        elif kind == "raw":
+            tokens.append(("literal", text[1:-1].replace("\\'", "'")))
+        elif kind == "literal":
+            body = text[1:-1].replace("\\`", "`")
+            try:
+                tokens.append(("literal", json.loads(body)))
+            except ValueError:
+                raise JMESPathError(f"invalid JSON literal {text}")
+        else:
+            tokens.append((text, text))
+        pos = match.end()
+    tokens.append(("eof", None))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.index = 0
+
+    def peek(self, offset: int = 0) -> str:
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)][0]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def match(self, kind: str):
+        if self.peek() != kind:
+            found = self.tokens[self.index][1]
+            raise JMESPathError(f"expected {kind!r}, found {found!r}")
+        return self.advance()
+
+    def parse(self):
+        node = self.expression(0)
+        if self.peek() != "eof":
+            raise JMESPathError(f"unexpected {self.tokens[self.index][1]!r}")
+        return node
+
+    def expression(self, power: int):
+        left = self.nud(self.advance())
+        while power < _POWER.get(self.peek(), 0):
+            left = self.led(self.advance(), left)
+        return left
+
+    def nud(self, token):
+        kind, value = token
+        if kind == "name":
+            return ("field", value)
+        if kind == "literal":
+            return ("literal", value)
+        if kind == "@":
+            return ("current",)
+        if kind == "*":
+            return ("values", ("current",), self.projection_rhs(_POWER["*"]))
+        if kind == "[]":
+            return ("project", ("flatten", ("current",)), self.projection_rhs(9))
+        if kind == "[?":
+            return self.filter(("current",))
+        if kind == "[":
+            if self.peek() in ("number", ":"):
+                return self.index_or_slice(("current",))
+            if self.peek() == "*" and self.peek(1) == "]":
+                self.advance()
+                self.advance()
+                return ("project", ("current",), self.projection_rhs(_POWER["*"]))
+            return self.multi_list()
+        if kind == "{":
+            return self.multi_hash()
+        if kind == "!":
+            return ("not", self.expression(_POWER["!"]))
+        if kind == "(":
+            node = self.expression(0)
+            self.match(")")
+            return node
+        if kind == "&":
+            return ("expref", self.expression(0))
+        raise JMESPathError(f"unexpected {value!r}")
+
+    def led(self, token, left):
+        kind = token[0]
+        if kind == ".":
+            if self.peek() == "*":
+                self.advance()
+                return ("values", left, self.projection_rhs(_POWER["*"]))
+            return ("sub", left, self.dot_rhs(_POWER["."]))
+        if kind == "|":
+            return ("pipe", left, self.expression(_POWER["|"]))
+        if kind == "||":
+            return ("or", left, self.expression(_POWER["||"]))
+        if kind == "&&":
+            return ("and", left, self.expression(_POWER["&&"]))
+        if kind in _COMPARATORS:
+            return ("compare", kind, left, self.expression(_POWER[kind]))
+        if kind == "[]":
+            return ("project", ("flatten", left), self.projection_rhs(9))
+        if kind == "[?":
+            return self.filter(left)
+        if kind == "[":
+            if self.peek() in ("number", ":"):
+                return ("sub", left, self.index_or_slice(("current",)))
+            self.match("*")
+            self.match("]")
+            return ("project", left, self.projection_rhs(_POWER["*"]))
+        if kind == "(":
+            if left[0] != "field":
+                raise JMESPathError("only named functions can be called")
+            args = []
+            while self.peek() != ")":
+                args.append(self.expression(0))
+                if self.peek() == ",":
+                    self.advance()
+            self.match(")")
+            return ("call", left[1], args)
+        raise JMESPathError(f"unexpected {token[1]!r}")
+
+    def index_or_slice(self, left):
+        parts: List[Optional[int]] = [None, None, None]
+        position = 0
+        while self.peek() != "]":
+            if self.peek() == ":":
+                self.advance()
+                position += 1
+                if position > 2:
+                    raise JMESPathError("too many colons in slice")
+            else:
+                parts[position] = self.match("number")[1]
+        self.match("]")
+        if position == 0:
+            return ("index", left, parts[0])
+        return ("project", ("slice", left, *parts), self.projection_rhs(_POWER["*"]))
+
+    def filter(self, left):
+        condition = self.expression(0)
+        self.match("]")
+        return ("filter", left, condition, self.projection_rhs(_POWER["[?"]))
+
+    def projection_rhs(self, power: int):
+        kind = self.peek()
+        if _POWER.get(kind, 0) < 10:
+            return ("current",)
+        if kind in ("[", "[?"):
+            return self.expression(power)
+        if kind == ".":
+            self.advance()
+            return self.dot_rhs(power)
+        raise JMESPathError(
+            f"unexpected {self.tokens[self.index][1]!r} after projection"
+        )
+
+    def dot_rhs(self, power: int):
+        kind = self.peek()
+        if kind == "name":
+            return self.expression(power)
+        if kind == "[":
+            self.advance()
+            return self.multi_list()
+        if kind == "{":
+            self.advance()
+            return self.multi_hash()
+        raise JMESPathError(f"unexpected {self.tokens[self.index][1]!r} after '.'")
+
+    def multi_list(self):
+        items = [self.expression(0)]
+        while self.peek() == ",":
+            self.advance()
+            items.append(self.expression(0))
+        self.match("]")
+        return ("list", items)
+
+    def multi_hash(self):
+        pairs = []
+        while True:
+            key = self.match("name")[1]
+            self.match(":")
+            pairs.append((key, self.expression(0)))
+            if self.peek() != ",":
+                break
+            self.advance()
+        self.match("}")
+        return ("hash", pairs)
+
+
+def _truthy(value) -> bool:
+    return value not in (None, False, "", [], {})
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compare(op: str, left, right):
+    if op == "==":
+        return left == right
+    if op == "!=":
+        return left != right
+    if not (_number(left) and _number(right)):
+        return None
+    return {
+        "<": left < right,
+        "<=": left <= right,
+        ">": left > right,
+        ">=": left >= right,
+    }[op]
+
+
+def _sort_key(node):
+    def key(item):
+        value = _eval(node, item)
+        if not (_number(value) or isinstance(value, str)):
+            raise JMESPathError("sort keys must be numbers or strings")
+        return value
+
+    return key
+
+
+_FUNCTIONS: Dict[str, Callable] = {
+    "length": lambda value: (
+        len(value) if isinstance(value, (str, list, dict)) else None
+    ),
+    "contains": lambda subject, search: (
+        search in subject if isinstance(subject, (str, list)) else None
+    ),
+    "starts_with": lambda subject, prefix: str(subject).startswith(prefix),
+    "ends_with": lambda subject, suffix: str(subject).endswith(suffix),
+    "keys": lambda value: list(value) if isinstance(value, dict) else None,
+    "values": lambda value: list(value.values()) if isinstance(value, dict) else None,
+    "join": lambda glue, items: glue.join(items),
+    "to_string": lambda value: (
+        value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))
+    ),
+    "not_null": lambda *values: next((v for v in values if v is not None), None),
+    "sort": lambda items: sorted(items),
+}
+_BY_FUNCTIONS = {"sort_by": sorted, "max_by": max, "min_by": min}
+
+
+def _call(name: str, args: List, data):
+    if name in _BY_FUNCTIONS:
+        if len(args) != 2 or args[1][0] != "expref":
+            raise JMESPathError(f"{name}() takes an array and an &expression")
+        items = _eval(args[0], data)
+        if not isinstance(items, list):
+            return None
+        if not items and name != "sort_by":
+            return None
+        return _BY_FUNCTIONS[name](items, key=_sort_key(args[1][1]))
+    if name not in _FUNCTIONS:
+        raise JMESPathError(f"unknown function {name}()")
+    try:
+        return _FUNCTIONS[name](*(_eval(arg, data) for arg in args))
+    except TypeError as e:
+        raise JMESPathError(f"invalid arguments to {name}(): {e}")
+
+
+def _project(items, node) -> Optional[List]:
+    if not isinstance(items, list):
+        return None
+    results = []
+    for item in items:
+        value = _eval(node, item)
+        if value is not None:
+            results.append(value)
+    return results
+
+
+def _eval(node, data) -> Any:
+    kind = node[0]
+    if kind == "field":
+        return data.get(node[1]) if isinstance(data, dict) else None
+    if kind == "current":
+        return data
+    if kind == "literal":
+        return node[1]
+    if kind == "sub":
+        return _eval(node[2], _eval(node[1], data))
+    if kind == "pipe":
+        return _eval(node[2], _eval(node[1], data))
+    if kind == "index":
+        value = _eval(node[1], data)
+        if not isinstance(value, list):
+            return None
+        index = node[2]
+        return value[index] if -len(value) <= index < len(value) else None
+    if kind == "slice":
+        value = _eval(node[1], data)
+        if not isinstance(value, list):
+            return None
+        if node[4] == 0:
+            raise JMESPathError("slice step cannot be 0")
+        return value[slice(node[2], node[3], node[4])]
+    if kind == "flatten":
+        value = _eval(node[1], data)
+        if not isinstance(value, list):
+            return None
+        flat = []
+        for item in value:
+            flat.extend(item) if isinstance(item, list) else flat.append(item)
+        return flat
+    if kind == "project":
+        return _project(_eval(node[1], data), node[2])
+    if kind == "values":
+        value = _eval(node[1], data)
+        if not isinstance(value, dict):
+            return None
+        return _project(list(value.values()), node[2])
+    if kind == "filter":
+        value = _eval(node[1], data)
+        if not isinstance(value, list):
+            return None
+        kept = [item for item in value if _truthy(_eval(node[2], item))]
+        return _project(kept, node[3])
+    if kind == "list":
+        if data is None:
+            return None
+        return [_eval(item, data) for item in node[1]]
+    if kind == "hash":
+        if data is None:
+            return None
+        return {key: _eval(value, data) for key, value in node[1]}
+    if kind == "compare":
+        return _compare(node[1], _eval(node[2], data), _eval(node[3], data))
+    if kind == "or":
+        left = _eval(node[1], data)
+        return left if _truthy(left) else _eval(node[2], data)
+    if kind == "and":
+        left = _eval(node[1], data)
+        return _eval(node[2], data) if _truthy(left) else left
+    if kind == "not":
+        return not _truthy(_eval(node[1], data))
+    if kind == "call":
+        return _call(node[1], node[2], data)
+    if kind == "expref":
+        raise JMESPathError("&expressions are only valid as function arguments")
+    raise JMESPathError(f"unsupported expression {kind}")
+
+
+class ParsedResult:
+    """Mirrors jmespath.compile(): a parsed expression with .search(data)."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tree = _Parser(expression).parse()
+
+    def search(self, data) -> Any:
+        return _eval(self.tree, data)
+
+
+def compile(expression: str) -> ParsedResult:
+    return ParsedResult(expression)
+
+
+def search(expression: str, data) -> Any:
+    return compile(expression).search(data)
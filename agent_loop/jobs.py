@@ -0,0 +1,192 @@
+"""
+Background jobs for long-running commands (builds, test runs, image pulls,
+`kubectl rollout status`, ...).
+
+A job is a subprocess started in its own process group with stdin closed and
+stderr merged into stdout. A reader thread copies its output into a bounded
+ring buffer addressed by absolute byte offsets, so callers can read output
+incrementally ("everything after offset N") and learn how much was dropped
+once the buffer wraps. Jobs live for the lifetime of the process and are
+killed at exit.
+"""
+
+import atexit
+import itertools
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+RING_BUFFER_BYTES = 1024 * 1024
+MAX_JOBS = 50
+CANCEL_GRACE = 3.0
+
+
+class JobError(ValueError):
+    """Unknown job id."""
+
+
+class RingBuffer:
+    """Keeps the last `capacity` bytes written; positions are absolute offsets."""
+
+    def __init__(self, capacity: int = RING_BUFFER_BYTES):
+        self.capacity = capacity
+        self.data = bytearray()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def write(self, chunk: bytes) -> None:
+        with self.lock:
+            self.data += chunk
+            self.total += len(chunk)
+            overflow = len(self.data) - self.capacity
+            if overflow > 0:
+                del self.data[:overflow]
+
+    def read(self, offset: int, max_bytes: int) -> Dict:
+        with self.lock:
+            start = self.total - len(self.data)
+            dropped = max(0, start - offset)
+            offset = max(offset, start)
+            chunk = bytes(self.data[offset - start : offset - start + max_bytes])
+            return {
+                "text": chunk.decode("utf-8", errors="replace"),
+                "offset": offset,
+                "next_offset": offset + len(chunk),
+                "total_bytes": self.total,
+                "dropped_bytes": dropped,
+            }
+
+
+class Job:
+    def __init__(self, job_id: str, argv: Sequence[str], label: str, cwd, env):
+        self.id = job_id
+        self.label = label
+        self.argv = list(argv)
+        self.output = RingBuffer()
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.cancelled = False
+        self.process = subprocess.Popen(
+            self.argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+            env=env,
+            start_new_session=True,
+            bufsize=0,
+        )
+        self.finished = threading.Event()
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self) -> None:
+        stream = self.process.stdout
+        for chunk in iter(lambda: stream.read(65536), b""):
+            self.output.write(chunk)
+        stream.close()
+        self.process.wait()
+        self.ended = time.time()
+        self.finished.set()
+
+    @property
+    def status(self) -> str:
+        if not self.finished.is_set():
+            return "running"
+        if self.cancelled:
+            return "cancelled"
+        return "succeeded" if self.process.returncode == 0 else "failed"
+
+    def summary(self) -> Dict:
+        end = self.ended or time.time()
+        return {
+            "id": self.id,
+            "command": self.label,
+            "status": self.status,
+            "exit_code": self.process.returncode if self.finished.is_set() else None,
+            "pid": self.process.pid,
+            "elapsed_seconds": round(end - self.started, 1),
+            "output_bytes": self.output.total,
+        }
+
+    def signal_group(self, sig) -> None:
+        try:
+            os.killpg(self.process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+_jobs: Dict[str, Job] = {}
+_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def start_job(
+    argv: Sequence[str],
+    label: Optional[str] = None,
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> Job:
+    """Start `argv` as a background job and return it immediately."""
+    with _lock:
+        finished = [j for j in _jobs.values() if j.finished.is_set()]
+        for job in finished[: max(0, len(_jobs) - MAX_JOBS + 1)]:
+            del _jobs[job.id]
+        job_id = f"job-{next(_ids)}"
+        job = Job(job_id, argv, label or shlex.join(argv), cwd, env)
+        _jobs[job_id] = job
+    return job
+
+
+def get_job(job_id: str) -> Job:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise JobError(f"No such job: {job_id}")
+    return job
+
+
+def list_jobs() -> List[Dict]:
+    return [job.summary() for job in list(_jobs.values())]
+
+
+def read_output(job_id: str, offset: int = 0, max_bytes: int = 65536) -> Dict:
+    """Output from absolute byte `offset`; pass back `next_offset` to continue."""
+    job = get_job(job_id)
+    return {**job.summary(), **job.output.read(max(0, offset), max_bytes)}
+
+
+def wait_job(job_id: str, timeout: float) -> Dict:
+    """Block until the job finishes or `timeout` seconds pass; returns its summary."""
+    job = get_job(job_id)
+    job.finished.wait(max(0.0, timeout))
+    return job.summary()
+
+
+def cancel_job(job_id: str, grace: float = CANCEL_GRACE) -> Dict:
+    """SIGTERM the job's process group, then SIGKILL it if still running after `grace`."""
+    job = get_job(job_id)
+    if job.finished.is_set():
+        return job.summary()
+    job.cancelled = True
+    job.signal_group(signal.SIGTERM)
+    if not job.finished.wait(grace):
+        job.signal_group(signal.SIGKILL)
+        job.finished.wait(grace)
+    return job.summary()
+
+
+def background_message(job: Job) -> str:
+    return (
+        f"🚀 Started background job {job.id}: {job.label}\n"
+        "Use the jobs tool with this job_id to check status, read output, wait or cancel."
+    )
+
+
+@atexit.register
+def _kill_all() -> None:
+    for job in list(_jobs.values()):
+        if not job.finished.is_set():
+            job.signal_group(signal.SIGKILL)
@@ -0,0 +1,358 @@
+"""
+A small jq-like query language for the json tool.
+
+A query is a pipeline of stages separated by `|`:
+
+- paths: `.`, `.a.b`, `.a[0]`, `.["odd key"]`, and `[]` to iterate over an
+  array or the values of an object (`.items[]`, `.[]`);
+- `select(cond)`, where cond compares paths and literals with ==, !=, <, <=,
+  >, >= and combines comparisons with `and`, `or` and `not`; a bare path
+  tests for truthiness;
+- `{a, b: .x.y, "c d": .z}` to project objects;
+- `length` and `keys`.
+
+Every stage maps one input to zero or more outputs, as in jq. `run_query`
+streams the input through the pipeline: when the first stage iterates an
+array in a file (`.items[] | ...`), elements are decoded one at a time by
+agent_loop.json_stream, and JSON-lines input is processed line by line.
+Counting, grouping and top-N are done over the results with bounded memory.
+"""
+
+import heapq
+import itertools
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agent_loop.json_stream import iter_values
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<op>==|!=|<=|>=|<|>|\|)
+      | (?P<punct>[.\[\]{}(),:])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN.match(query, pos)
+        if not match or match.end() == pos:
+            raise QueryError(f"unexpected character at {pos}: {query[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, query: str):
+        self.tokens = _tokenize(query)
+        self.index = 0
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.index + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, value: Optional[str] = None) -> str:
+        kind, text = self.peek()
+        if kind is None or (value is not None and text != value):
+            raise QueryError(f"expected {value or 'more input'}, found {text or 'end'}")
+        self.index += 1
+        return text
+
+    def pipeline(self) -> List:
+        stages = [self.stage()]
+        while self.peek()[1] == "|":
+            self.take("|")
+            stages.append(self.stage())
+        if self.peek()[0] is not None:
+            raise QueryError(f"unexpected {self.peek()[1]!r}")
+        return stages
+
+    def stage(self):
+        kind, text = self.peek()
+        if text == ".":
+            return ("path", self.path())
+        if text == "{":
+            return ("object", self.object())
+        if kind == "name" and text == "select":
+            self.take()
+            self.take("(")
+            condition = self.disjunction()
+            self.take(")")
+            return ("select", condition)
+        if kind == "name" and text in ("length", "keys"):
+            self.take()
+            return (text,)
+        raise QueryError(f"unexpected {text!r}")
+
+    def path(self) -> List:
+        """Steps: a key (str), an index (int) or None for iteration."""
+        steps: List = []
+        self.take(".")
+        while True:
+            kind, text = self.peek()
+            if kind == "name" and self.peek(-1)[1] == ".":
+                steps.append(self.take())
+            elif kind == "string" and self.peek(-1)[1] == ".":
+                steps.append(json.loads(self.take()))
+            elif text == "[":
+                self.take("[")
+                kind, text = self.peek()
+                if text == "]":
+                    steps.append(None)
+                elif kind == "number":
+                    steps.append(int(self.take()))
+                elif kind == "string":
+                    steps.append(json.loads(self.take()))
+                else:
+                    raise QueryError(f"unexpected {text!r} in brackets")
+                self.take("]")
+            elif text == "." and self.peek(1)[0] in ("name", "string"):
+                self.take(".")
+            else:
+                return steps
+
+    def object(self) -> List[Tuple[str, List]]:
+        fields = []
+        self.take("{")
+        while True:
+            kind, text = self.peek()
+            if kind == "name":
+                key = self.take()
+            elif kind == "string":
+                key = json.loads(self.take())
+            else:
+                raise QueryError(f"expected a field name, found {text!r}")
+            if self.peek()[1] == ":":
+                self.take(":")
+                fields.append((key, self.path()))
+            else:
+                fields.append((key, [key]))
+            if self.peek()[1] == ",":
+                self.take(",")
+                continue
+            self.take("}")
+            return fields
+
+    def disjunction(self):
+        terms = [self.conjunction()]
+        while self.peek() == ("name", "or"):
+            self.take()
+            terms.append(self.conjunction())
+        return ("or", terms) if len(terms) > 1 else terms[0]
+
+    def conjunction(self):
+        terms = [self.negation()]
+        while self.peek() == ("name", "and"):
+            self.take()
+            terms.append(self.negation())
+        return ("and", terms) if len(terms) > 1 else terms[0]
+
+    def negation(self):
+        if self.peek() == ("name", "not"):
+            self.take()
+            return ("not", self.negation())
+        if self.peek()[1] == "(":
+            self.take("(")
+            condition = self.disjunction()
+            self.take(")")
+            return condition
+        left = self.operand()
+        if self.peek()[0] == "op" and self.peek()[1] != "|":
+            op = self.take()
+            return ("compare", op, left, self.operand())
+        return ("truthy", left)
+
+    def operand(self):
+        kind, text = self.peek()
+        if text == ".":
+            return ("path", self.path())
+        if kind in ("number", "string"):
+            return ("literal", json.loads(self.take()))
+        if kind == "name" and text in ("true", "false", "null"):
+            return ("literal", json.loads(self.take()))
+        raise QueryError(f"expected a path or literal, found {text!r}")
+
+
+def _walk(value, steps: List) -> Iterator:
+    if not steps:
+        yield value
+        return
+    step, rest = steps[0], steps[1:]
+    if step is None:
+        if isinstance(value, list):
+            items = value
+        elif isinstance(value, dict):
+            items = value.values()
+        else:
+            raise QueryError(f"cannot iterate over {type(value).__name__}")
+        for item in items:
+            yield from _walk(item, rest)
+    elif isinstance(step, int):
+        yield from _walk(
+            (
+                value[step]
+                if isinstance(value, list) and -len(value) <= step < len(value)
+                else None
+            ),
+            rest,
+        )
+    else:
+        yield from _walk(value.get(step) if isinstance(value, dict) else None, rest)
+
+
+def _first(value, steps: List):
+    return next(_walk(value, steps), None)
+
+
+def _operand(value, operand):
+    return operand[1] if operand[0] == "literal" else _first(value, operand[1])
+
+
+def _compare(op: str, left, right) -> bool:
+    if op == "==":
+        return left == right
+    if op == "!=":
+        return left != right
+    try:
+        return {
+            "<": lambda: left < right,
+            "<=": lambda: left <= right,
+            ">": lambda: left > right,
+            ">=": lambda: left >= right,
+        }[op]()
+    except TypeError:
+        return False
+
+
+def _test(value, condition) -> bool:
+    kind = condition[0]
+    if kind == "or":
+        return any(_test(value, term) for term in condition[1])
+    if kind == "and":
+        return all(_test(value, term) for term in condition[1])
+    if kind == "not":
+        return not _test(value, condition[1])
+    if kind == "truthy":
+        return _operand(value, condition[1]) not in (None, False)
+    _, op, left, right = condition
+    return _compare(op, _operand(value, left), _operand(value, right))
+
+
+def _apply(stage, value) -> Iterator:
+    kind = stage[0]
+    if kind == "path":
+        yield from _walk(value, stage[1])
+    elif kind == "select":
+        if _test(value, stage[1]):
+            yield value
+    elif kind == "object":
+        yield {key: _first(value, steps) for key, steps in stage[1]}
+    elif kind == "length":
+        yield len(value) if isinstance(value, (list, dict, str)) else 0
+    elif kind == "keys":
+        if not isinstance(value, dict):
+            raise QueryError(f"{type(value).__name__} has no keys")
+        yield sorted(value)
+
+
+def _pipeline(stages: List, values: Iterable) -> Iterator:
+    for value in values:
+        outputs: Iterable = [value]
+        for stage in stages:
+            outputs = [out for item in outputs for out in _apply(stage, item)]
+        yield from outputs
+
+
+def compile_query(query: str) -> List:
+    return _Parser(query or ".").pipeline()
+
+
+def _source(stages: List, stream, jsonl: bool) -> Tuple[Iterator, List]:
+    """Values to feed the remaining stages, decoding as little as possible."""
+    if jsonl:
+        values = (json.loads(line) for line in stream if line.strip())
+        return values, stages
+    first = stages[0]
+    if first[0] == "path" and None in first[1]:
+        split = first[1].index(None)
+        rest = [("path", first[1][split + 1 :])] + stages[1:]
+        return iter_values(stream, first[1][:split], iterate=True), rest
+    if first[0] == "path":
+        return iter_values(stream, first[1], iterate=False), stages[1:]
+    return iter_values(stream, [], iterate=False), stages
+
+
+def run_query(
+    stream,
+    query: str,
+    jsonl: bool = False,
+    limit: int = 20,
+    count: bool = False,
+    count_by: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+) -> Dict:
+    """
+    Evaluate `query` over a JSON document or JSON-lines stream. Returns
+    {"results", "returned", "more"}; {"results", "returned", "matched"} with
+    sort_by (the top `limit` by a numeric key); {"count"} with count; or
+    {"groups", "counts"} with count_by (the `limit` most frequent values).
+    Without sort_by/count/count_by the input is read only until `limit`
+    results have been produced.
+    """
+    stages = compile_query(query)
+    values, rest = _source(stages, stream, jsonl)
+    results = _pipeline(rest, values)
+
+    if count:
+        return {"count": sum(1 for _ in results)}
+
+    if count_by:
+        key_steps = compile_query(count_by)
+        counts: Dict[str, int] = {}
+        for result in results:
+            for key in _pipeline(key_steps, [result]):
+                label = key if isinstance(key, str) else json.dumps(key)
+                counts[label] = counts.get(label, 0) + 1
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return {"groups": len(counts), "counts": dict(top)}
+
+    if sort_by:
+        key_steps = compile_query(sort_by)
+        matched = 0
+        heap: List = []
+        sign = 1 if descending else -1
+        for order, result in enumerate(results):
+            matched += 1
+            key = next(_pipeline(key_steps, [result]), None)
+            if not isinstance(key, (int, float)) or isinstance(key, bool):
+                continue
+            # Ties keep input order; the heap holds the best `limit` items
+            entry = (sign * key, -order, result)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        ranked = [item[2] for item in sorted(heap, key=lambda e: e[:2], reverse=True)]
+        return {"results": ranked, "returned": len(ranked), "matched": matched}
+
+    taken = list(itertools.islice(results, limit + 1))
+    return {
+        "results": taken[:limit],
+        "returned": min(len(taken), limit),
+        "more": len(taken) > limit,
+    }
@@ -0,0 +1,284 @@
+"""
+Incremental JSON reader for documents too large to load at once.
+
+The file is read in chunks. Objects and arrays on the way to a target are
+scanned without being built: only the key being followed is decoded, and
+sibling values are skipped by tracking strings and bracket depth. At the
+target, each element of an array (or each value of an object) is decoded on
+its own with JSONDecoder.raw_decode, so memory is bounded by the largest
+single element rather than the whole document.
+"""
+
+import json
+import re
+from json.decoder import scanstring
+from typing import Iterator, List, TextIO, Union
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r"[,\]}\s]")
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Characters that can continue a number which raw_decode has already accepted
+_NUMBER_TAIL = set("0123456789.eE+-")
+_DECODER = json.JSONDecoder()
+
+Step = Union[str, int]
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class _Reader:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.consumed = 0
+
+    def _fill(self, size: int = CHUNK_SIZE) -> bool:
+        if self.eof:
+            return False
+        if self.pos > CHUNK_SIZE:
+            # Drop what has been parsed so the buffer stays small
+            self.consumed += self.pos
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        chunk = self.stream.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _error(self, message: str) -> JSONStreamError:
+        return JSONStreamError(f"{message} at offset {self.consumed + self.pos}")
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at the end of the input)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            found = self.peek() or "end of input"
+            raise self._error(f"expected '{char}' but found '{found}'")
+        self.pos += 1
+
+    def read_string(self) -> str:
+        self.expect('"')
+        while True:
+            try:
+                value, end = scanstring(self.buffer, self.pos)
+                self.pos = end
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise self._error("unterminated string")
+
+    def decode(self):
+        """Decode the value at the current position."""
+        self.peek()
+        size = CHUNK_SIZE
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # A number cut by the end of the buffer ("123." + "456") decodes
+                # short; it may continue in the next chunk
+                cut = (
+                    isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                    and (end >= len(self.buffer) or self.buffer[end] in _NUMBER_TAIL)
+                )
+                if self.eof or not cut:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                # Only errors at the end of the buffer can be cured by reading more
+                incomplete = (
+                    e.msg.startswith("Unterminated string")
+                    or e.pos >= len(self.buffer) - 6
+                )
+                if self.eof or not incomplete:
+                    self.pos = e.pos
+                    raise self._error(f"invalid JSON ({e.msg})")
+            # Grow the read size so a huge element is re-parsed only a few times
+            self._fill(size)
+            size *= 2
+
+    def _skip_string(self) -> None:
+        """Move past a string without decoding it."""
+        start = self.pos + 1
+        while True:
+            match = _STRING_REST.match(self.buffer, start)
+            if match:
+                self.pos = match.end()
+                return
+            if not self._fill():
+                raise self._error("unterminated string")
+            # _fill may have dropped the parsed prefix of the buffer
+            start = self.pos + 1
+
+    def skip(self) -> None:
+        """Move past the value at the current position without building it."""
+        char = self.peek()
+        if char == '"':
+            self._skip_string()
+            return
+        pattern = _STRUCTURE if char in "{[" else _SCALAR_END
+        depth = 0
+        while True:
+            match = pattern.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    if pattern is _SCALAR_END:
+                        return
+                    raise self._error("unexpected end of input")
+                continue
+            if pattern is _SCALAR_END:
+                self.pos = match.start()
+                return
+            char = match.group()
+            self.pos = match.start()
+            if char == '"':
+                self._skip_string()
+                continue
+            self.pos += 1
+            depth += 1 if char in "{[" else -1
+            if depth == 0:
+                return
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object at the current position; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise self._error("expected ',' or '}'")
+
+    def elements(self) -> Iterator[int]:
+        """Indices of the array at the current position; the caller consumes each element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise self._error("expected ',' or ']'")
+
+
+def _navigate(reader: _Reader, steps: List[Step]) -> bool:
+    """Position the reader at the value under `steps`; False if it does not exist."""
+    for step in steps:
+        char = reader.peek()
+        if isinstance(step, str) and char == "{":
+            members = reader.members()
+            for key in members:
+                if key == step:
+                    break
+                reader.skip()
+            else:
+                return False
+        elif isinstance(step, int) and char == "[" and step >= 0:
+            elements = reader.elements()
+            for index in elements:
+                if index == step:
+                    break
+                reader.skip()
+            else:
+                return False
+        else:
+            return False
+    return True
+
+
+def iter_values(stream: TextIO, steps: List[Step], iterate: bool) -> Iterator:
+    """
+    Yield the value at `steps` in the document, or with `iterate` each element
+    of that array / each value of that object, decoding one item at a time.
+    """
+    reader = _Reader(stream)
+    if not reader.peek():
+        raise JSONStreamError("empty input")
+    if not _navigate(reader, steps):
+        return
+    if not iterate:
+        yield reader.decode()
+        return
+    char = reader.peek()
+    if char == "[":
+        for _ in reader.elements():
+            yield reader.decode()
+    elif char == "{":
+        for _ in reader.members():
+            yield reader.decode()
+    else:
+        raise JSONStreamError("cannot iterate over a scalar value")
+
+
+def _check(reader: _Reader) -> None:
+    """Decode the value at the current position, descending into containers."""
+    char = reader.peek()
+    if char == "[":
+        for _ in reader.elements():
+            _check(reader)
+    elif char == "{":
+        for _ in reader.members():
+            _check(reader)
+    else:
+        reader.decode()
+
+
+def validate(stream: TextIO) -> int:
+    """
+    Check that the input is one well-formed JSON document without building it:
+    containers are walked and only scalars are decoded. Returns the number of
+    top-level items.
+    """
+    reader = _Reader(stream)
+    char = reader.peek()
+    if not char:
+        raise JSONStreamError("empty input")
+    count = 0
+    try:
+        if char == "[":
+            for _ in reader.elements():
+                _check(reader)
+                count += 1
+        elif char == "{":
+            for _ in reader.members():
+                _check(reader)
+                count += 1
+        else:
+            _check(reader)
+            count = 1
+    except RecursionError:
+        raise reader._error("nesting too deep")
+    if reader.peek():
+        raise reader._error("extra data after the document")
+    return count
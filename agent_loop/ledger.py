@@ -0,0 +1,96 @@
+"""
+Per-session ledger of file contents already delivered to the model.
+
+When the filesystem tool reads a file it records the delivered text under the
+file's absolute path. A later read of the same file can then answer
+"unchanged" (same content hash) or send a unified diff against the recorded
+version instead of the whole file. The ledger lives for the lifetime of the
+process, which is the lifetime of the conversation.
+"""
+
+import difflib
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+MAX_ENTRIES = 256
+MAX_TOTAL_CHARS = 32_000_000
+DIFF_CONTEXT_LINES = 2
+
+# A diff longer than this fraction of the file is not worth it; send the file
+MAX_DIFF_RATIO = 0.6
+
+# abspath -> (sha1 of content, content)
+_delivered: "OrderedDict[str, tuple]" = OrderedDict()
+_total_chars = 0
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def record(path: str, text: str) -> None:
+    """Remember `text` as the version of `path` the model has now seen."""
+    global _total_chars
+    key = os.path.abspath(path)
+    forget(key)
+    _delivered[key] = (_digest(text), text)
+    _total_chars += len(text)
+    while _delivered and (
+        len(_delivered) > MAX_ENTRIES or _total_chars > MAX_TOTAL_CHARS
+    ):
+        _, (_, dropped) = _delivered.popitem(last=False)
+        _total_chars -= len(dropped)
+
+
+def forget(path: str) -> None:
+    global _total_chars
+    entry = _delivered.pop(os.path.abspath(path), None)
+    if entry is not None:
+        _total_chars -= len(entry[1])
+
+
+def advance(path: str, before: str, after: str) -> None:
+    """
+    After an edit whose effect the model already knows (e.g. a patch it sent),
+    move the recorded version forward if the model had seen `before`.
+    """
+    entry = _delivered.get(os.path.abspath(path))
+    if entry is not None and entry[0] == _digest(before):
+        record(path, after)
+
+
+def delta(path: str, text: str) -> Optional[Dict]:
+    """
+    Compare `text` with the version of `path` last delivered. Returns None if
+    the file was never delivered or the change is too large to be worth a diff,
+    {"unchanged": True} if the content is identical, or {"diff": str,
+    "added": int, "removed": int} otherwise. The ledger is updated either way.
+    """
+    key = os.path.abspath(path)
+    previous = _delivered.get(key)
+    digest = _digest(text)
+    if previous is not None and previous[0] == digest:
+        _delivered.move_to_end(key)
+        return {"unchanged": True}
+    record(key, text)
+    if previous is None:
+        return None
+
+    old_lines = previous[1].splitlines(keepends=True)
+    new_lines = text.splitlines(keepends=True)
+    added = removed = 0
+    diff_lines = []
+    for line in difflib.unified_diff(
+        old_lines, new_lines, "before", "after", n=DIFF_CONTEXT_LINES
+    ):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+        diff_lines.append(line if line.endswith("\n") else line + "\n")
+    diff = "".join(diff_lines[2:])
+    if len(diff) > MAX_DIFF_RATIO * len(text):
+        return None
+    return {"diff": diff, "added": added, "removed": removed}
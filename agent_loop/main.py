@@ -277,6 +277,9 @@ class AgentLoop:
                             await asyncio.sleep(0.1)
                             if self.interrupt_event.is_set():
                                 tool_fut.cancel()
+                                # Let the tool stop its processes before prompting again
+                                with suppress(asyncio.CancelledError):
+                                    await tool_fut
                                 break
 
                         if self.interrupt_event.is_set():
@@ -0,0 +1,189 @@
+"""
+In-memory patch application for the filesystem tool's `patch` operation.
+
+Two formats are supported: exact-match search/replace blocks and unified diffs.
+Both work on the whole text and raise PatchError on the first problem (missing
+or ambiguous match, hunk that does not apply), so the caller can write the
+result atomically or not at all. Each applied change is reported as
+(first changed line, lines removed, lines added), context lines excluded, for
+a compact summary.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+Change = Tuple[int, int, int]
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be applied unambiguously; nothing is written."""
+
+
+def _trimmed_change(line: int, old: List[str], new: List[str]) -> Change:
+    """The change between two line blocks, without their common leading/trailing lines."""
+    head = 0
+    while head < min(len(old), len(new)) and old[head] == new[head]:
+        head += 1
+    tail = 0
+    while (
+        tail < min(len(old), len(new)) - head
+        and old[len(old) - 1 - tail] == new[len(new) - 1 - tail]
+    ):
+        tail += 1
+    return (line + head, len(old) - head - tail, len(new) - head - tail)
+
+
+def apply_search_replace(text: str, blocks: List[Dict]) -> Tuple[str, List[Change]]:
+    """
+    Apply {"search", "replace"} blocks in order. Every search string must occur
+    exactly once in the text as it stands when the block is applied.
+    """
+    changes = []
+    for number, block in enumerate(blocks, 1):
+        search = block.get("search", "")
+        replace = block.get("replace", "")
+        if not search:
+            raise PatchError(f"Block {number}: 'search' must not be empty")
+        occurrences = text.count(search)
+        if occurrences == 0:
+            first_line = search.strip().splitlines()[0] if search.strip() else search
+            hint = ""
+            if first_line and first_line.strip() in text:
+                line = text.count("\n", 0, text.index(first_line.strip())) + 1
+                hint = f" (its first line appears at line {line}; check whitespace and the following lines)"
+            raise PatchError(f"Block {number}: search text not found{hint}")
+        if occurrences > 1:
+            raise PatchError(
+                f"Block {number}: search text matches {occurrences} times; include more surrounding lines"
+            )
+        index = text.index(search)
+        line = text.count("\n", 0, index) + 1
+        changes.append(_trimmed_change(line, search.splitlines(), replace.splitlines()))
+        text = text[:index] + replace + text[index + len(search) :]
+    return text, changes
+
+
+def _parse_hunks(diff: str) -> List[Dict]:
+    hunks = []
+    current = None
+    targets = 0
+    for raw in diff.splitlines():
+        header = _HUNK_HEADER.match(raw)
+        if header:
+            current = {
+                "old_start": int(header.group(1)),
+                "old_left": int(header.group(2) or 1),
+                "new_left": int(header.group(4) or 1),
+                "old": [],
+                "new": [],
+                "lead": 0,
+                "removed": 0,
+                "added": 0,
+            }
+            hunks.append(current)
+            continue
+        # File headers, "diff --git" and "index" lines live outside hunks
+        if current is None:
+            if (
+                hunks
+                and raw[:1] in ("-", "+", " ")
+                and not raw.startswith(("--- ", "+++ "))
+            ):
+                raise PatchError(
+                    f"Hunk at line {hunks[-1]['old_start']} has more lines than its "
+                    f"@@ header counts: {raw!r}"
+                )
+            if raw.startswith("+++ "):
+                targets += 1
+                if targets > 1:
+                    raise PatchError(
+                        "Unified diff touches more than one file; patch one file at a time"
+                    )
+            continue
+        if raw.startswith("\\"):
+            continue
+        tag, body = (raw[:1], raw[1:]) if raw else (" ", "")
+        if tag == " ":
+            current["old"].append(body)
+            current["new"].append(body)
+            current["old_left"] -= 1
+            current["new_left"] -= 1
+            if not current["removed"] and not current["added"]:
+                current["lead"] += 1
+        elif tag == "-":
+            current["old"].append(body)
+            current["old_left"] -= 1
+            current["removed"] += 1
+        elif tag == "+":
+            current["new"].append(body)
+            current["new_left"] -= 1
+            current["added"] += 1
+        else:
+            raise PatchError(f"Unexpected line in unified diff: {raw!r}")
+        if current["old_left"] <= 0 and current["new_left"] <= 0:
+            current = None
+    if not hunks:
+        raise PatchError("No hunks found in unified diff")
+    if current is not None:
+        raise PatchError(
+            f"Hunk at line {current['old_start']} has fewer lines than its @@ header counts"
+        )
+    return hunks
+
+
+def _find_block(lines: List[str], block: List[str], expected: int) -> int:
+    size = len(block)
+    if lines[expected : expected + size] == block:
+        return expected
+    matches = [
+        index
+        for index in range(len(lines) - size + 1)
+        if lines[index : index + size] == block
+    ]
+    if not matches:
+        return -1
+    if len(matches) > 1:
+        raise PatchError(
+            f"Hunk at line {expected + 1} matches {len(matches)} places; add more context lines"
+        )
+    return matches[0]
+
+
+def apply_unified_diff(text: str, diff: str) -> Tuple[str, List[Change]]:
+    """
+    Apply a unified diff to text. A hunk is applied at its stated position if the
+    old lines match there, otherwise at its unique match elsewhere in the file.
+    """
+    trailing_newline = text.endswith("\n")
+    lines = text.splitlines()
+    changes = []
+    offset = 0
+    for hunk in _parse_hunks(diff):
+        old, new = hunk["old"], hunk["new"]
+        if not old:
+            # Pure insertion: old_start is the line after which to insert
+            index = min(hunk["old_start"] + offset, len(lines))
+            offset += len(new)
+        else:
+            index = _find_block(lines, old, max(0, hunk["old_start"] - 1 + offset))
+            if index == -1:
+                raise PatchError(
+                    f"Hunk at line {hunk['old_start']} does not apply: context/removed lines not found"
+                )
+            offset = index - (hunk["old_start"] - 1) + len(new) - len(old)
+        lines[index : index + len(old)] = new
+        changes.append((index + 1 + hunk["lead"], hunk["removed"], hunk["added"]))
+    result = "\n".join(lines)
+    if lines and trailing_newline:
+        result += "\n"
+    return result, changes
+
+
+def summarize_changes(changes: List[Change]) -> str:
+    """One line per change plus totals, e.g. 'L12: -2 +3'."""
+    removed = sum(change[1] for change in changes)
+    added = sum(change[2] for change in changes)
+    parts = [f"L{line}: -{old} +{new}" for line, old, new in changes]
+    return f"+{added} -{removed} lines ({'; '.join(parts)})"
@@ -0,0 +1,94 @@
+"""
+Client-side projection of JSON payloads to a handful of dotted paths, so only
+the fields the model asked for reach its context.
+
+`project({"a": {"b": 1, "c": 2}, "d": [{"e": 1, "f": 2}]}, ["a.b", "d.e"])`
+returns `{"a": {"b": 1}, "d": [{"e": 1}]}`: lists are mapped element-wise and
+missing paths are simply left out. `to_table` renders a list of rows as
+compact tab-separated text.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List
+
+_MISSING = object()
+
+
+def _pick(value: Any, parts: List[str]) -> Any:
+    if not parts:
+        return value
+    if isinstance(value, list):
+        # Keep positions so projections of different paths can be merged item by item
+        picked = [_pick(item, parts) for item in value]
+        return [{} if item is _MISSING else item for item in picked]
+    if not isinstance(value, dict) or parts[0] not in value:
+        return _MISSING
+    inner = _pick(value[parts[0]], parts[1:])
+    if inner is _MISSING:
+        return _MISSING
+    return {parts[0]: inner}
+
+
+def _merge(target: Dict, source: Dict) -> None:
+    for key, value in source.items():
+        if key in target and isinstance(target[key], dict) and isinstance(value, dict):
+            _merge(target[key], value)
+        elif (
+            key in target
+            and isinstance(target[key], list)
+            and isinstance(value, list)
+            and len(target[key]) == len(value)
+        ):
+            for index, item in enumerate(value):
+                if isinstance(target[key][index], dict) and isinstance(item, dict):
+                    _merge(target[key][index], item)
+        else:
+            target[key] = value
+
+
+def project(value: Any, paths: Iterable[str]) -> Any:
+    """Keep only the given dotted paths of a JSON value (lists are mapped)."""
+    if isinstance(value, list):
+        return [project(item, paths) for item in value]
+    result: Dict = {}
+    for path in paths:
+        picked = _pick(value, [part for part in path.split(".") if part])
+        if isinstance(picked, dict):
+            _merge(result, picked)
+    return result
+
+
+def compact_json(value: Any) -> str:
+    """JSON without insignificant whitespace."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def to_table(rows: List[Any]) -> str:
+    """
+    Tab-separated rows with a header line. Object rows get one column per key
+    (in first-seen order), list rows one per position and scalars a single
+    'value' column; nested values are written as compact JSON.
+    """
+    if all(isinstance(row, dict) for row in rows):
+        columns: Dict[str, None] = {}
+        for row in rows:
+            columns.update(dict.fromkeys(row))
+        header = list(columns)
+        cells = [[row.get(column) for column in header] for row in rows]
+    elif all(isinstance(row, list) for row in rows):
+        header = [str(i) for i in range(max((len(row) for row in rows), default=0))]
+        cells = [row + [None] * (len(header) - len(row)) for row in rows]
+    else:
+        header = ["value"]
+        cells = [[row] for row in rows]
+
+    def cell(value: Any) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, str):
+            return value.replace("\t", " ").replace("\n", " ")
+        return compact_json(value)
+
+    return "\n".join(
+        "\t".join(cell(value) for value in line) for line in [header, *cells]
+    )
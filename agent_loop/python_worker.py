@@ -0,0 +1,188 @@
+"""
+Long-lived Python kernel run by the `python` tool through agent_loop.worker_pool.
+
+Started as a plain script (`python3 python_worker.py`) so it uses whatever
+interpreter and packages the user has on PATH; it must only import the stdlib.
+It reads one JSON request per line from a private copy of stdin and writes one
+JSON response per line to a private copy of stdout. The real fds 0/1/2 are
+pointed at /dev/null so user code cannot corrupt the protocol.
+
+Requests: {"op": "exec", "session", "code", "cpu_seconds", "max_output"},
+{"op": "reset", "session"} and {"op": "sessions"}.
+Environment: AGENT_LOOP_PYTHON_PRELOAD (comma-separated modules to import at
+startup) and AGENT_LOOP_PYTHON_MEMORY_MB (address-space limit, 0 = none).
+"""
+
+import ast
+import builtins
+import importlib
+import io
+import json
+import os
+import signal
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class CPULimitExceeded(Exception):
+    pass
+
+
+class CappedWriter(io.TextIOBase):
+    """A text stream that keeps at most `limit` characters and counts the rest."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        room = self.limit - self.size
+        if room > 0:
+            kept = text[:room]
+            self.parts.append(kept)
+            self.size += len(kept)
+        self.dropped += max(0, len(text) - max(room, 0))
+        return len(text)
+
+    def getvalue(self):
+        value = "".join(self.parts)
+        if self.dropped:
+            value += f"\n[... {self.dropped} more characters truncated]"
+        return value
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_limit(seconds):
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if not seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _run(code, namespace):
+    """Exec `code`; if it ends with an expression, return its repr like a REPL."""
+    tree = ast.parse(code, "<agent>", "exec")
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, "<agent>", "exec"), namespace)
+    if last is not None:
+        value = eval(compile(last, "<agent>", "eval"), namespace)
+        if value is not None:
+            return repr(value)
+    return None
+
+
+def _execute(request, sessions):
+    namespace = sessions.setdefault(
+        request.get("session", "default"),
+        {"__name__": "__main__", "__builtins__": builtins},
+    )
+    limit = request.get("max_output", 20000)
+    stdout, stderr = CappedWriter(limit), CappedWriter(limit)
+    response = {"ok": True, "result": None, "exit_code": 0}
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        _set_cpu_limit(request.get("cpu_seconds"))
+        result = _run(request["code"], namespace)
+        if result is not None:
+            response["result"] = result[:limit]
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=stderr)
+        response["exit_code"] = code
+    except CPULimitExceeded:
+        response.update(ok=False, exit_code=1)
+        print(
+            f"CPULimitExceeded: more than {request.get('cpu_seconds')} s of CPU time",
+            file=stderr,
+        )
+    except BaseException:
+        response.update(ok=False, exit_code=1)
+        etype, value, tb = sys.exc_info()
+        # Drop this module's own frames from the traceback
+        while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+            tb = tb.tb_next
+        traceback.print_exception(etype, value, tb, file=stderr)
+    finally:
+        _set_cpu_limit(None)
+        sys.stdout, sys.stderr = saved
+    response["stdout"] = stdout.getvalue()
+    response["stderr"] = stderr.getvalue()
+    return response
+
+
+def main():
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    sys.stdin = open(os.devnull, "r")
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+        memory_mb = int(os.environ.get("AGENT_LOOP_PYTHON_MEMORY_MB") or 0)
+        if memory_mb > 0:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    preloaded = []
+    for name in filter(
+        None, os.environ.get("AGENT_LOOP_PYTHON_PRELOAD", "").split(",")
+    ):
+        try:
+            importlib.import_module(name.strip())
+            preloaded.append(name.strip())
+        except Exception:
+            pass
+
+    def send(message):
+        proto_out.write(json.dumps(message).encode("utf-8") + b"\n")
+        proto_out.flush()
+
+    send({"ready": True, "preloaded": preloaded, "pid": os.getpid()})
+    sessions = {}
+    for line in proto_in:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            send({"ok": False, "error": "malformed request"})
+            continue
+        op = request.get("op")
+        if op == "exec":
+            send(_execute(request, sessions))
+        elif op == "reset":
+            sessions.pop(request.get("session", "default"), None)
+            send({"ok": True})
+        elif op == "sessions":
+            send({"ok": True, "sessions": sorted(sessions)})
+        else:
+            send({"ok": False, "error": f"unknown op: {op}"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Long-lived bash session driven through sentinel-framed commands.
+
+One bash process (no PTY, its own process group) runs every command of the
+session, so cwd, exported variables, activated virtualenvs and shell functions
+carry over between calls. Each command is passed through a quoted heredoc and
+run with `eval` inside a function, then followed by a unique sentinel on stdout
+(with the exit status) and on stderr; output is read until both sentinels arrive.
+
+A command that overruns its timeout is interrupted with SIGINT to the process
+group: while a command runs, bash's INT trap returns from that function, so the
+rest of the command (the next statement, the next loop iteration) is abandoned
+but the session survives. Children that ignore SIGINT then get SIGTERM/SIGKILL;
+only if bash itself is stuck is the session restarted. A command that exits the
+shell (`exit`, `set -e`) still gets its sentinels from an EXIT trap, so its
+output and status are reported along with the fact that the session ended.
+"""
+
+import codecs
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+MAX_OUTPUT_CHARS = 50000
+INTERRUPT_GRACE = 2.0
+
+# Runs once at startup. Between commands bash ignores SIGINT (children still get
+# the default action). While a command runs, SIGINT returns from __agent_run,
+# and the DEBUG trap (inherited by functions via `set -T`) returns from every
+# shell function the command called, so nothing after the interrupt runs.
+_BOOTSTRAP = b"""trap ':' INT
+__agent_run() {
+  __agent_abort=
+  trap '__agent_abort=1; return 130' INT
+  trap '[ -z "$__agent_abort" ] || [ -z "${FUNCNAME[0]}" ] || return 130' DEBUG
+  set -T
+  eval "$__agent_cmd"
+}
+__agent_exit() {
+  local status=$?
+  if [ -n "$__agent_token" ]; then
+    printf '%s %d exit\\n' "$__agent_token" "$status"
+    printf '%s\\n' "$__agent_token" >&2
+  fi
+}
+trap __agent_exit EXIT
+export PAGER=cat GIT_PAGER=cat TERM=dumb
+"""
+
+
+class ShellSessionError(RuntimeError):
+    """The bash process died or could not be recovered; it will be restarted."""
+
+
+class ShellSession:
+    def __init__(self, cwd: Optional[str] = None):
+        self.process = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+            bufsize=0,
+        )
+        self.process.stdin.write(_BOOTSTRAP)
+        self.lock = threading.Lock()
+        self._interrupted = threading.Event()
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(
+        self,
+        command: str,
+        timeout: float,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> Dict:
+        """
+        Run one command in the session. Returns {stdout, stderr, exit_code,
+        timed_out, session_exited}; session_exited means the command ended bash
+        itself. Raises ShellSessionError if bash dies or cannot be recovered.
+        """
+        token = f"__AGENT_LOOP_{uuid.uuid4().hex}"
+        frame = (
+            f"IFS= read -r -d '' __agent_cmd <<'{token}_EOF'\n"
+            f"{command}\n"
+            f"{token}_EOF\n"
+            f"__agent_token={token}\n"
+            "__agent_run < /dev/null\n"
+            "__agent_status=$?\n"
+            "trap - DEBUG; set +T; trap ':' INT\n"
+            "__agent_token=\n"
+            f"printf '{token} %d\\n' \"$__agent_status\"\n"
+            f"printf '{token}\\n' >&2\n"
+        )
+        with self.lock:
+            self._interrupted.clear()
+            try:
+                self.process.stdin.write(frame.encode("utf-8"))
+            except (OSError, ValueError):
+                raise ShellSessionError("bash session has exited")
+            return self._collect(token.encode("ascii"), timeout, on_output)
+
+    def environment(self, timeout: float = 5) -> Tuple[str, Dict[str, str]]:
+        """The session's current working directory and exported environment."""
+        result = self.run("pwd; env -0", timeout)
+        cwd, _, env = result["stdout"].partition("\n")
+        variables = dict(item.split("=", 1) for item in env.split("\0") if "=" in item)
+        return cwd, variables
+
+    def _collect(self, token: bytes, timeout: float, on_output) -> Dict:
+        names = {
+            self.process.stdout.fileno(): "stdout",
+            self.process.stderr.fileno(): "stderr",
+        }
+        decoders = {
+            name: codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for name in names.values()
+        }
+        pending = {name: b"" for name in names.values()}
+        parts = {name: [] for name in names.values()}
+        sizes = {name: 0 for name in names.values()}
+        done = set()
+        exit_code = None
+        exited = False
+        timed_out = False
+        deadline = time.monotonic() + timeout
+        escalation = 0
+
+        while len(done) < len(names):
+            if escalation == 0 and self._interrupted.is_set():
+                deadline = 0
+            if time.monotonic() >= deadline:
+                timed_out = timed_out or not self._interrupted.is_set()
+                escalation += 1
+                if escalation > 3:
+                    self.kill()
+                    raise ShellSessionError(
+                        "command could not be interrupted; the bash session was restarted"
+                    )
+                self._escalate(escalation)
+                deadline = time.monotonic() + INTERRUPT_GRACE
+            wait = min(0.2, max(0.0, deadline - time.monotonic()))
+            fds = [fd for fd, name in names.items() if name not in done]
+            readable, _, _ = select.select(fds, [], [], wait)
+            for fd in readable:
+                name = names[fd]
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise ShellSessionError(
+                        f"bash session exited (code {self.process.wait()})"
+                    )
+                data = pending[name] + chunk
+                marker = data.find(token)
+                if marker != -1:
+                    line_end = data.find(b"\n", marker)
+                    if line_end == -1:
+                        pending[name] = data
+                        continue
+                    if name == "stdout":
+                        status = data[marker + len(token) : line_end].split()
+                        exit_code = int(status[0]) if status else 0
+                        exited = status[1:] == [b"exit"]
+                    emit, pending[name] = data[:marker], b""
+                    done.add(name)
+                elif len(data) > len(token):
+                    # Hold back a tail that could be the start of the sentinel
+                    emit, pending[name] = data[: -len(token)], data[-len(token) :]
+                else:
+                    emit, pending[name] = b"", data
+                text = decoders[name].decode(emit, final=name in done)
+                if not text:
+                    continue
+                if on_output is not None:
+                    on_output(text)
+                room = MAX_OUTPUT_CHARS - sizes[name]
+                if room > 0:
+                    parts[name].append(text[:room])
+                sizes[name] += len(text)
+
+        if timed_out and not exit_code:
+            exit_code = 130
+        if exited:
+            self.kill()
+        result = {
+            "exit_code": exit_code,
+            "timed_out": timed_out,
+            "session_exited": exited,
+        }
+        for name in names.values():
+            text = "".join(parts[name])
+            if sizes[name] > MAX_OUTPUT_CHARS:
+                text += f"\n[... {sizes[name] - MAX_OUTPUT_CHARS} more characters truncated]"
+            result[name] = text
+        return result
+
+    def _children(self):
+        try:
+            result = subprocess.run(
+                ["pgrep", "-g", str(self.process.pid)],
+                capture_output=True,
+                text=True,
+                timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return []
+        return [
+            int(pid)
+            for pid in result.stdout.split()
+            if pid.isdigit() and int(pid) != self.process.pid
+        ]
+
+    def _escalate(self, step: int) -> None:
+        """Step 1: SIGINT the group; 2: SIGTERM children; 3: SIGKILL children."""
+        if step == 1:
+            try:
+                os.killpg(self.process.pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+            return
+        sig = signal.SIGTERM if step == 2 else signal.SIGKILL
+        for pid in self._children():
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def interrupt(self) -> None:
+        """Ask the running command (if any) to stop; the session itself survives."""
+        self._interrupted.set()
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
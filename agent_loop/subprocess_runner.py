@@ -0,0 +1,188 @@
+"""
+Shared async subprocess runner for the CLI-backed tools.
+
+Every command starts in its own process group, so stopping it also stops
+whatever it spawned (docker/kubectl plugins, node workers, shell pipelines).
+Captured output is capped while it is read. When the call times out, or the
+tool task is cancelled by CTRL+C, the whole group gets SIGTERM, then SIGKILL
+after a grace period, and the runner waits until the group is empty before
+returning, reporting how long the shutdown took.
+"""
+
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, Optional, Sequence
+
+from agent_loop.output import agent_info
+
+MAX_OUTPUT_BYTES = 200_000
+TERM_GRACE = 2.0
+# How long to wait for orphaned group members to disappear after SIGKILL
+REAP_TIMEOUT = 0.5
+
+
+async def _drain(stream: asyncio.StreamReader, limit: int, tail: bool) -> str:
+    kept = bytearray()
+    total = 0
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            break
+        total += len(chunk)
+        if tail:
+            kept += chunk
+            del kept[: max(0, len(kept) - limit)]
+        elif len(kept) < limit:
+            kept += chunk[: limit - len(kept)]
+    if total > limit and tail:
+        # Start at a line boundary rather than in the middle of a line
+        del kept[: kept.find(b"\n", 0, len(kept) - 1) + 1]
+    text = kept.decode("utf-8", errors="replace")
+    if total > len(kept):
+        if tail:
+            return f"[... {total - len(kept)} earlier bytes omitted]\n" + text
+        text += f"\n[... {total - limit} more bytes truncated]"
+    return text
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _signal_group(pgid: int, sig) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def terminate_group(
+    process: asyncio.subprocess.Process, grace: float = TERM_GRACE
+) -> Dict:
+    """
+    SIGTERM the process group, SIGKILL it if anything is left after `grace`,
+    reap the leader and wait for every group member to go away.
+    Returns {"signal": "SIGTERM"|"SIGKILL", "seconds": time to empty the group}.
+    """
+    started = time.monotonic()
+    pgid = process.pid
+    used = "SIGTERM"
+    _signal_group(pgid, signal.SIGTERM)
+    deadline = started + grace
+    while time.monotonic() < deadline:
+        if process.returncode is not None and not _group_alive(pgid):
+            break
+        try:
+            await asyncio.wait_for(process.wait(), 0.05)
+        except asyncio.TimeoutError:
+            pass
+    else:
+        used = "SIGKILL"
+        _signal_group(pgid, signal.SIGKILL)
+        await process.wait()
+        # Members that outlived the leader are reparented; wait until they are gone
+        while _group_alive(pgid) and time.monotonic() < deadline + REAP_TIMEOUT:
+            await asyncio.sleep(0.02)
+    await process.wait()
+    return {"signal": used, "seconds": round(time.monotonic() - started, 3)}
+
+
+async def run_command(
+    argv: Sequence[str],
+    timeout: float,
+    input: Optional[str] = None,
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    max_output: int = MAX_OUTPUT_BYTES,
+    keep_tail: bool = False,
+) -> Dict:
+    """
+    Run argv in a new process group and return {stdout, stderr, exit_code,
+    timed_out, stopped}. `stopped` describes the shutdown after a timeout.
+    Each stream keeps its first `max_output` bytes, or its last with `keep_tail`.
+    On cancellation the group is stopped before CancelledError propagates.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=(
+            asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL
+        ),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True,
+    )
+
+    async def communicate():
+        if input is not None:
+            process.stdin.write(input.encode("utf-8"))
+            await process.stdin.drain()
+            process.stdin.close()
+        stdout, stderr = await asyncio.gather(
+            _drain(process.stdout, max_output, keep_tail),
+            _drain(process.stderr, max_output, keep_tail),
+        )
+        await process.wait()
+        return stdout, stderr
+
+    task = asyncio.ensure_future(communicate())
+    try:
+        stdout, stderr = await asyncio.wait_for(asyncio.shield(task), timeout)
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "exit_code": process.returncode,
+            "timed_out": False,
+            "stopped": None,
+        }
+    except asyncio.TimeoutError:
+        stopped = await terminate_group(process)
+        stdout, stderr = await _partial(task)
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "exit_code": process.returncode,
+            "timed_out": True,
+            "stopped": stopped,
+        }
+    except asyncio.CancelledError:
+        stopped = await asyncio.shield(terminate_group(process))
+        task.cancel()
+        agent_info(
+            f"⏹️ Stopped {os.path.basename(argv[0])} (process group {process.pid}) "
+            f"with {stopped['signal']} in {stopped['seconds']:.2f}s"
+        )
+        raise
+
+
+async def _partial(task: asyncio.Future):
+    """Output read so far by a communicate() task whose process was stopped."""
+    try:
+        return await asyncio.wait_for(task, TERM_GRACE)
+    except (asyncio.TimeoutError, asyncio.CancelledError, OSError):
+        return "", ""
+
+
+def format_result(result: Dict, timeout: float) -> str:
+    """The STDOUT/STDERR/EXIT CODE block the CLI tools return to the model."""
+    output = (
+        f"STDOUT:\n{result['stdout']}\n"
+        f"STDERR:\n{result['stderr']}\n"
+        f"EXIT CODE: {result['exit_code']}"
+    )
+    if result["timed_out"]:
+        stopped = result["stopped"]
+        output += (
+            f"\n⚠️ Timed out after {timeout}s; the process group was stopped with "
+            f"{stopped['signal']} in {stopped['seconds']:.2f}s."
+        )
+    return output
@@ -0,0 +1,212 @@
+"""
+Persistent, ctags-like symbol index backing find_definition and find_references.
+
+Definitions and identifier references are extracted per file (see code_structure)
+and stored in an SQLite database under the agent-loop cache directory, one per
+root. Each lookup first re-parses only the files whose mtime or size changed.
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+from agent_loop.code_index import iter_source_files
+from agent_loop.code_structure import (
+    detect_language,
+    extract_definitions,
+    extract_references,
+)
+from agent_loop.utils import get_cache_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    parent TEXT
+);
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols(path);
+CREATE INDEX IF NOT EXISTS refs_name ON refs(name);
+CREATE INDEX IF NOT EXISTS refs_path ON refs(path);
+"""
+
+
+def open_symbol_index(root: str) -> sqlite3.Connection:
+    key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    conn = sqlite3.connect(os.path.join(get_cache_dir("symbol_index"), f"{key}.sqlite"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _drop_file(conn: sqlite3.Connection, rel_path: str) -> None:
+    for table in ("symbols", "refs", "files"):
+        conn.execute(f"DELETE FROM {table} WHERE path = ?", (rel_path,))
+
+
+def _index_file(
+    conn: sqlite3.Connection, root: str, rel_path: str, mtime_ns: int, size: int
+) -> None:
+    _drop_file(conn, rel_path)
+    conn.execute(
+        "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+        (rel_path, mtime_ns, size),
+    )
+    try:
+        with open(
+            os.path.join(root, rel_path), "r", encoding="utf-8", errors="replace"
+        ) as f:
+            text = f.read()
+    except OSError:
+        return
+    conn.executemany(
+        "INSERT INTO symbols (path, name, qualname, kind, line, end_line, parent) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                rel_path,
+                d["name"],
+                d["qualname"],
+                d["kind"],
+                d["line"],
+                d["end_line"],
+                d["parent"],
+            )
+            for d in extract_definitions(rel_path, text)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO refs (path, name, line, col) VALUES (?, ?, ?, ?)",
+        [
+            (rel_path, r["name"], r["line"], r["col"])
+            for r in extract_references(rel_path, text)
+        ],
+    )
+
+
+def refresh_symbol_index(conn: sqlite3.Connection, root: str) -> Dict:
+    """Re-parse files that changed since the last lookup and drop deleted ones."""
+    known = {
+        path: (mtime_ns, size)
+        for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM files"
+        )
+    }
+    seen = set()
+    updated = 0
+    with conn:
+        for rel_path, mtime_ns, size in iter_source_files(root):
+            if detect_language(rel_path) is None:
+                continue
+            seen.add(rel_path)
+            if known.get(rel_path) == (mtime_ns, size):
+                continue
+            _index_file(conn, root, rel_path, mtime_ns, size)
+            updated += 1
+        removed = [path for path in known if path not in seen]
+        for rel_path in removed:
+            _drop_file(conn, rel_path)
+    return {"files": len(seen), "updated": updated, "removed": len(removed)}
+
+
+class _LineReader:
+    """Reads each file at most once per lookup to attach source lines to results."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, List[str]] = {}
+
+    def line(self, rel_path: str, number: int) -> str:
+        if rel_path not in self.files:
+            try:
+                with open(
+                    os.path.join(self.root, rel_path),
+                    "r",
+                    encoding="utf-8",
+                    errors="replace",
+                ) as f:
+                    self.files[rel_path] = f.read().splitlines()
+            except OSError:
+                self.files[rel_path] = []
+        lines = self.files[rel_path]
+        return lines[number - 1].strip() if 0 < number <= len(lines) else ""
+
+
+def find_definitions(
+    root: str, symbol: str, kind: Optional[str] = None, limit: int = 20
+) -> List[Dict]:
+    """
+    Locate definitions of a symbol. A dotted name (e.g. 'AgentLoop.run_loop')
+    matches qualified names exactly or as a suffix; a plain name matches by name.
+    """
+    root = os.path.abspath(root)
+    conn = open_symbol_index(root)
+    try:
+        refresh_symbol_index(conn, root)
+        name = symbol.rsplit(".", 1)[-1]
+        query = (
+            "SELECT path, qualname, kind, line, end_line FROM symbols WHERE name = ?"
+        )
+        params: list = [name]
+        if "." in symbol:
+            query += " AND (qualname = ? OR qualname LIKE ?)"
+            params += [symbol, f"%.{symbol}"]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY kind = 'variable', path, line LIMIT ?"
+        params.append(limit)
+        reader = _LineReader(root)
+        return [
+            {
+                "location": f"{os.path.relpath(os.path.join(root, path))}:{line}-{end_line}",
+                "qualname": qualname,
+                "kind": kind,
+                "text": reader.line(path, line),
+            }
+            for path, qualname, kind, line, end_line in conn.execute(query, params)
+        ]
+    finally:
+        conn.close()
+
+
+def find_symbol_references(root: str, symbol: str, limit: int = 50) -> Dict:
+    """Locate identifier occurrences of a symbol, returning a total and the first `limit` hits."""
+    root = os.path.abspath(root)
+    conn = open_symbol_index(root)
+    try:
+        refresh_symbol_index(conn, root)
+        name = symbol.rsplit(".", 1)[-1]
+        total = conn.execute(
+            "SELECT COUNT(*) FROM refs WHERE name = ?", (name,)
+        ).fetchone()[0]
+        reader = _LineReader(root)
+        references = [
+            {
+                "location": f"{os.path.relpath(os.path.join(root, path))}:{line}:{col}",
+                "text": reader.line(path, line),
+            }
+            for path, line, col in conn.execute(
+                "SELECT path, line, col FROM refs WHERE name = ? ORDER BY path, line, col LIMIT ?",
+                (name, limit),
+            )
+        ]
+        return {"total": total, "references": references}
+    finally:
+        conn.close()
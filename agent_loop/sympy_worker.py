@@ -0,0 +1,382 @@
+"""
+SymPy worker process behind the `sympy` tool, run through agent_loop.worker_pool.
+
+SymPy is imported here, once per worker, so the agent process never loads it.
+Each request is evaluated under a wall-clock alarm; SIGALRM and SIGINT
+interrupt the computation between bytecodes and the worker answers with an
+error but stays warm. The pool's own timeout is the backstop for work stuck in
+C code. Results are memoised in an LRU keyed by the operation, the
+canonical form of the parsed expression (srepr, which includes the symbol
+assumptions) and the remaining arguments, so repeating a step is free.
+
+The `evaluate` operation compiles the expression with lambdify (NumPy when it
+is installed, otherwise the math module applied point by point) and evaluates
+it over a grid in one call. Compiled functions are cached separately from the
+symbolic results, so sweeping a formula over different grids compiles it once.
+
+Requests: {"op": "run", "operation", "expression", "variables", "assumptions",
+"point", "grid", "mesh", "output", "max_points", "timeout", "max_chars"} and
+{"op": "stats"}.
+Environment: AGENT_LOOP_SYMPY_MEMORY_MB (address-space limit, 0 = none).
+"""
+
+import json
+import math
+import os
+import signal
+import sys
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import sympy as sp
+
+MEMO_SIZE = 512
+COMPILED_SIZE = 128
+MAX_GRID_POINTS = 1_000_000 if np is not None else 100_000
+ASSUMPTIONS = ("positive", "real", "integer")
+
+
+# BaseException, so sympy's broad `except Exception` handlers cannot swallow it
+class Interrupted(BaseException):
+    pass
+
+
+_busy = False
+
+
+def _on_signal(signum, frame):
+    # A signal that lands between requests has nothing to interrupt
+    if not _busy:
+        return
+    raise Interrupted(
+        "time limit exceeded" if signum == signal.SIGALRM else "interrupted"
+    )
+
+
+def _symbols(variables, assumptions):
+    flags = {
+        a.strip(): True
+        for a in (assumptions or "").split(",")
+        if a.strip() in ASSUMPTIONS
+    }
+    names = [v.strip() for v in (variables or "x").split(",") if v.strip()] or ["x"]
+    return names, {name: sp.symbols(name, **flags) for name in names}
+
+
+def _point(point_str):
+    if point_str in ("infinity", "-infinity"):
+        point_str = point_str.replace("infinity", "oo")
+    # Keep exact points exact: 1/3 stays a Rational and pi stays symbolic
+    return sp.sympify(point_str) if point_str else sp.Integer(0)
+
+
+def _matrix(expr):
+    matrix = sp.Matrix(expr)
+    det = matrix.det()
+    inv = matrix.inv() if det != 0 else "Singular matrix (no inverse)"
+    return (
+        f"Matrix:\n{matrix}\n"
+        f"Determinant: {det}\n"
+        f"Inverse:\n{inv}\n"
+        f"Eigenvalues: {matrix.eigenvals()}"
+    )
+
+
+def _compute(operation, expr, main_var, point_str):
+    if operation == "solve":
+        return f"Solutions: {sp.solve(expr, main_var)}"
+    if operation == "factor":
+        return f"Factorized: {sp.factor(expr)}"
+    if operation == "expand":
+        return f"Expanded: {sp.expand(expr)}"
+    if operation == "simplify":
+        return f"Simplified: {sp.simplify(expr)}"
+    if operation == "limit":
+        point = _point(point_str)
+        return f"Limit as {main_var} → {point}: {sp.limit(expr, main_var, point)}"
+    if operation == "differentiate":
+        return f"Derivative with respect to {main_var}: {sp.diff(expr, main_var)}"
+    if operation == "integrate":
+        return f"Indefinite integral with respect to {main_var}: {sp.integrate(expr, main_var)}"
+    if operation == "series":
+        return f"Series expansion around {main_var}=0: {expr.series(main_var, n=5)}"
+    if operation == "matrix":
+        try:
+            return _matrix(expr)
+        except Exception:
+            return "Invalid matrix format. Use [[a,b],[c,d]] syntax."
+    return f"Unsupported operation: {operation}"
+
+
+def _axis(name, spec):
+    if isinstance(spec, list):
+        values = [float(v) for v in spec]
+    elif isinstance(spec, dict) and "num" in spec:
+        start, stop, num = float(spec["start"]), float(spec["stop"]), int(spec["num"])
+        step = (stop - start) / (num - 1) if num > 1 else 0.0
+        values = [start + i * step for i in range(num)]
+    elif isinstance(spec, dict) and "step" in spec:
+        start, stop, step = (
+            float(spec["start"]),
+            float(spec["stop"]),
+            float(spec["step"]),
+        )
+        if step <= 0:
+            raise ValueError(f"grid '{name}': step must be positive")
+        values = [
+            start + i * step for i in range(int((stop - start) / step + 1e-9) + 1)
+        ]
+    else:
+        raise ValueError(
+            f"grid '{name}' must be a list of numbers, {{start, stop, num}} or {{start, stop, step}}"
+        )
+    if not values:
+        raise ValueError(f"grid '{name}' is empty")
+    return values
+
+
+def _grid_points(grid, mesh):
+    """Input columns for every grid point: the cartesian product or a zip of the axes."""
+    axes = [_axis(name, spec) for name, spec in grid.items()]
+    if mesh:
+        total = 1
+        for axis in axes:
+            total *= len(axis)
+    else:
+        if len({len(axis) for axis in axes}) > 1:
+            raise ValueError(
+                "with mesh=false every grid axis must have the same length"
+            )
+        total = len(axes[0])
+    if total > MAX_GRID_POINTS:
+        raise ValueError(f"grid has {total} points, limit is {MAX_GRID_POINTS}")
+    if not mesh:
+        return axes
+    if np is not None:
+        return [
+            column.ravel()
+            for column in np.meshgrid(*map(np.asarray, axes), indexing="ij")
+        ]
+    columns = [[] for _ in axes]
+    stride = total
+    for index, axis in enumerate(axes):
+        stride //= len(axis)
+        repeat = total // (stride * len(axis))
+        columns[index] = [v for v in axis for _ in range(stride)] * repeat
+    return columns
+
+
+def _compile(expr, names, symbols, compiled):
+    key = (sp.srepr(expr), tuple(names), np is not None)
+    if key in compiled:
+        compiled.move_to_end(key)
+        return compiled[key]
+    function = sp.lambdify(
+        [symbols[name] for name in names], expr, "numpy" if np is not None else "math"
+    )
+    compiled[key] = function
+    if len(compiled) > COMPILED_SIZE:
+        compiled.popitem(last=False)
+    return function
+
+
+def _values(function, columns, total):
+    """Values at every grid point (an array with NumPy, else a list), NaN where undefined."""
+    if np is not None:
+        with np.errstate(all="ignore"):
+            columns = [np.asarray(column, dtype=float) for column in columns]
+            values = np.broadcast_to(np.asarray(function(*columns)), (total,))
+        if np.iscomplexobj(values):
+            if np.nanmax(np.abs(values.imag), initial=0.0) > 1e-12:
+                raise ValueError(
+                    "expression is complex on the grid; evaluate re() or abs() of it"
+                )
+            values = values.real
+        return values.astype(float)
+    values = []
+    for point in zip(*columns):
+        try:
+            value = complex(function(*point))
+            values.append(value.real if abs(value.imag) <= 1e-12 else float("nan"))
+        except (ValueError, ZeroDivisionError, OverflowError):
+            values.append(float("nan"))
+    return values
+
+
+def _statistics(values):
+    """(finite count, index of min, index of max, mean, std) over the finite values."""
+    if np is not None:
+        finite = np.isfinite(values)
+        count = int(finite.sum())
+        if not count:
+            return 0, None, None, None, None
+        masked = values[finite]
+        indices = np.flatnonzero(finite)
+        return (
+            count,
+            int(indices[masked.argmin()]),
+            int(indices[masked.argmax()]),
+            float(masked.mean()),
+            float(masked.std()),
+        )
+    finite = [(v, i) for i, v in enumerate(values) if math.isfinite(v)]
+    if not finite:
+        return 0, None, None, None, None
+    mean = sum(v for v, _ in finite) / len(finite)
+    std = math.sqrt(sum((v - mean) ** 2 for v, _ in finite) / len(finite))
+    return len(finite), min(finite)[1], max(finite)[1], mean, std
+
+
+def _number(value):
+    return value if math.isfinite(value) else str(value)
+
+
+def _evaluate(request, symbols, expr, compiled):
+    grid = request.get("grid") or {}
+    if not grid:
+        raise ValueError(
+            '\'grid\' is required for evaluate, e.g. {"x": {"start": 0, "stop": 1, "num": 101}}'
+        )
+    names = list(grid)
+    unbound = sorted(str(s) for s in expr.free_symbols if str(s) not in grid)
+    if unbound:
+        raise ValueError(f"no grid values for: {', '.join(unbound)}")
+    columns = _grid_points(grid, request.get("mesh", True))
+    total = len(columns[0])
+    values = _values(_compile(expr, names, symbols, compiled), columns, total)
+
+    count, low, high, mean, std = _statistics(values)
+    summary = {
+        "points": total,
+        "finite": count,
+        "backend": "numpy" if np is not None else "math",
+    }
+    if count:
+
+        def at(index):
+            return {
+                "value": float(values[index]),
+                **{n: float(columns[k][index]) for k, n in enumerate(names)},
+            }
+
+        summary.update(min=at(low), max=at(high), mean=mean, std=std)
+    if request.get("output") == "series":
+        max_points = max(2, int(request.get("max_points") or 50))
+        step = max(1, math.ceil((total - 1) / (max_points - 1)))
+        indices = list(range(0, total, step))
+        if indices[-1] != total - 1:
+            indices.append(total - 1)
+        summary["columns"] = names + [str(expr)]
+        summary["series"] = [
+            [float(columns[k][i]) for k in range(len(names))]
+            + [_number(float(values[i]))]
+            for i in indices
+        ]
+    return json.dumps(summary, separators=(",", ":"))
+
+
+def _run(request, memo, compiled):
+    operation = request["operation"]
+    names, symbols = _symbols(request.get("variables"), request.get("assumptions"))
+    if operation == "evaluate":
+        for name in request.get("grid") or {}:
+            symbols.setdefault(name, sp.symbols(name))
+    expr = sp.sympify(request["expression"], locals=symbols)
+    if operation == "evaluate":
+        return _evaluate(request, symbols, expr, compiled), False
+    key = (
+        operation,
+        sp.srepr(expr),
+        tuple(names),
+        request.get("assumptions") or "",
+        request.get("point") or "",
+    )
+    if key in memo:
+        memo.move_to_end(key)
+        return memo[key], True
+    result = _compute(operation, expr, symbols[names[0]], request.get("point") or "")
+    memo[key] = result
+    if len(memo) > MEMO_SIZE:
+        memo.popitem(last=False)
+    return result, False
+
+
+def _execute(request, memo, compiled):
+    global _busy
+    timeout = request.get("timeout") or 0
+    _busy = True
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result, cached = _run(request, memo, compiled)
+    except Interrupted as e:
+        return {"ok": False, "error": str(e), "interrupted": True}
+    except MemoryError:
+        return {"ok": False, "error": "memory limit exceeded"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        _busy = False
+    limit = request.get("max_chars") or 0
+    if limit and len(result) > limit:
+        result = (
+            result[:limit] + f"\n[... {len(result) - limit} more characters truncated]"
+        )
+    return {"ok": True, "result": result, "cached": cached}
+
+
+def main():
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    sys.stdin = open(os.devnull, "r")
+
+    signal.signal(signal.SIGALRM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+    if resource is not None:
+        memory_mb = int(os.environ.get("AGENT_LOOP_SYMPY_MEMORY_MB") or 0)
+        if memory_mb > 0:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    def send(message):
+        proto_out.write(json.dumps(message).encode("utf-8") + b"\n")
+        proto_out.flush()
+
+    send({"ready": True, "pid": os.getpid()})
+    memo = OrderedDict()
+    compiled = OrderedDict()
+    for line in proto_in:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            send({"ok": False, "error": "malformed request"})
+            continue
+        op = request.get("op")
+        if op == "run":
+            try:
+                response = _execute(request, memo, compiled)
+            except Interrupted as e:
+                # The signal arrived while the request was being wrapped up
+                response = {"ok": False, "error": str(e), "interrupted": True}
+            send(response)
+        elif op == "stats":
+            send({"ok": True, "memo": len(memo), "compiled": len(compiled)})
+        else:
+            send({"ok": False, "error": f"unknown op: {op}"})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,37 @@
-import subprocess
+import asyncio
+import json
+import os
+
+from agent_loop.cloud_cli import MAX_PARALLEL, MAX_TARGETS, fan_out, run_cached
+from agent_loop.jobs import background_message, start_job
+from agent_loop.projection import compact_json, to_table
+from agent_loop.subprocess_runner import format_result
+
+try:
+    import jmespath
+    from jmespath.exceptions import JMESPathError
+except ImportError:
+    from agent_loop import jmespath_lite as jmespath
+    from agent_loop.jmespath_lite import JMESPathError
+
+TIMEOUT = 15
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+# Items requested per CLI call while following NextToken
+PAGE_ITEMS = 100
+MAX_PAGES = 50
+MAX_PAGE_BYTES = 10_000_000
+CACHE_TTL = 300
+# Variables that select the account or region, so they are part of the cache key
+ENV_KEYS = (
+    "AWS_PROFILE",
+    "AWS_DEFAULT_PROFILE",
+    "AWS_REGION",
+    "AWS_DEFAULT_REGION",
+    "AWS_ACCESS_KEY_ID",
+    "AWS_CONFIG_FILE",
+    "AWS_SHARED_CREDENTIALS_FILE",
+)
 
 # Define allowed services and read-only operations
 ALLOWED_SERVICES = {
@@ -17,7 +50,14 @@ ALLOWED_VERBS = {"list", "describe", "get"}
 
 tool_definition = {
     "name": "aws_cli",
-    "description": "Run AWS CLI v2 read-only commands to interact with AWS services",
+    "description": (
+        "Run AWS CLI v2 read-only commands to interact with AWS services. "
+        "Results are cached for a few minutes (pass 'fresh' to re-run). "
+        "Give 'regions' to run the same command in several regions concurrently and get one merged result. "
+        "For large describe/list outputs pass a JMESPath 'query' (applied locally to every page, e.g. "
+        "\"Reservations[].Instances[] | [?State.Name=='running'].{id: InstanceId, type: InstanceType}\"), "
+        "a row 'limit' and 'format' json or table: pages are followed via NextToken until the limit is reached."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
@@ -28,7 +68,35 @@ tool_definition = {
                     "'s3 ls', 'ec2 describe-instances', or 'sts get-caller-identity'. "
                     "Only safe read-only operations are allowed."
                 ),
-            }
+            },
+            "regions": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": f"Run the command once per region (max {MAX_TARGETS}) and merge the outputs by region",
+            },
+            "query": {
+                "type": "string",
+                "description": "JMESPath expression applied locally to each page of JSON output; list results become rows",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum rows to return when paginating (default: {DEFAULT_LIMIT}, max: {MAX_LIMIT})",
+            },
+            "format": {
+                "type": "string",
+                "enum": ["json", "table"],
+                "description": "Output for 'query'/'limit' results: compact JSON rows or a tab-separated table (default: json)",
+            },
+            "fresh": {
+                "type": "boolean",
+                "description": "Bypass the result cache (default: false)",
+                "default": False,
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Run as a background job and return its id immediately (see the jobs tool)",
+                "default": False,
+            },
         },
         "required": ["args"],
     },
@@ -44,9 +112,150 @@ def is_safe_aws_command(cmd: list) -> bool:
     )
 
 
-def handle_call(input_data):
+def _without_output(cmd: list) -> list:
+    """Drop any --output option; paginated reads always ask for JSON."""
+    kept = []
+    skip = False
+    for arg in cmd:
+        if skip:
+            skip = False
+        elif arg == "--output":
+            skip = True
+        elif not arg.startswith("--output="):
+            kept.append(arg)
+    return kept
+
+
+def _page_rows(page, expression) -> list:
+    """Rows of one page: the query result, or the page's list-valued keys."""
+    if expression is not None:
+        value = expression.search(page)
+    elif isinstance(page, dict):
+        lists = [items for items in page.values() if isinstance(items, list)]
+        value = [row for items in lists for row in items] if lists else page
+    else:
+        value = page
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+async def _collect(cmd, expression, limit, fresh):
+    """
+    Follow NextToken until more than `limit` rows are read or the pages run out.
+    Returns (rows, more, failed), where failed is the run_command result of a
+    page that could not be read.
+    """
+    paginate = not any(
+        flag in cmd for flag in ("--max-items", "--no-paginate", "--starting-token")
+    )
+    rows, token = [], None
+    for _ in range(MAX_PAGES):
+        argv = [*_without_output(cmd), "--output", "json"]
+        if paginate:
+            argv += ["--max-items", str(PAGE_ITEMS)]
+            if token:
+                argv += ["--starting-token", token]
+        result = await run_cached(
+            "aws_cli", argv, TIMEOUT, CACHE_TTL, fresh, ENV_KEYS, MAX_PAGE_BYTES
+        )
+        if result["exit_code"] != 0 or result["timed_out"]:
+            # Operations without a paginator reject --max-items
+            if paginate and not rows and "--max-items" in result["stderr"]:
+                paginate = False
+                continue
+            return rows[:limit], False, result
+        try:
+            page = json.loads(result["stdout"])
+        except ValueError:
+            return rows[:limit], False, result
+        token = page.pop("NextToken", None) if isinstance(page, dict) else None
+        rows.extend(_page_rows(page, expression))
+        if len(rows) > limit or not token or not paginate:
+            break
+    return rows[:limit], len(rows) > limit or bool(token), None
+
+
+def _failure(result) -> str:
+    if result["timed_out"]:
+        return f"timed out after {TIMEOUT}s"
+    if result["exit_code"] != 0:
+        return result["stderr"].strip() or f"exit code {result['exit_code']}"
+    return "output is not JSON"
+
+
+async def _collect_regions(cmd, regions, expression, limit, fresh):
+    """_collect per region, concurrently; rows are tagged with their region."""
+    semaphore = asyncio.Semaphore(MAX_PARALLEL)
+
+    async def collect_one(region):
+        async with semaphore:
+            return await _collect([*cmd, "--region", region], expression, limit, fresh)
+
+    regions = list(dict.fromkeys(regions))
+    outcomes = await asyncio.gather(*(collect_one(region) for region in regions))
+    rows, more, errors = [], False, {}
+    for region, (region_rows, region_more, failed) in zip(regions, outcomes):
+        rows.extend(
+            (
+                {"region": region, **row}
+                if isinstance(row, dict)
+                else {"region": region, "value": row}
+            )
+            for row in region_rows
+        )
+        more = more or region_more
+        if failed:
+            errors[region] = _failure(failed)
+    return rows[:limit], more or len(rows) > limit, errors
+
+
+def _render(rows, more, errors, fmt, limit) -> str:
+    if fmt == "table":
+        output = to_table(rows) if rows else "(no rows)"
+        if more:
+            output += (
+                f"\n[... more rows; raise 'limit' (now {limit}) or narrow 'query']"
+            )
+        for region, error in errors.items():
+            output += f"\n⚠️ {region}: {error}"
+        return output
+    result = {"rows": rows, "returned": len(rows), "truncated": more}
+    if errors:
+        result["errors"] = errors
+    return compact_json(result)
+
+
+async def _structured(cmd, input_data, regions, fresh) -> str:
+    try:
+        expression = (
+            jmespath.compile(input_data["query"]) if input_data.get("query") else None
+        )
+    except JMESPathError as e:
+        return f"⚠️ Invalid JMESPath query: {e}"
+    limit = min(max(1, int(input_data.get("limit") or DEFAULT_LIMIT)), MAX_LIMIT)
+    fmt = input_data.get("format", "json")
+    try:
+        if regions:
+            rows, more, errors = await _collect_regions(
+                cmd, regions, expression, limit, fresh
+            )
+        else:
+            rows, more, failed = await _collect(cmd, expression, limit, fresh)
+            if failed:
+                return format_result(failed, TIMEOUT)
+            errors = {}
+    except JMESPathError as e:
+        return f"⚠️ JMESPath query failed: {e}"
+    return _render(rows, more, errors, fmt, limit)
+
+
+async def handle_call(input_data):
     args = input_data["args"]
-    cmd = ["aws"] + args.strip().split()
+    # Override to run a stand-in executable
+    cmd = [os.environ.get("AGENT_LOOP_AWS_CLI", "aws")] + args.strip().split()
+    regions = input_data.get("regions") or []
+    fresh = input_data.get("fresh", False)
 
     if not is_safe_aws_command(cmd):
         return (
@@ -56,14 +265,38 @@ def handle_call(input_data):
             "Example: 'aws ec2 describe-instances'"
         )
 
+    if input_data.get("background"):
+        if regions:
+            return "⚠️ 'regions' cannot be combined with 'background'."
+        try:
+            return background_message(start_job(cmd))
+        except Exception as e:
+            return f"Error executing AWS CLI command: {e}"
+
+    if regions and "--region" in cmd:
+        return "⚠️ Pass either '--region' in args or 'regions', not both."
+    if len(regions) > MAX_TARGETS:
+        return f"⚠️ At most {MAX_TARGETS} regions per call."
+
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        return (
-            f"STDOUT:\n{result.stdout}\n"
-            f"STDERR:\n{result.stderr}\n"
-            f"EXIT CODE: {result.returncode}"
-        )
-    except subprocess.TimeoutExpired:
-        return "AWS CLI command timed out."
+        if any(input_data.get(key) for key in ("query", "limit", "format")):
+            return await _structured(cmd, input_data, regions, fresh)
+        if regions:
+            return await fan_out(
+                "aws_cli",
+                cmd,
+                "--region",
+                regions,
+                TIMEOUT,
+                CACHE_TTL,
+                fresh,
+                ENV_KEYS,
+            )
+
+        result = await run_cached("aws_cli", cmd, TIMEOUT, CACHE_TTL, fresh, ENV_KEYS)
+        output = format_result(result, TIMEOUT)
+        if result["cached"]:
+            output += "\n♻️ Cached result; pass fresh=true to re-run."
+        return output
     except Exception as e:
         return f"Error executing AWS CLI command: {e}"
@@ -1,4 +1,12 @@
-import subprocess
+import os
+
+from agent_loop.cloud_cli import MAX_TARGETS, fan_out, run_cached
+from agent_loop.subprocess_runner import format_result
+
+TIMEOUT = 15
+CACHE_TTL = 300
+# Variables that select the profile, so they are part of the cache key
+ENV_KEYS = ("AZURE_CONFIG_DIR", "AZURE_SUBSCRIPTION_ID", "AZURE_DEFAULTS_GROUP")
 
 # Define allowed services and read-only operations
 ALLOWED_SERVICES = {
@@ -16,7 +24,11 @@ ALLOWED_VERBS = {"list", "show", "display", "get"}
 
 tool_definition = {
     "name": "azure_cli",
-    "description": "Run Azure CLI read-only commands to interact with Azure services.",
+    "description": (
+        "Run Azure CLI read-only commands to interact with Azure services. "
+        "Results are cached for a few minutes (pass 'fresh' to re-run). "
+        "Give 'subscriptions' to run the same command in several subscriptions concurrently and get one merged result."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
@@ -27,7 +39,17 @@ tool_definition = {
                     "'vm list', 'group show', or 'account show'. "
                     "Only safe read-only operations are allowed."
                 ),
-            }
+            },
+            "subscriptions": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": f"Run the command once per subscription name or id (max {MAX_TARGETS}) and merge the outputs",
+            },
+            "fresh": {
+                "type": "boolean",
+                "description": "Bypass the result cache (default: false)",
+                "default": False,
+            },
         },
         "required": ["args"],
     },
@@ -43,9 +65,12 @@ def is_safe_azure_command(cmd: list) -> bool:
     )
 
 
-def handle_call(input_data):
+async def handle_call(input_data):
     args = input_data["args"]
-    cmd = ["az"] + args.strip().split()
+    # Override to run a stand-in executable
+    cmd = [os.environ.get("AGENT_LOOP_AZURE_CLI", "az")] + args.strip().split()
+    subscriptions = input_data.get("subscriptions") or []
+    fresh = input_data.get("fresh", False)
 
     if not is_safe_azure_command(cmd):
         return (
@@ -56,13 +81,26 @@ def handle_call(input_data):
         )
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        return (
-            f"STDOUT:\n{result.stdout}\n"
-            f"STDERR:\n{result.stderr}\n"
-            f"EXIT CODE: {result.returncode}"
-        )
-    except subprocess.TimeoutExpired:
-        return "Azure CLI command timed out."
+        if subscriptions:
+            if "--subscription" in cmd:
+                return "⚠️ Pass either '--subscription' in args or 'subscriptions', not both."
+            if len(subscriptions) > MAX_TARGETS:
+                return f"⚠️ At most {MAX_TARGETS} subscriptions per call."
+            return await fan_out(
+                "azure_cli",
+                cmd,
+                "--subscription",
+                subscriptions,
+                TIMEOUT,
+                CACHE_TTL,
+                fresh,
+                ENV_KEYS,
+            )
+
+        result = await run_cached("azure_cli", cmd, TIMEOUT, CACHE_TTL, fresh, ENV_KEYS)
+        output = format_result(result, TIMEOUT)
+        if result["cached"]:
+            output += "\n♻️ Cached result; pass fresh=true to re-run."
+        return output
     except Exception as e:
         return f"Error executing Azure CLI command: {e}"
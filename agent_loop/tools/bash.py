@@ -1,24 +1,97 @@
-import subprocess
+import asyncio
+import os
+import sys
+import threading
+
+from agent_loop.jobs import background_message, start_job
+from agent_loop.shell_session import ShellSession, ShellSessionError
+
+DEFAULT_TIMEOUT = 60
+MAX_TIMEOUT = 600
 
 tool_definition = {
     "name": "bash",
-    "description": "Execute bash commands",
+    "description": (
+        "Execute bash commands in a persistent shell session: the working directory, exported variables, "
+        "activated virtualenvs and shell functions carry over between calls. A command that exceeds its "
+        "timeout is interrupted without losing the session. Commands get no stdin. Set 'background' for "
+        "long-running commands (builds, test suites): they run as a job in the session's cwd and environment "
+        "and return a job id for the jobs tool immediately."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
             "command": {"type": "string", "description": "Shell command to execute"},
+            "timeout": {
+                "type": "integer",
+                "description": f"Seconds before the command is interrupted (default: {DEFAULT_TIMEOUT}, max: {MAX_TIMEOUT})",
+                "default": DEFAULT_TIMEOUT,
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Run as a background job and return its id immediately",
+                "default": False,
+            },
+            "restart": {
+                "type": "boolean",
+                "description": "Start a fresh shell session (clears cwd, variables and functions) before running",
+                "default": False,
+            },
         },
         "required": ["command"],
     },
 }
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session(restart=False):
+    global _session
+    with _session_lock:
+        if _session is not None and (restart or not _session.alive()):
+            _session.kill()
+            _session = None
+        if _session is None:
+            _session = ShellSession(cwd=os.getcwd())
+        return _session
+
 
-def handle_call(input_data):
+def _stream(text):
+    # Echo output to the terminal as it arrives; the model gets the capped copy
+    if sys.stdout.isatty():
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def _run(session, command, timeout):
+    return session.run(command, timeout, on_output=_stream)
+
+
+async def handle_call(input_data):
     command = input_data["command"]
+    timeout = max(1, min(int(input_data.get("timeout", DEFAULT_TIMEOUT)), MAX_TIMEOUT))
     try:
-        result = subprocess.run(
-            ["bash", "-c", command], capture_output=True, text=True, timeout=10
-        )
-        return f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}\nEXIT CODE: {result.returncode}"
+        session = _get_session(restart=input_data.get("restart", False))
+        if input_data.get("background"):
+            cwd, env = await asyncio.to_thread(session.environment)
+            job = start_job(["bash", "-c", command], label=command, cwd=cwd, env=env)
+            return background_message(job)
+        try:
+            result = await asyncio.to_thread(_run, session, command, timeout)
+        except asyncio.CancelledError:
+            # CTRL+C: stop the command but keep the session
+            session.interrupt()
+            raise
+    except ShellSessionError as e:
+        _get_session(restart=True)
+        return f"Error executing bash: {e}. A new shell session was started; cwd and variables were reset."
     except Exception as e:
         return f"Error executing bash: {e}"
+
+    output = f"STDOUT:\n{result['stdout']}\nSTDERR:\n{result['stderr']}\nEXIT CODE: {result['exit_code']}"
+    if result["timed_out"]:
+        output += f"\n⚠️ Command timed out after {timeout}s and was interrupted; the shell session is still alive."
+    if result["session_exited"]:
+        output += "\n⚠️ The command exited the shell; the next command starts a new session with cwd and variables reset."
+    return output
@@ -1,12 +1,37 @@
+import asyncio
+import math
+import shutil
+import threading
+from datetime import datetime, timezone
+
 import plotext as plt
-import time
+
+from agent_loop.datafile import read_columns, to_numbers, to_timestamps
+from agent_loop.downsample import (
+    AGGREGATES,
+    bin_aggregate,
+    grid_thin,
+    group_aggregate,
+    histogram,
+    lttb,
+)
+
+DEFAULT_BINS = 20
+# Points kept per terminal column for lines; two keep steep edges visible
+POINTS_PER_COLUMN = 2
+
+# plotext keeps the figure in module state, so only one render at a time
+_render_lock = threading.Lock()
 
 tool_definition = {
     "name": "cli_plot",
     "description": (
         "This is the default plotting and charting tool."
         "Render advanced terminal charts using plotext. Use this to visualize data in the terminal, for charts, graphs, plots, etc. that have not to be saved to a file."
-        "Supports line, scatter, bar, histogram, datetime, log-scales, subplots, styling, and streaming."
+        "Supports line, scatter, bar, histogram, datetime, log-scales, subplots, styling, and streaming. "
+        "Large series are downsampled to the plot width automatically (shape-preserving for lines, pre-binned for histograms). "
+        "To chart a local CSV/TSV/JSON-lines file, give a series a 'source' with the file path and column names instead "
+        "of inline x/y: the file is read and binned locally, so never read it into the conversation first."
     ),
     "input_schema": {
         "type": "object",
@@ -27,8 +52,50 @@ tool_definition = {
                         "color": {"type": "string"},
                         "marker": {"type": "string"},
                         "fill": {"type": "boolean"},
+                        "bins": {
+                            "type": "integer",
+                            "description": f"Number of histogram bins (default: {DEFAULT_BINS})",
+                        },
+                        "source": {
+                            "type": "object",
+                            "properties": {
+                                "path": {
+                                    "type": "string",
+                                    "description": "Local .csv, .tsv or .jsonl file",
+                                },
+                                "format": {
+                                    "type": "string",
+                                    "enum": ["csv", "tsv", "jsonl"],
+                                    "description": "File format (default: from the extension)",
+                                },
+                                "x": {
+                                    "type": "string",
+                                    "description": "Column for x (numbers, ISO datetimes or categories; default: row number)",
+                                },
+                                "y": {
+                                    "type": "string",
+                                    "description": "Column for y (dotted paths reach into JSON objects)",
+                                },
+                                "where": {
+                                    "type": "array",
+                                    "items": {"type": "array"},
+                                    "description": "Row filters as [column, operator, value]; operators: ==, !=, >, >=, <, <=, contains",
+                                },
+                                "aggregate": {
+                                    "type": "string",
+                                    "enum": list(AGGREGATES),
+                                    "description": "Combine y per x bin (numeric/datetime x) or per category",
+                                },
+                                "bins": {
+                                    "type": "integer",
+                                    "description": "Number of x bins for 'aggregate' (default: plot width)",
+                                },
+                            },
+                            "required": ["path"],
+                            "description": "Read x/y from a local data file instead of inline arrays",
+                        },
                     },
-                    "required": ["y", "type"],
+                    "required": ["type"],
                 },
                 "description": "List of series to plot.",
             },
@@ -53,7 +120,7 @@ tool_definition = {
                     "interval": {"type": "number"},
                     "clear_terminal": {"type": "boolean"},
                 },
-                "description": "Streaming mode configuration.",
+                "description": "Streaming mode configuration: the series are revealed progressively over the frames.",
             },
         },
         "required": ["data"],
@@ -61,16 +128,136 @@ tool_definition = {
 }
 
 
-def handle_call(input_data):
-    try:
-        plt.clear_figure()
-        data_series = input_data["data"]
-        style = input_data.get("style", {})
-        stream_cfg = input_data.get("stream")
+def _plot_size(style):
+    terminal = shutil.get_terminal_size((100, 30))
+    return style.get("width") or terminal.columns, style.get("height") or max(
+        10, terminal.lines - 5
+    )
+
+
+def _load_source(series, width):
+    """
+    Fill in x/y of a series from its data file, aggregated when requested.
+    Returns (series, number of rows read).
+    """
+    source = series["source"]
+    how = source.get("aggregate")
+    if how and how not in AGGREGATES:
+        raise ValueError(f"aggregate must be one of {', '.join(AGGREGATES)}")
+    x_column, y_column = source.get("x"), source.get("y")
+    if series["type"] == "hist":
+        x_column, how = None, None
+    if not y_column and not (how == "count" and x_column):
+        raise ValueError(
+            "source needs a 'y' column (or an 'x' column with aggregate 'count')"
+        )
+    columns = read_columns(
+        source["path"],
+        [column for column in (x_column, y_column) if column],
+        where=source.get("where") or (),
+        fmt=source.get("format"),
+    )
+    ys = to_numbers(columns[y_column]) if y_column else None
+    rows = len(next(iter(columns.values())))
+    loaded = {k: v for k, v in series.items() if k != "source"}
+    loaded.setdefault("label", y_column or f"count of {x_column}")
+
+    raw_x = columns.get(x_column) if x_column else None
+    dates = False
+    if raw_x is None:
+        xs = list(range(len(ys)))
+    elif _is_numeric(raw_x):
+        xs = to_numbers(raw_x)
+    else:
+        xs = to_timestamps(raw_x)
+        dates = xs is not None
+        if not dates:
+            # Categories: one bar (or point) per distinct value
+            if how:
+                categories, values = group_aggregate(raw_x, ys, how)
+                return {**loaded, "x": categories, "y": values}, rows
+            return {**loaded, "x": [str(x) for x in raw_x], "y": ys}, rows
+
+    if how:
+        xs, ys = bin_aggregate(xs, ys, source.get("bins") or width, how)
+    else:
+        points = [
+            (x, y) for x, y in zip(xs, ys) if math.isfinite(x) and math.isfinite(y)
+        ]
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+    loaded.update(x=xs, y=ys, dates=dates)
+    if series["type"] == "hist":
+        loaded.pop("x")
+    return loaded, rows
+
+
+def _is_numeric(values):
+    sample = [value for value in values[:1000] if value not in (None, "")]
+    return not any(math.isnan(number) for number in to_numbers(sample))
+
 
-        # Styling
-        if style.get("width") and style.get("height"):
-            plt.plotsize(style["width"], style["height"])
+def _date_labels(series):
+    if not series.get("dates"):
+        return series
+    return {
+        **series,
+        "x": [
+            datetime.fromtimestamp(x, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            for x in series["x"]
+        ],
+    }
+
+
+def _prepare(series, width, height):
+    """Load and reduce one series; returns (series ready to plot, original size)."""
+    rows = None
+    if series.get("source"):
+        series, rows = _load_source(series, width)
+    reduced, size = _reduce(series, width, height)
+    return _date_labels(reduced), rows if rows is not None else size
+
+
+def _reduce(series, width, height):
+    """Shrink one series to what the plot can show; returns (series, original size)."""
+    ys = series["y"]
+    xs = series.get("x")
+    size = len(ys)
+    if series["type"] == "hist":
+        centers, counts = histogram(ys, series.get("bins") or DEFAULT_BINS)
+        return {**series, "type": "bar", "x": centers, "y": counts}, size
+    if series["type"] == "bar":
+        return series, size
+
+    # Category or date labels are spaced evenly, so positions stand in for x
+    numeric_x = xs if xs and all(isinstance(x, (int, float)) for x in xs) else None
+    positions = numeric_x or list(range(size))
+    if series["type"] == "line" and size > width * POINTS_PER_COLUMN:
+        keep = lttb(positions, ys, width * POINTS_PER_COLUMN)
+    elif series["type"] == "scatter" and size > width * height:
+        keep = grid_thin(positions, ys, width, height)
+    else:
+        return series, size
+    reduced = {**series, "y": [ys[i] for i in keep]}
+    if xs:
+        reduced["x"] = [xs[i] for i in keep]
+    return reduced, size
+
+
+def _prefix(series, fraction):
+    count = max(1, math.ceil(len(series["y"]) * fraction))
+    trimmed = {**series, "y": series["y"][:count]}
+    if series.get("x"):
+        trimmed["x"] = series["x"][:count]
+    return trimmed
+
+
+def _build(data_series, style, size):
+    """Draw the figure and return it as text (runs in a worker thread)."""
+    with _render_lock:
+        plt.clear_figure()
+        plt.plotsize(*size)
+        if any(series.get("dates") for series in data_series):
+            plt.date_form("Y-m-d H:M:S")
         if style.get("title"):
             plt.title(style["title"])
         if style.get("xlabel"):
@@ -85,13 +272,11 @@ def handle_call(input_data):
         if style.get("yscale"):
             plt.yscale(style["yscale"])
 
-        # Plot data
         for series in data_series:
             func = {
                 "line": plt.plot,
                 "scatter": plt.scatter,
                 "bar": plt.bar,
-                "hist": plt.hist,
             }[series["type"]]
 
             args = []
@@ -100,32 +285,58 @@ def handle_call(input_data):
             args.append(series["y"])
 
             kwargs = {}
-            for opt in ("label", "yaxis", "color", "marker"):
+            for opt in ("label", "color", "marker"):
                 if series.get(opt):
                     kwargs[opt] = series[opt]
+            if series.get("yaxis"):
+                kwargs["yside"] = series["yaxis"]
             if series.get("fill"):
                 kwargs["fillx" if series["type"] in ("line", "scatter") else "fill"] = (
                     True
                 )
 
             func(*args, **kwargs)
+        return plt.build()
+
+
+async def handle_call(input_data):
+    try:
+        style = input_data.get("style", {})
+        stream_cfg = input_data.get("stream")
+        size = _plot_size(style)
+
+        reduced = await asyncio.to_thread(
+            lambda: [_prepare(series, *size) for series in input_data["data"]]
+        )
+        data_series = [series for series, _ in reduced]
+        notes = [
+            f"{source.get('label') or series.get('label') or source['type']}: "
+            f"{original} → {len(series['y'])} points"
+            for source, (series, original) in zip(input_data["data"], reduced)
+            if len(series["y"]) < original
+        ]
 
         # Streaming mode
         if stream_cfg:
-            frames = stream_cfg.get("frames", 1)
+            frames = max(1, stream_cfg.get("frames", 1))
             interval = stream_cfg.get("interval", 0.1)
             clear_term = stream_cfg.get("clear_terminal", True)
 
-            for _ in range(frames):
+            for frame in range(1, frames + 1):
+                visible = [_prefix(series, frame / frames) for series in data_series]
+                canvas = await asyncio.to_thread(_build, visible, style, size)
                 if clear_term:
                     plt.clear_terminal()
-                plt.show()
-                time.sleep(interval)
-                plt.clear_data()
+                print(canvas)
+                if frame < frames:
+                    await asyncio.sleep(interval)
         else:
-            plt.show()
+            print(await asyncio.to_thread(_build, data_series, style, size))
 
-        return {"status": "Rendered successfully."}
+        result = {"status": "Rendered successfully."}
+        if notes:
+            result["downsampled"] = notes
+        return result
 
     except Exception as e:
         return {"error": f"Plotting failed: {e}"}
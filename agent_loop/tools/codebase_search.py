@@ -1,10 +1,14 @@
-import subprocess
+import glob
+import os
+
+from agent_loop.code_index import search_codebase
 
 tool_definition = {
     "name": "codebase_search",
     "description": (
         "Find snippets of code from the codebase most relevant to the search query. "
-        "This is a semantic search tool, so the query should ask for something semantically matching what is needed. "
+        "Results are ranked chunks (functions, classes or blocks) with file:line ranges, served from a local index "
+        "that is updated incrementally as files change. "
         "Use target_directories to scope the search. Reuse the user's exact query unless there's a clear reason not to."
     ),
     "input_schema": {
@@ -19,6 +23,17 @@ tool_definition = {
                 "items": {"type": "string"},
                 "description": "Glob patterns for directories to search over.",
             },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of results to return (default: 10)",
+                "default": 10,
+            },
+            "mode": {
+                "type": "string",
+                "enum": ["bm25", "hybrid"],
+                "description": "'bm25' for lexical ranking, 'hybrid' to re-rank with local vectors for loosely worded queries",
+                "default": "bm25",
+            },
             "explanation": {
                 "type": "string",
                 "description": "Why the agent is performing this semantic search and how it helps.",
@@ -31,28 +46,27 @@ tool_definition = {
 
 def handle_call(input_data):
     query = input_data["query"]
-    target_dirs = input_data.get("target_directories", ["."])
+    target_dirs = input_data.get("target_directories") or ["."]
+    limit = input_data.get("limit", 10)
+    mode = input_data.get("mode", "bm25")
 
     try:
-        args = [
-            "semantic-code-search",
-            "--query",
-            query,
-        ]
-
-        for directory in target_dirs:
-            args.extend(["--dir", directory])
-
-        result = subprocess.run(args, capture_output=True, text=True, timeout=20)
+        roots = []
+        for pattern in target_dirs:
+            roots.extend(
+                os.path.abspath(match)
+                for match in sorted(glob.glob(pattern))
+                if os.path.isdir(match)
+            )
+        if not roots:
+            return {"error": f"No directories match: {', '.join(target_dirs)}"}
 
-        if result.returncode != 0:
-            return {"error": result.stderr.strip(), "exit_code": result.returncode}
+        results = []
+        for root in dict.fromkeys(roots):
+            results.extend(search_codebase(root, query, limit=limit, mode=mode))
+        results.sort(key=lambda result: result["score"], reverse=True)
 
-        return {
-            "query": query,
-            "output": result.stdout.strip(),
-            "exit_code": result.returncode,
-        }
+        return {"query": query, "results": results[:limit]}
 
     except Exception as e:
         return {"error": f"Execution error: {e}"}
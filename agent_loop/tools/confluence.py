@@ -1,20 +1,40 @@
+import asyncio
 import os
+
 import requests
 from dotenv import load_dotenv
 
+from agent_loop.confluence_mirror import open_mirror, sync_space
+from agent_loop.http_client import get_session
+from agent_loop.projection import compact_json
+
 # Load credentials once
 load_dotenv(dotenv_path=os.path.expanduser("~/.config/agent-loop/.env"))
 
 CONFLUENCE_BASE_URL = os.getenv("CONFLUENCE_BASE_URL")
 CONFLUENCE_EMAIL = os.getenv("CONFLUENCE_EMAIL")
 CONFLUENCE_API_TOKEN = os.getenv("CONFLUENCE_API_TOKEN")
+# Comma-separated space keys mirrored by a sync without explicit 'spaces'
+CONFLUENCE_SPACES = os.getenv("CONFLUENCE_SPACES", "")
+
+TIMEOUT = 10
 
 tool_definition = {
     "name": "confluence",
-    "description": "Query Atlassian Confluence Cloud via REST API (read-only)",
+    "description": (
+        "Query Atlassian Confluence Cloud via REST API (read-only). Mode 'sync' mirrors the given spaces into a "
+        "local full-text index (incrementally: only changed pages are downloaded), which the confluence_search "
+        "tool then answers from. Prefer confluence_search over paging through /wiki/rest/api/content."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
+            "mode": {
+                "type": "string",
+                "enum": ["get", "sync"],
+                "description": "'get' calls an endpoint, 'sync' updates the local mirror (default: get)",
+                "default": "get",
+            },
             "endpoint": {
                 "type": "string",
                 "description": (
@@ -25,35 +45,67 @@ tool_definition = {
                 "type": "object",
                 "description": "Optional query parameters (as key-value object)",
             },
+            "spaces": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Space keys to mirror in mode 'sync' (default: CONFLUENCE_SPACES from .env)",
+            },
+            "full": {
+                "type": "boolean",
+                "description": "Re-download every page instead of only changed ones (default: false)",
+                "default": False,
+            },
         },
-        "required": ["endpoint"],
     },
 }
 
 
-def handle_call(input_data):
-    if not all([CONFLUENCE_BASE_URL, CONFLUENCE_EMAIL, CONFLUENCE_API_TOKEN]):
-        return "Missing Confluence credentials. Please set CONFLUENCE_BASE_URL, CONFLUENCE_EMAIL, and CONFLUENCE_API_TOKEN in your .env file."
+def get_json(endpoint, params=None):
+    response = get_session().get(
+        CONFLUENCE_BASE_URL.rstrip("/") + endpoint,
+        auth=(CONFLUENCE_EMAIL, CONFLUENCE_API_TOKEN),
+        params=params,
+        headers={"Accept": "application/json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
 
-    endpoint = input_data["endpoint"]
-    params = input_data.get("params", {})
 
-    if not endpoint.startswith("/"):
-        endpoint = "/" + endpoint
+def _sync(spaces, full):
+    conn = open_mirror(CONFLUENCE_BASE_URL)
+    try:
+        return [sync_space(conn, get_json, space, full=full) for space in spaces]
+    finally:
+        conn.close()
 
-    url = CONFLUENCE_BASE_URL.rstrip("/") + endpoint
+
+async def handle_call(input_data):
+    if not all([CONFLUENCE_BASE_URL, CONFLUENCE_EMAIL, CONFLUENCE_API_TOKEN]):
+        return "Missing Confluence credentials. Please set CONFLUENCE_BASE_URL, CONFLUENCE_EMAIL, and CONFLUENCE_API_TOKEN in your .env file."
 
     try:
-        response = requests.get(
-            url,
-            auth=(CONFLUENCE_EMAIL, CONFLUENCE_API_TOKEN),
-            params=params,
-            headers={"Accept": "application/json"},
-            timeout=10,
+        if input_data.get("mode", "get") == "sync":
+            spaces = input_data.get("spaces") or [
+                key.strip() for key in CONFLUENCE_SPACES.split(",") if key.strip()
+            ]
+            if not spaces:
+                return "❌ No spaces to sync. Pass 'spaces' or set CONFLUENCE_SPACES in your .env file."
+            results = await asyncio.to_thread(
+                _sync, spaces, input_data.get("full", False)
+            )
+            return "✅ Mirror updated: " + compact_json(results)
+
+        endpoint = input_data.get("endpoint")
+        if not endpoint:
+            return "❌ 'endpoint' is required for mode 'get'"
+        if not endpoint.startswith("/"):
+            endpoint = "/" + endpoint
+        result = await asyncio.to_thread(
+            get_json, endpoint, input_data.get("params", {})
         )
-        response.raise_for_status()
-        return f"Response ({response.status_code}):\n{response.json()}"
+        return compact_json(result)
     except requests.exceptions.HTTPError as e:
-        return f"HTTP Error: {e.response.status_code} {e.response.text}"
+        return f"HTTP Error: {e.response.status_code} {e.response.text[:2000]}"
     except requests.exceptions.RequestException as e:
         return f"Request failed: {e}"
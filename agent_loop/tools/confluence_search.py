@@ -0,0 +1,81 @@
+import os
+
+from dotenv import load_dotenv
+
+from agent_loop.confluence_mirror import (
+    get_page,
+    open_mirror,
+    search_mirror,
+    synced_spaces,
+)
+
+load_dotenv(dotenv_path=os.path.expanduser("~/.config/agent-loop/.env"))
+
+CONFLUENCE_BASE_URL = os.getenv("CONFLUENCE_BASE_URL")
+MAX_PAGE_CHARS = 20_000
+
+tool_definition = {
+    "name": "confluence_search",
+    "description": (
+        "Full-text search over the local mirror of Confluence spaces (built with the confluence tool's 'sync' "
+        "mode). Returns ranked pages with highlighted snippets in milliseconds. Pass 'page_id' to read the "
+        "mirrored text of one page."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Words to search for in page titles and bodies",
+            },
+            "spaces": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Restrict the search to these space keys",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of results (default: 10)",
+                "default": 10,
+            },
+            "page_id": {
+                "type": "string",
+                "description": "Return the mirrored text of this page instead of searching",
+            },
+        },
+    },
+}
+
+
+def handle_call(input_data):
+    if not CONFLUENCE_BASE_URL:
+        return {"error": "CONFLUENCE_BASE_URL is not set in your .env file."}
+
+    conn = open_mirror(CONFLUENCE_BASE_URL)
+    try:
+        spaces = synced_spaces(conn)
+        if not spaces:
+            return {
+                "error": "The Confluence mirror is empty. Run the confluence tool with mode 'sync' first."
+            }
+
+        page_id = input_data.get("page_id")
+        if page_id:
+            page = get_page(conn, str(page_id))
+            if page is None:
+                return {"error": f"Page {page_id} is not in the mirror"}
+            if len(page["text"]) > MAX_PAGE_CHARS:
+                page["text"] = page["text"][:MAX_PAGE_CHARS] + "\n[... truncated]"
+            return page
+
+        query = input_data.get("query")
+        if not query:
+            return {"error": "'query' or 'page_id' is required"}
+        results = search_mirror(
+            conn, query, input_data.get("spaces"), input_data.get("limit", 10)
+        )
+        return {"query": query, "spaces": sorted(spaces), "results": results}
+    except Exception as e:
+        return {"error": f"Search failed: {e}"}
+    finally:
+        conn.close()
@@ -1,27 +1,420 @@
-import subprocess
+import asyncio
+import re
+import shlex
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from agent_loop.docker_api import (
+    DockerAPIError,
+    DockerClient,
+    demux,
+    socket_path,
+)
+from agent_loop.jobs import background_message, start_job
+from agent_loop.projection import compact_json, project
+from agent_loop.subprocess_runner import format_result, run_command
+
+TIMEOUT = 15
+DEFAULT_TAIL = 200
+DEFAULT_LOG_BYTES = 20_000
+# Stop reading a log stream after this much, whatever is kept
+MAX_LOG_READ_BYTES = 50_000_000
+STATS_WORKERS = 8
+
+CONTAINER_FIELDS = [
+    "Id",
+    "Name",
+    "Created",
+    "Config.Image",
+    "Config.Cmd",
+    "Config.Entrypoint",
+    "Config.Labels",
+    "State",
+    "RestartCount",
+    "HostConfig.RestartPolicy",
+    "Mounts",
+    "NetworkSettings.Ports",
+    "NetworkSettings.Networks",
+]
+IMAGE_FIELDS = [
+    "Id",
+    "RepoTags",
+    "Created",
+    "Size",
+    "Architecture",
+    "Os",
+    "Config.Cmd",
+    "Config.Entrypoint",
+    "Config.ExposedPorts",
+    "Config.Labels",
+]
+_RELATIVE = re.compile(r"^(\d+)([smhd])$")
+_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_client = None
 
 tool_definition = {
     "name": "docker",
-    "description": "Run Docker CLI commands",
+    "description": (
+        "Query Docker. Use 'action' for fast, compact reads straight from the Docker Engine API: "
+        "'containers', 'images', 'inspect' (container or image), 'logs' (with since/tail and a byte cap) "
+        "and 'stats'. Anything else runs the Docker CLI with 'args'."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["containers", "images", "inspect", "logs", "stats"],
+                "description": "Read through the Engine API instead of running the CLI",
+            },
+            "target": {
+                "type": "string",
+                "description": "Container (or image for 'inspect') name or id; 'stats' without a target covers all running containers",
+            },
+            "all": {
+                "type": "boolean",
+                "description": "'containers': include stopped containers; 'images': include intermediate images",
+                "default": False,
+            },
+            "filters": {
+                "type": "object",
+                "description": 'Engine API filters for \'containers\'/\'images\', e.g. {"name": ["web"], "status": ["exited"]}',
+            },
+            "fields": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Dotted paths to keep for 'inspect' (default: a summary; ['*all'] for everything)",
+            },
+            "since": {
+                "type": "string",
+                "description": "'logs': only entries newer than this (e.g. '10m', '2h', an ISO date or a unix timestamp)",
+            },
+            "tail": {
+                "type": "integer",
+                "description": f"'logs': number of lines from the end (default: {DEFAULT_TAIL}, 0 = all)",
+            },
+            "max_bytes": {
+                "type": "integer",
+                "description": f"'logs': keep at most this many bytes, the most recent ones (default: {DEFAULT_LOG_BYTES})",
+            },
+            "timestamps": {
+                "type": "boolean",
+                "description": "'logs': prefix lines with timestamps",
+                "default": False,
+            },
             "args": {
                 "type": "string",
                 "description": "Arguments to pass to the Docker CLI, e.g., 'ps', 'images', 'compose ls'",
-            }
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Run as a background job and return its id immediately (see the jobs tool)",
+                "default": False,
+            },
         },
-        "required": ["args"],
     },
 }
 
 
-def handle_call(input_data):
-    args = input_data["args"]
-    cmd = ["docker"] + args.strip().split()
+def _get_client(path):
+    global _client
+    if _client is None or _client.path != path:
+        _client = DockerClient(path)
+    return _client
+
+
+def _quote(name):
+    return urllib.parse.quote(name, safe="")
+
+
+def _filters(input_data):
+    filters = input_data.get("filters")
+    if not filters:
+        return {}
+    return {
+        "filters": compact_json(
+            {
+                key: value if isinstance(value, list) else [value]
+                for key, value in filters.items()
+            }
+        )
+    }
+
+
+def _created(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def _mb(size):
+    return round((size or 0) / 1_048_576, 1)
+
+
+def _containers(client, input_data):
+    containers = client.get_json(
+        "/containers/json",
+        {"all": int(input_data.get("all", False)), **_filters(input_data)},
+    )
+    return [
+        {
+            "id": container["Id"][:12],
+            "name": ",".join(name.lstrip("/") for name in container.get("Names") or []),
+            "image": container.get("Image"),
+            "state": container.get("State"),
+            "status": container.get("Status"),
+            "ports": [
+                (
+                    f"{port['IP']}:{port['PublicPort']}->{port['PrivatePort']}/{port['Type']}"
+                    if port.get("PublicPort")
+                    else f"{port['PrivatePort']}/{port['Type']}"
+                )
+                for port in container.get("Ports") or []
+            ],
+            "created": _created(container.get("Created", 0)),
+        }
+        for container in containers
+    ]
+
+
+def _images(client, input_data):
+    images = client.get_json(
+        "/images/json",
+        {"all": int(input_data.get("all", False)), **_filters(input_data)},
+    )
+    return [
+        {
+            "id": image["Id"].split(":")[-1][:12],
+            "tags": image.get("RepoTags") or [],
+            "size_mb": _mb(image.get("Size")),
+            "created": _created(image.get("Created", 0)),
+        }
+        for image in images
+    ]
+
+
+def _inspect(client, input_data):
+    target = input_data["target"]
+    fields = input_data.get("fields")
+    try:
+        info = client.get_json(f"/containers/{_quote(target)}/json")
+        default = CONTAINER_FIELDS
+    except DockerAPIError as e:
+        if e.status != 404:
+            raise
+        info = client.get_json(f"/images/{_quote(target)}/json")
+        default = IMAGE_FIELDS
+    if fields == ["*all"]:
+        return info
+    return project(info, fields or default)
+
+
+def _since(value):
+    """Unix seconds for '10m'-style durations, ISO dates or timestamps."""
+    value = str(value).strip()
+    match = _RELATIVE.match(value)
+    if match:
+        return str(int(time.time()) - int(match.group(1)) * _SECONDS[match.group(2)])
+    if re.fullmatch(r"\d+(\.\d+)?", value):
+        return value
+    try:
+        return str(int(datetime.fromisoformat(value).timestamp()))
+    except ValueError:
+        raise ValueError(
+            f"Cannot parse since={value!r}; use e.g. '10m', '2h' or an ISO date"
+        )
+
+
+def _logs(client, input_data):
+    target = input_data["target"]
+    max_bytes = max(1, int(input_data.get("max_bytes") or DEFAULT_LOG_BYTES))
+    tail = input_data.get("tail", DEFAULT_TAIL)
+    params = {
+        "stdout": 1,
+        "stderr": 1,
+        "tail": "all" if not tail else int(tail),
+        "timestamps": int(input_data.get("timestamps", False)),
+    }
+    if input_data.get("since"):
+        params["since"] = _since(input_data["since"])
+
+    tty = (
+        client.get_json(f"/containers/{_quote(target)}/json").get("Config") or {}
+    ).get("Tty")
+    chunks = client.stream(f"/containers/{_quote(target)}/logs", params)
+    frames = ((1, chunk) for chunk in chunks) if tty else demux(chunks)
+
+    kept = bytearray()
+    total = 0
+    stopped = False
+    try:
+        for _, payload in frames:
+            total += len(payload)
+            kept += payload
+            if len(kept) > max_bytes:
+                # Keep the most recent output
+                del kept[: len(kept) - max_bytes]
+            if total >= MAX_LOG_READ_BYTES:
+                stopped = True
+                break
+    finally:
+        chunks.close()
+
+    if total > len(kept):
+        # Start at a line boundary rather than in the middle of a line
+        newline = kept.find(b"\n", 0, len(kept) - 1)
+        del kept[: newline + 1]
+    text = kept.decode("utf-8", errors="replace")
+    if total > len(kept):
+        text = (
+            f"[... {total - len(kept)} earlier bytes omitted; narrow with since/tail or raise max_bytes]\n"
+            + text
+        )
+    if stopped:
+        text += f"\n[... stopped reading after {MAX_LOG_READ_BYTES} bytes]"
+    return text or "(no log output)"
+
+
+def _container_stats(client, container_id):
+    stats = client.get_json(f"/containers/{_quote(container_id)}/stats", {"stream": 0})
+    cpu, precpu = stats.get("cpu_stats") or {}, stats.get("precpu_stats") or {}
+    cpu_delta = (cpu.get("cpu_usage") or {}).get("total_usage", 0) - (
+        precpu.get("cpu_usage") or {}
+    ).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    cpus = (
+        cpu.get("online_cpus")
+        or len((cpu.get("cpu_usage") or {}).get("percpu_usage") or [])
+        or 1
+    )
+    memory = stats.get("memory_stats") or {}
+    memory_stats = memory.get("stats") or {}
+    used = memory.get("usage", 0) - memory_stats.get(
+        "inactive_file", memory_stats.get("cache", 0)
+    )
+    limit = memory.get("limit") or 0
+    networks = (stats.get("networks") or {}).values()
+    blkio = (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    return {
+        "name": (stats.get("name") or container_id).lstrip("/"),
+        "cpu_percent": (
+            round(cpu_delta / system_delta * cpus * 100, 2)
+            if system_delta > 0 and cpu_delta > 0
+            else 0.0
+        ),
+        "mem_mb": _mb(used),
+        "mem_limit_mb": _mb(limit),
+        "mem_percent": round(used / limit * 100, 2) if limit else None,
+        "net_rx_mb": _mb(sum(net.get("rx_bytes", 0) for net in networks)),
+        "net_tx_mb": _mb(sum(net.get("tx_bytes", 0) for net in networks)),
+        "block_read_mb": _mb(
+            sum(e.get("value", 0) for e in blkio if e.get("op", "").lower() == "read")
+        ),
+        "block_write_mb": _mb(
+            sum(e.get("value", 0) for e in blkio if e.get("op", "").lower() == "write")
+        ),
+        "pids": (stats.get("pids_stats") or {}).get("current"),
+    }
+
+
+def _stats(client, input_data):
+    if input_data.get("target"):
+        return _container_stats(client, input_data["target"])
+    running = client.get_json("/containers/json")
+    # The daemon samples each container for about a second, so ask in parallel
+    with ThreadPoolExecutor(max_workers=STATS_WORKERS) as pool:
+        return list(
+            pool.map(
+                lambda container: _container_stats(client, container["Id"]), running
+            )
+        )
+
+
+_ACTIONS = {
+    "containers": _containers,
+    "images": _images,
+    "inspect": _inspect,
+    "logs": _logs,
+    "stats": _stats,
+}
+
+
+def _cli_equivalent(input_data):
+    """The Docker CLI command for an action, used when the socket is unavailable."""
+    action = input_data["action"]
+    target = input_data.get("target")
+    if action == "containers":
+        return ["docker", "ps", "--format", "{{json .}}"] + (
+            ["--all"] if input_data.get("all") else []
+        )
+    if action == "images":
+        return ["docker", "images", "--format", "{{json .}}"] + (
+            ["--all"] if input_data.get("all") else []
+        )
+    if action == "inspect":
+        return ["docker", "inspect", target]
+    if action == "logs":
+        tail = input_data.get("tail", DEFAULT_TAIL)
+        cmd = ["docker", "logs", "--tail", str(tail) if tail else "all"]
+        if input_data.get("since"):
+            cmd += ["--since", input_data["since"]]
+        if input_data.get("timestamps"):
+            cmd.append("--timestamps")
+        return cmd + [target]
+    return ["docker", "stats", "--no-stream", "--format", "{{json .}}"] + (
+        [target] if target else []
+    )
+
+
+async def _run_action(input_data):
+    action = input_data["action"]
+    if action in ("inspect", "logs") and not input_data.get("target"):
+        return f"⚠️ '{action}' needs a 'target' container."
+    path = socket_path()
+    if path:
+        try:
+            result = await asyncio.to_thread(
+                _ACTIONS[action], _get_client(path), input_data
+            )
+            return result if isinstance(result, str) else compact_json(result)
+        except DockerAPIError as e:
+            return f"❌ Docker API error ({e.status}): {e}"
+        except (FileNotFoundError, ConnectionRefusedError, PermissionError):
+            pass  # No usable socket; fall back to the CLI
+    cmd = _cli_equivalent(input_data)
+    if action == "logs":
+        # Like the API path, keep the newest output
+        max_bytes = max(1, int(input_data.get("max_bytes") or DEFAULT_LOG_BYTES))
+        result = await run_command(cmd, TIMEOUT, max_output=max_bytes, keep_tail=True)
+    else:
+        result = await run_command(cmd, TIMEOUT)
+    return format_result(result, TIMEOUT)
+
+
+async def handle_call(input_data):
+    try:
+        if input_data.get("action"):
+            if input_data["action"] not in _ACTIONS:
+                return f"⚠️ Unknown action. Use one of: {', '.join(_ACTIONS)}."
+            return await _run_action(input_data)
+    except ValueError as e:
+        return f"❌ {e}"
+    except Exception as e:
+        return f"Error querying Docker: {e}"
+
+    args = input_data.get("args")
+    if not args:
+        return "⚠️ Provide an 'action' or CLI 'args'."
+    try:
+        cmd = ["docker"] + shlex.split(args)
+    except ValueError as e:
+        return f"❌ Could not parse args: {e}"
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        return f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}\nEXIT CODE: {result.returncode}"
+        if input_data.get("background"):
+            return background_message(start_job(cmd))
+        result = await run_command(cmd, TIMEOUT)
+        return format_result(result, TIMEOUT)
     except Exception as e:
         return f"Error executing docker command: {e}"
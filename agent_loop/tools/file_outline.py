@@ -0,0 +1,61 @@
+import os
+
+from agent_loop.code_structure import detect_language, outline_file
+
+tool_definition = {
+    "name": "file_outline",
+    "description": (
+        "Show the outline of a source file: its classes, functions, methods and types with signatures, "
+        "line ranges and the first line of each docstring. Much cheaper than reading the whole file; "
+        "read only the ranges you need afterwards with filesystem start_line/end_line."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Path to the source file"},
+            "include_docs": {
+                "type": "boolean",
+                "description": "Include the first docstring/comment line of each definition",
+                "default": True,
+            },
+            "include_variables": {
+                "type": "boolean",
+                "description": "Include module-level variables and constants",
+                "default": False,
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "Maximum nesting depth to show (0 = top level only)",
+            },
+        },
+        "required": ["path"],
+    },
+}
+
+
+def handle_call(input_data):
+    path = input_data["path"]
+    include_docs = input_data.get("include_docs", True)
+    include_variables = input_data.get("include_variables", False)
+    max_depth = input_data.get("max_depth")
+
+    try:
+        if not os.path.isfile(path):
+            return {"error": f"File does not exist: {path}"}
+        if detect_language(path) is None:
+            return {"error": f"Unsupported file type for outline: {path}"}
+
+        outline = []
+        for d in outline_file(path):
+            depth = d["qualname"].count(".")
+            if max_depth is not None and depth > max_depth:
+                continue
+            if d["kind"] == "variable" and not include_variables:
+                continue
+            line = f"{'  ' * depth}{d['signature']}  L{d['line']}-{d['end_line']}"
+            if include_docs and d.get("doc"):
+                line += f"  # {d['doc']}"
+            outline.append(line)
+        return {"path": path, "outline": outline}
+    except Exception as e:
+        return {"error": f"Execution error: {e}"}
@@ -1,4 +1,4 @@
-import subprocess
+from agent_loop.subprocess_runner import run_command
 
 tool_definition = {
     "name": "file_search",
@@ -21,20 +21,18 @@ tool_definition = {
 }
 
 
-def handle_call(input_data):
+async def handle_call(input_data):
     query = input_data["query"]
 
     try:
-        result = subprocess.run(
-            ["fdfind", query], capture_output=True, text=True, timeout=10
-        )
+        result = await run_command(["fdfind", query], timeout=10)
 
-        if result.returncode not in [0, 1]:  # 0: found, 1: not found
-            return {"error": result.stderr.strip(), "exit_code": result.returncode}
+        if result["exit_code"] not in [0, 1]:  # 0: found, 1: not found
+            return {"error": result["stderr"].strip(), "exit_code": result["exit_code"]}
 
-        matches = result.stdout.strip().splitlines()[:10]
+        matches = result["stdout"].strip().splitlines()[:10]
 
-        return {"query": query, "matches": matches, "exit_code": result.returncode}
+        return {"query": query, "matches": matches, "exit_code": result["exit_code"]}
 
     except Exception as e:
         return {"error": f"Execution error: {e}"}
@@ -1,8 +1,33 @@
 import os
 
+from agent_loop import ledger
+from agent_loop.fileio import (
+    LineEditError,
+    apply_line_edits,
+    atomic_write,
+    read_byte_range,
+    read_line_range,
+)
+from agent_loop.patching import (
+    PatchError,
+    apply_search_replace,
+    apply_unified_diff,
+    summarize_changes,
+)
+
+# Whole-file reads above this size return the first lines and a hint to use ranges
+MAX_FULL_READ_BYTES = 2_000_000
+FULL_READ_FALLBACK_LINES = 2000
+
 tool_definition = {
     "name": "filesystem",
-    "description": "Read, create, update, append, delete files, or modify specific lines. Only supports UTF-8 encoded text files.",
+    "description": (
+        "Read, create, update, append, delete files, or modify specific lines. Only supports UTF-8 encoded text files. "
+        "Use start_line/end_line or byte_offset/byte_length to read part of a large file, and 'batch' to apply "
+        "many line edits in one pass. Use 'patch' with search/replace 'blocks' or a unified 'diff' to change a few "
+        "lines without resending the whole file. All writes except append are atomic. Re-reading a file you "
+        "have already read returns only what changed since then unless 'full' is true."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
@@ -17,6 +42,8 @@ tool_definition = {
                     "delete",
                     "insert_line",
                     "delete_line",
+                    "batch",
+                    "patch",
                 ],
             },
             "path": {"type": "string", "description": "Path to the file"},
@@ -30,6 +57,65 @@ tool_definition = {
                 "description": "Line number (0-based) for insert_line or delete_line",
                 "default": None,
             },
+            "start_line": {
+                "type": "integer",
+                "description": "First line to read (1-based, inclusive, like grep/search locations)",
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Last line to read (1-based, inclusive); defaults to the end of the file",
+            },
+            "byte_offset": {
+                "type": "integer",
+                "description": "Byte offset to start reading from (read only)",
+            },
+            "byte_length": {
+                "type": "integer",
+                "description": "Number of bytes to read from byte_offset (default: 65536)",
+            },
+            "edits": {
+                "type": "array",
+                "description": (
+                    "Edits for 'batch', applied in one pass. Line numbers are 0-based and refer to "
+                    "the file before any of the edits."
+                ),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "op": {
+                            "type": "string",
+                            "enum": ["insert", "delete", "replace"],
+                        },
+                        "line_number": {"type": "integer"},
+                        "content": {"type": "string"},
+                    },
+                    "required": ["op", "line_number"],
+                },
+            },
+            "full": {
+                "type": "boolean",
+                "description": "For 'read': return the whole file even if it was read before in this session",
+                "default": False,
+            },
+            "blocks": {
+                "type": "array",
+                "description": (
+                    "Search/replace blocks for 'patch', applied in order. Each 'search' must match "
+                    "exactly once, including whitespace; the patch fails without writing otherwise."
+                ),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "search": {"type": "string"},
+                        "replace": {"type": "string"},
+                    },
+                    "required": ["search", "replace"],
+                },
+            },
+            "diff": {
+                "type": "string",
+                "description": "Unified diff for 'patch' (alternative to 'blocks')",
+            },
         },
         "required": ["operation", "path"],
     },
@@ -41,26 +127,56 @@ def handle_call(input_data):
     path = input_data["path"]
     content = input_data.get("content", "")
     line_number = input_data.get("line_number")
+    start_line = input_data.get("start_line")
+    end_line = input_data.get("end_line")
+    byte_offset = input_data.get("byte_offset")
 
     try:
         if operation == "create":
             if os.path.exists(path):
                 return f"❌ File already exists: {path}"
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            atomic_write(path, content)
+            ledger.record(path, content)
             return f"✅ Created file: {path}"
 
         elif operation == "read":
             if not os.path.exists(path):
                 return f"❌ File does not exist: {path}"
+            if byte_offset is not None:
+                chunk = read_byte_range(
+                    path, byte_offset, input_data.get("byte_length", 65536)
+                )
+                end = chunk["offset"] + chunk["length"]
+                return f"📄 Bytes {chunk['offset']}-{end} of {chunk['size']} in {path}:\n\n{chunk['text']}"
+            if start_line is not None or end_line is not None:
+                chunk = read_line_range(path, start_line or 1, end_line)
+                return f"📄 Lines {chunk['start']}-{chunk['end']} of {chunk['total_lines']} in {path}:\n\n{chunk['text']}"
+            if os.path.getsize(path) > MAX_FULL_READ_BYTES:
+                chunk = read_line_range(path, 1, FULL_READ_FALLBACK_LINES)
+                return (
+                    f"📄 {path} is large ({chunk['total_lines']} lines); showing lines 1-{chunk['end']}. "
+                    f"Use start_line/end_line to read other ranges.\n\n{chunk['text']}"
+                )
             with open(path, "r", encoding="utf-8") as f:
-                return f"📄 Content of {path}:\n\n{f.read()}"
+                text = f.read()
+            if input_data.get("full"):
+                ledger.record(path, text)
+                return f"📄 Content of {path}:\n\n{text}"
+            change = ledger.delta(path, text)
+            if change is None:
+                return f"📄 Content of {path}:\n\n{text}"
+            if change.get("unchanged"):
+                return f"📄 {path} is unchanged since you last read it."
+            return (
+                f"📄 {path} changed since you last read it (+{change['added']} -{change['removed']} lines); "
+                f"diff against that version:\n\n{change['diff']}"
+            )
 
         elif operation == "update":
             if not os.path.exists(path):
                 return f"❌ File does not exist: {path}"
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            atomic_write(path, content)
+            ledger.record(path, content)
             return f"✅ File updated: {path}"
 
         elif operation == "append":
@@ -74,6 +190,7 @@ def handle_call(input_data):
             if not os.path.exists(path):
                 return f"❌ File does not exist: {path}"
             os.remove(path)
+            ledger.forget(path)
             return f"🗑️ Deleted file: {path}"
 
         elif operation == "insert_line":
@@ -81,13 +198,9 @@ def handle_call(input_data):
                 return "❌ Missing 'line_number' for insert_line"
             if not os.path.exists(path):
                 return f"❌ File does not exist: {path}"
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            if line_number < 0 or line_number > len(lines):
-                return f"❌ Invalid line number: {line_number}"
-            lines.insert(line_number, content + "\n")
-            with open(path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
+            apply_line_edits(
+                path, [{"op": "insert", "line_number": line_number, "content": content}]
+            )
             return f"✅ Inserted line at {line_number} in {path}"
 
         elif operation == "delete_line":
@@ -95,17 +208,50 @@ def handle_call(input_data):
                 return "❌ Missing 'line_number' for delete_line"
             if not os.path.exists(path):
                 return f"❌ File does not exist: {path}"
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            if line_number < 0 or line_number >= len(lines):
-                return f"❌ Invalid line number: {line_number}"
-            removed = lines.pop(line_number)
-            with open(path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
+            result = apply_line_edits(
+                path, [{"op": "delete", "line_number": line_number}]
+            )
+            removed = result["removed"][line_number]
             return f"🗑️ Deleted line {line_number} from {path}: {removed.strip()}"
 
+        elif operation == "batch":
+            edits = input_data.get("edits") or []
+            if not edits:
+                return "❌ Missing 'edits' for batch"
+            if not os.path.exists(path):
+                return f"❌ File does not exist: {path}"
+            result = apply_line_edits(path, edits)
+            return (
+                f"✅ Applied {len(edits)} edits to {path} in one pass "
+                f"({result['lines_before']} → {result['lines_after']} lines)"
+            )
+
+        elif operation == "patch":
+            blocks = input_data.get("blocks")
+            diff = input_data.get("diff")
+            if not blocks and not diff:
+                return "❌ Missing 'blocks' or 'diff' for patch"
+            if not os.path.exists(path):
+                return f"❌ File does not exist: {path}"
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                original = f.read()
+            # Match on "\n" line endings and restore CRLF on write
+            crlf = "\r\n" in original
+            text = before = original.replace("\r\n", "\n") if crlf else original
+            if blocks:
+                text, changes = apply_search_replace(text, blocks)
+            else:
+                text, changes = apply_unified_diff(text, diff)
+            patched = text.replace("\n", "\r\n") if crlf else text
+            atomic_write(path, patched)
+            # Reads see universal newlines, so the ledger holds the LF text
+            ledger.advance(path, before, text)
+            return f"✅ Patched {path}: {summarize_changes(changes)}"
+
         else:
             return f"❌ Unsupported operation: {operation}"
 
+    except (LineEditError, PatchError) as e:
+        return f"❌ {e}"
     except Exception as e:
         return f"⚠️ Error performing filesystem operation: {e}"
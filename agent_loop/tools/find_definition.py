@@ -0,0 +1,49 @@
+from agent_loop.symbol_index import find_definitions
+
+tool_definition = {
+    "name": "find_definition",
+    "description": (
+        "Go to definition: find where a function, class, method, type or module-level variable is defined. "
+        "Returns exact file:start-end line ranges from a persistent symbol index instead of raw text matches. "
+        "Use a dotted name (e.g. 'AgentLoop.run_loop') to disambiguate members."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "symbol": {
+                "type": "string",
+                "description": "Symbol name, optionally qualified with its container (e.g. 'MyClass.method')",
+            },
+            "kind": {
+                "type": "string",
+                "description": "Optional kind filter, e.g. 'class', 'function', 'method', 'variable', 'interface'",
+            },
+            "directory": {
+                "type": "string",
+                "description": "Root directory of the project (default: current directory)",
+                "default": ".",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of definitions to return (default: 20)",
+                "default": 20,
+            },
+        },
+        "required": ["symbol"],
+    },
+}
+
+
+def handle_call(input_data):
+    symbol = input_data["symbol"]
+    kind = input_data.get("kind")
+    directory = input_data.get("directory", ".")
+    limit = input_data.get("limit", 20)
+
+    try:
+        definitions = find_definitions(directory, symbol, kind=kind, limit=limit)
+        if not definitions:
+            return {"symbol": symbol, "definitions": [], "note": "No definition found."}
+        return {"symbol": symbol, "definitions": definitions}
+    except Exception as e:
+        return {"error": f"Execution error: {e}"}
@@ -0,0 +1,42 @@
+from agent_loop.symbol_index import find_symbol_references
+
+tool_definition = {
+    "name": "find_references",
+    "description": (
+        "Find references: list every place an identifier is used (calls, attribute access, imports, assignments). "
+        "Returns file:line:column locations with the source line, from a persistent symbol index. "
+        "Strings and comments are ignored."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "symbol": {
+                "type": "string",
+                "description": "Identifier to look up; for a dotted name only the last part is matched",
+            },
+            "directory": {
+                "type": "string",
+                "description": "Root directory of the project (default: current directory)",
+                "default": ".",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of references to return (default: 50)",
+                "default": 50,
+            },
+        },
+        "required": ["symbol"],
+    },
+}
+
+
+def handle_call(input_data):
+    symbol = input_data["symbol"]
+    directory = input_data.get("directory", ".")
+    limit = input_data.get("limit", 50)
+
+    try:
+        result = find_symbol_references(directory, symbol, limit=limit)
+        return {"symbol": symbol, **result}
+    except Exception as e:
+        return {"error": f"Execution error: {e}"}
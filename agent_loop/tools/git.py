@@ -1,27 +1,427 @@
-import subprocess
+import asyncio
+import hashlib
+import json
+import re
+import shlex
+
+from agent_loop.cache import DiskCache
+from agent_loop.jobs import background_message, start_job
+from agent_loop.projection import compact_json
+from agent_loop.subprocess_runner import format_result, run_command
+
+TIMEOUT = 10
+# Structured operations are bounded by their limits, so they get more time
+QUERY_TIMEOUT = 30
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 500
+DEFAULT_MAX_TOKENS = 4000
+# Rough size of a token in characters, for the output budget
+CHARS_PER_TOKEN = 4
+MAX_BLAME_LINES = 2000
+
+# Absolute dates keep a filtered log immutable; '2 weeks ago' does not
+# A date alone is not fixed: git fills in the current time of day
+_ABSOLUTE_TIME = re.compile(
+    r"^\d{4}-\d{2}-\d{2}[ T]\d{1,2}:\d{2}(:\d{2})?([+-]\d{2}:?\d{2}|Z)?$"
+)
+_BLAME_HEADER = re.compile(r"^([0-9a-f]{40,64}) \d+ (\d+)")
+_GIT = ["git", "-c", "core.quotepath=off", "--no-pager"]
+
+_cache = None
 
 tool_definition = {
     "name": "git",
-    "description": "Run Git commands in the current repository",
+    "description": (
+        "Run Git commands in the current repository. For history questions prefer 'operation', which returns "
+        "compact, bounded JSON cached by commit id: 'log' (filter by path, author, since/until, grep; limit), "
+        "'show' (one commit with file stats, optional patch), 'blame' (a line range of a file) and 'diff_stat' "
+        "(files changed between two refs, or a ref and the working tree). Output is capped by 'max_tokens'."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
+            "operation": {
+                "type": "string",
+                "enum": ["log", "show", "blame", "diff_stat"],
+                "description": "Structured query to run instead of raw 'args'",
+            },
+            "ref": {
+                "type": "string",
+                "description": "Commit, branch or tag for log/show/blame (default: HEAD); 'diff_stat' base",
+            },
+            "head": {
+                "type": "string",
+                "description": "'diff_stat': ref to compare 'ref' with (default: the working tree)",
+            },
+            "path": {
+                "type": "string",
+                "description": "Limit log/show/diff_stat to this path; the file to blame",
+            },
+            "author": {
+                "type": "string",
+                "description": "'log': author name or email pattern",
+            },
+            "since": {
+                "type": "string",
+                "description": "'log': commits after this date, e.g. '2024-01-01' or '2 weeks ago'",
+            },
+            "until": {
+                "type": "string",
+                "description": "'log': commits before this date",
+            },
+            "grep": {
+                "type": "string",
+                "description": "'log': pattern to match in commit messages",
+            },
+            "stat": {
+                "type": "boolean",
+                "description": "'log': add files/added/deleted counts per commit",
+                "default": False,
+            },
+            "patch": {
+                "type": "boolean",
+                "description": "'show': include the patch (within the token budget)",
+                "default": False,
+            },
+            "start": {
+                "type": "integer",
+                "description": "'blame': first line (default: 1)",
+            },
+            "end": {
+                "type": "integer",
+                "description": f"'blame': last line (default: start + 99; at most {MAX_BLAME_LINES} lines)",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"'log': maximum commits (default: {DEFAULT_LIMIT}, max: {MAX_LIMIT})",
+            },
+            "max_tokens": {
+                "type": "integer",
+                "description": f"Approximate output budget for 'operation' results (default: {DEFAULT_MAX_TOKENS})",
+            },
+            "fresh": {
+                "type": "boolean",
+                "description": "Bypass the result cache (default: false)",
+                "default": False,
+            },
             "args": {
                 "type": "string",
                 "description": "Arguments for the git command, e.g., 'status', 'log --oneline', 'branch -a'",
-            }
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Run as a background job and return its id immediately (see the jobs tool)",
+                "default": False,
+            },
         },
-        "required": ["args"],
     },
 }
 
 
-def handle_call(input_data):
-    args = input_data["args"]
-    cmd = ["git"] + args.strip().split()
+class GitError(Exception):
+    pass
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache("git")
+    return _cache
+
+
+async def _git(*args):
+    result = await run_command([*_GIT, *args], QUERY_TIMEOUT)
+    if result["timed_out"]:
+        raise GitError(f"git {args[0]} timed out after {QUERY_TIMEOUT}s")
+    if result["exit_code"] != 0:
+        raise GitError(result["stderr"].strip() or f"git {args[0]} failed")
+    return result["stdout"]
+
+
+async def _resolve(refs):
+    """
+    The repository's git dir, the cwd's path within the work tree (paths in
+    the input are relative to it) and the commit id of each ref, in one call.
+    """
+    for ref in refs:
+        if ref.startswith("-"):
+            raise GitError(f"Invalid ref: {ref}")
+    lines = (
+        await _git(
+            "rev-parse",
+            "--absolute-git-dir",
+            "--show-prefix",
+            *(f"{ref}^{{commit}}" for ref in refs),
+        )
+    ).splitlines()
+    return lines[0], lines[1], lines[2:]
+
+
+def _numstat(lines):
+    files = []
+    for line in lines:
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        files.append(
+            {
+                "path": path,
+                # Binary files report '-' for both counts
+                "added": int(added) if added.isdigit() else None,
+                "deleted": int(deleted) if deleted.isdigit() else None,
+            }
+        )
+    return files
+
+
+def _totals(files):
+    return {
+        "files": len(files),
+        "added": sum(f["added"] or 0 for f in files),
+        "deleted": sum(f["deleted"] or 0 for f in files),
+    }
+
+
+async def _log(oids, input_data):
+    limit = min(max(1, int(input_data.get("limit") or DEFAULT_LIMIT)), MAX_LIMIT)
+    args = ["log", f"-n{limit}", "--format=%x1e%H%x1f%an%x1f%aI%x1f%s"]
+    for option in ("author", "since", "until", "grep"):
+        if input_data.get(option):
+            args.append(f"--{option}={input_data[option]}")
+    if input_data.get("stat"):
+        args.append("--numstat")
+    args += [oids[0], "--"]
+    if input_data.get("path"):
+        args.append(input_data["path"])
+
+    commits = []
+    for record in (await _git(*args)).split("\x1e")[1:]:
+        header, *rest = record.split("\n")
+        commit, author, date, subject = header.split("\x1f", 3)
+        entry = {
+            "commit": commit[:12],
+            "author": author,
+            "date": date,
+            "subject": subject,
+        }
+        if input_data.get("stat"):
+            entry.update(_totals(_numstat(rest)))
+        commits.append(entry)
+    return {"commits": commits, "more": len(commits) == limit}
+
+
+async def _show(oids, input_data):
+    header_format = "--format=%H%x1f%an%x1f%aI%x1f%P%x1f%B%x1e"
+    args = ["show", "--numstat", header_format, oids[0], "--"]
+    if input_data.get("path"):
+        args.append(input_data["path"])
+    output = await _git(*args)
+    if not output:
+        # git prints nothing for a commit that does not touch the path
+        output = await _git("show", "--no-patch", header_format, oids[0])
+    header, _, stats = output.partition("\x1e")
+    commit, author, date, parents, message = header.split("\x1f", 4)
+    files = _numstat(stats.splitlines())
+    result = {
+        "commit": commit,
+        "author": author,
+        "date": date,
+        "parents": [parent[:12] for parent in parents.split()],
+        "message": message.strip(),
+        **_totals(files),
+        "changes": files,
+    }
+    if input_data.get("patch"):
+        args = ["show", "--format=", "--patch", oids[0], "--"]
+        if input_data.get("path"):
+            args.append(input_data["path"])
+        result["patch"] = await _git(*args)
+    return result
+
+
+async def _blame(oids, input_data):
+    if not input_data.get("path"):
+        raise GitError("'blame' needs a 'path'")
+    start = max(1, int(input_data.get("start") or 1))
+    end = int(input_data.get("end") or start + 99)
+    end = min(max(start, end), start + MAX_BLAME_LINES - 1)
+    output = await _git(
+        "blame", "--porcelain", f"-L{start},{end}", oids[0], "--", input_data["path"]
+    )
+    commits, lines = {}, []
+    current = None
+    for line in output.splitlines():
+        if line.startswith("\t"):
+            lines.append([number, current[:12], line[1:]])
+            continue
+        header = _BLAME_HEADER.match(line)
+        if header:
+            current, number = header.group(1), int(header.group(2))
+            commits.setdefault(current[:12], {})
+            continue
+        key, _, value = line.partition(" ")
+        if key in ("author", "summary"):
+            commits[current[:12]][key] = value
+        elif key == "author-time":
+            commits[current[:12]]["time"] = int(value)
+    return {"path": input_data["path"], "commits": commits, "lines": lines}
+
+
+async def _diff_stat(oids, input_data):
+    args = ["diff", "--numstat", "-M", *oids, "--"]
+    if input_data.get("path"):
+        args.append(input_data["path"])
+    files = _numstat((await _git(*args)).splitlines())
+    return {**_totals(files), "changes": files}
+
+
+_OPERATIONS = {
+    "log": _log,
+    "show": _show,
+    "blame": _blame,
+    "diff_stat": _diff_stat,
+}
+# The list in each result that is trimmed to fit the token budget
+_ROW_KEYS = ("commits", "lines", "changes")
+# Inputs that shape each operation's result, and so belong in its cache key
+_PARAMETERS = {
+    "log": ("path", "author", "since", "until", "grep", "stat", "limit"),
+    "show": ("path", "patch"),
+    "blame": ("path", "start", "end"),
+    "diff_stat": ("path",),
+}
+
+
+def _cacheable(operation, input_data):
+    if operation == "diff_stat" and not input_data.get("head"):
+        return False  # compares with the working tree
+    return all(
+        _ABSOLUTE_TIME.match(str(input_data[option]).strip())
+        for option in ("since", "until")
+        if input_data.get(option)
+    )
+
+
+def _fit(result, max_chars):
+    """Trim the patch, then the rows of a result, until it fits the budget."""
+    text = compact_json(result)
+    if len(text) <= max_chars:
+        return text
+    result = dict(result)
+    notes = []
+    if isinstance(result.get("patch"), str):
+        patch = result["patch"]
+        result["patch"] = patch[: max(0, len(patch) - (len(text) - max_chars) - 100)]
+        notes.append("patch cut to fit max_tokens; narrow with 'path'")
+        text = compact_json({**result, "truncated": notes})
+        if len(text) <= max_chars:
+            return text
+    rows = next(
+        (key for key in _ROW_KEYS if isinstance(result.get(key), list) and result[key]),
+        None,
+    )
+    if rows is None:
+        return _cut_strings(result, notes, max_chars)
+    items = result[rows]
+    # Blame lines refer to commits; only keep the commits of the kept lines
+    commits = result["commits"] if rows == "lines" else None
+    fixed = {
+        key: value
+        for key, value in result.items()
+        if key != rows and not (commits is not None and key == "commits")
+    }
+    size = len(compact_json(fixed)) + 100  # room for the truncation note
+    kept, used = [], {}
+    for item in items:
+        extra = len(compact_json(item)) + 1
+        if commits is not None and item[1] not in used:
+            extra += len(compact_json({item[1]: commits[item[1]]}))
+        if size + extra > max_chars:
+            break
+        size += extra
+        kept.append(item)
+        if commits is not None:
+            used[item[1]] = commits[item[1]]
+    result[rows] = kept
+    if commits is not None:
+        result["commits"] = used
+    notes.append(
+        f"{len(items) - len(kept)} of {len(items)} {rows} left out to fit max_tokens"
+    )
+    return _cut_strings(result, notes, max_chars)
+
+
+def _cut_strings(result, notes, max_chars):
+    """Shorten the longest string fields until the JSON fits the budget."""
+    result = dict(result)
+    while True:
+        text = compact_json({**result, "truncated": notes} if notes else result)
+        excess = len(text) - max_chars
+        longest = max(
+            (key for key, value in result.items() if isinstance(value, str)),
+            key=lambda key: len(result[key]),
+            default=None,
+        )
+        if excess <= 0 or longest is None or not result[longest]:
+            return text
+        value = result[longest]
+        result[longest] = value[: max(0, len(value) - excess - 100)]
+        note = f"'{longest}' cut to fit max_tokens"
+        if note not in notes:
+            notes = [*notes, note]
+
+
+async def _run_operation(input_data):
+    operation = input_data["operation"]
+    refs = [input_data.get("ref") or "HEAD"]
+    if operation == "diff_stat" and input_data.get("head"):
+        refs.append(input_data["head"])
+    git_dir, prefix, oids = await _resolve(refs)
+
+    params = {
+        name: input_data[name]
+        for name in _PARAMETERS[operation]
+        if input_data.get(name) is not None
+    }
+    identity = [git_dir, prefix, operation, oids, params]
+    key = hashlib.sha1(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    cacheable = _cacheable(operation, input_data)
+    result = None
+    if cacheable and not input_data.get("fresh"):
+        result = await asyncio.to_thread(_get_cache().get, key)
+    if result is None:
+        result = await _OPERATIONS[operation](oids, input_data)
+        if cacheable:
+            # Keyed by commit ids, so the entry never goes stale
+            await asyncio.to_thread(_get_cache().set, key, result)
+    max_tokens = int(input_data.get("max_tokens") or DEFAULT_MAX_TOKENS)
+    return _fit(result, max(200, max_tokens * CHARS_PER_TOKEN))
+
+
+async def handle_call(input_data):
+    if input_data.get("operation"):
+        if input_data["operation"] not in _OPERATIONS:
+            return f"⚠️ Unknown operation. Use one of: {', '.join(_OPERATIONS)}."
+        try:
+            return await _run_operation(input_data)
+        except (GitError, ValueError) as e:
+            return f"❌ git {input_data['operation']}: {e}"
+        except Exception as e:
+            return f"Error executing git command: {e}"
+
+    args = input_data.get("args")
+    if not args:
+        return "⚠️ Provide an 'operation' or git 'args'."
+    try:
+        cmd = ["git"] + shlex.split(args)
+    except ValueError as e:
+        return f"❌ Could not parse args: {e}"
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        return f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}\nEXIT CODE: {result.returncode}"
+        if input_data.get("background"):
+            return background_message(start_job(cmd))
+        result = await run_command(cmd, TIMEOUT)
+        return format_result(result, TIMEOUT)
     except Exception as e:
         return f"Error executing git command: {e}"
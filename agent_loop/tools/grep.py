@@ -1,5 +1,4 @@
-import subprocess
-import shlex
+from agent_loop.subprocess_runner import run_command
 
 tool_definition = {
     "name": "grep_search",
@@ -42,7 +41,7 @@ tool_definition = {
 }
 
 
-def handle_call(input_data):
+async def handle_call(input_data):
     query = input_data["query"]
     include = input_data.get("include_pattern")
     exclude = input_data.get("exclude_pattern")
@@ -61,24 +60,22 @@ def handle_call(input_data):
     if exclude:
         cmd.extend(["--exclude", exclude])
 
-    cmd.extend([shlex.quote(query), shlex.quote(directory)])
+    cmd.extend(["-e", query, "--", directory])
 
     try:
-        result = subprocess.run(
-            " ".join(cmd), shell=True, capture_output=True, text=True, timeout=15
-        )
-        output = result.stdout.strip()
-        if result.returncode == 0 or output:
+        result = await run_command(cmd, timeout=15)
+        output = result["stdout"].strip()
+        if result["exit_code"] == 0 or output:
             return {
                 "matches": output.splitlines()[:50],
-                "exit_code": result.returncode,
-                "stderr": result.stderr,
+                "exit_code": result["exit_code"],
+                "stderr": result["stderr"],
             }
         else:
             return {
                 "matches": [],
-                "exit_code": result.returncode,
-                "stderr": result.stderr,
+                "exit_code": result["exit_code"],
+                "stderr": result["stderr"],
             }
     except Exception as e:
         return {"error": f"Execution error: {e}"}
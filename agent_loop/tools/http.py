@@ -1,63 +1,99 @@
-import subprocess
+import asyncio
+
+import requests
+
+from agent_loop.http_client import DEFAULT_MAX_BYTES, DEFAULT_TIMEOUT, request
 
 tool_definition = {
     "name": "http",
-    "description": "Make HTTP requests using HTTPie (`http` CLI). Easier JSON and header handling than curl.",
+    "description": (
+        "Make HTTP requests in-process over pooled keep-alive connections. Returns a structured result with "
+        "status, headers and body (capped in size). GET responses are cached locally and revalidated with "
+        "ETag/Last-Modified, so repeating a GET is cheap. Use 'json' for JSON bodies and 'params' for the query string."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
             "method": {
                 "type": "string",
-                "description": "HTTP method (GET, POST, PUT, DELETE, etc.)",
+                "description": "HTTP method (GET, POST, PUT, PATCH, DELETE, HEAD, OPTIONS)",
+                "default": "GET",
             },
             "url": {"type": "string", "description": "Target URL"},
             "headers": {
-                "type": "string",
-                "description": "Optional headers in 'Key:Value\\nKey2:Value2' format",
-                "default": "",
+                "type": ["object", "string"],
+                "description": "Request headers as an object, or as 'Key: Value' lines",
+            },
+            "params": {
+                "type": "object",
+                "description": "Query string parameters",
+            },
+            "json": {
+                "description": "JSON request body (any JSON value); sets Content-Type automatically",
             },
             "body": {
                 "type": "string",
-                "description": "Optional request body (JSON string or key=value pairs)",
-                "default": "",
+                "description": "Raw request body (alternative to 'json')",
+            },
+            "timeout": {
+                "type": "number",
+                "description": f"Timeout in seconds (default: {DEFAULT_TIMEOUT})",
+                "default": DEFAULT_TIMEOUT,
+            },
+            "max_bytes": {
+                "type": "integer",
+                "description": f"Maximum response body size to read (default: {DEFAULT_MAX_BYTES})",
+                "default": DEFAULT_MAX_BYTES,
+            },
+            "cache": {
+                "type": "boolean",
+                "description": "Use the local response cache for GET requests (default: true)",
+                "default": True,
+            },
+            "follow_redirects": {
+                "type": "boolean",
+                "description": "Follow redirects (default: true)",
+                "default": True,
             },
         },
-        "required": ["method", "url"],
+        "required": ["url"],
     },
 }
 
 
-def handle_call(input_data):
-    method = input_data["method"].upper()
-    url = input_data["url"]
-    headers = input_data.get("headers", "")
-    body = input_data.get("body", "")
+def _parse_headers(headers):
+    if not headers:
+        return {}
+    if isinstance(headers, dict):
+        return {str(k): str(v) for k, v in headers.items()}
+    parsed = {}
+    for line in headers.strip().splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            parsed[key.strip()] = value.strip()
+    return parsed
 
-    cmd = ["http", method, url, "--print=hb"]
-
-    if headers:
-        for line in headers.strip().splitlines():
-            if ":" in line:
-                cmd.append(f"{line.strip()}")
-
-    if body:
-        # Assume it's either JSON or form-like string
-        if body.strip().startswith("{"):
-            cmd.append(f"'{body.strip()}'")  # raw JSON
-        else:
-            for part in body.strip().splitlines():
-                cmd.append(part.strip())
 
+async def handle_call(input_data):
     try:
-        result = subprocess.run(
-            " ".join(cmd), shell=True, capture_output=True, text=True, timeout=15
-        )
-        return (
-            f"STDOUT:\n{result.stdout}\n"
-            f"STDERR:\n{result.stderr}\n"
-            f"EXIT CODE: {result.returncode}"
+        return await asyncio.to_thread(
+            request,
+            input_data.get("method", "GET"),
+            input_data["url"],
+            headers=_parse_headers(input_data.get("headers")),
+            params=input_data.get("params"),
+            data=input_data.get("body") or None,
+            json_body=input_data.get("json"),
+            timeout=input_data.get("timeout", DEFAULT_TIMEOUT),
+            max_bytes=input_data.get("max_bytes", DEFAULT_MAX_BYTES),
+            use_cache=input_data.get("cache", True),
+            allow_redirects=input_data.get("follow_redirects", True),
         )
-    except subprocess.TimeoutExpired:
-        return "HTTPie command timed out."
+    except requests.exceptions.Timeout:
+        return {
+            "error": f"Request timed out after {input_data.get('timeout', DEFAULT_TIMEOUT)}s"
+        }
+    except requests.exceptions.RequestException as e:
+        return {"error": f"Request failed: {e}"}
     except Exception as e:
-        return f"Error executing HTTPie command: {e}"
+        return {"error": f"Error performing HTTP request: {e}"}
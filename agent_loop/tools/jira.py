@@ -1,7 +1,16 @@
+import asyncio
+import hashlib
+import json
 import os
+import re
+
 import requests
 from dotenv import load_dotenv
 
+from agent_loop.cache import DiskCache
+from agent_loop.http_client import get_session
+from agent_loop.projection import compact_json, project
+
 # Load .env once at module level
 load_dotenv(dotenv_path=os.path.expanduser("~/.config/agent-loop/.env"))
 
@@ -9,51 +18,187 @@ JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
 JIRA_EMAIL = os.getenv("JIRA_EMAIL")
 JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
 
+TIMEOUT = 10
+ISSUE_TTL = 300
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+PAGE_SIZE = 50
+DEFAULT_FIELDS = [
+    "summary",
+    "status.name",
+    "issuetype.name",
+    "priority.name",
+    "assignee.displayName",
+    "reporter.displayName",
+    "created",
+    "updated",
+]
+
+_ISSUE_ENDPOINT = re.compile(r"^/rest/api/\d+/issue/[A-Za-z0-9_-]+/?$")
+
+_cache = None
+
 tool_definition = {
     "name": "jira",
-    "description": "Query JIRA via REST API using safe, read-only endpoints",
+    "description": (
+        "Query JIRA via REST API using safe, read-only endpoints. Use mode 'search' with a JQL query to list "
+        "issues (pages are followed up to 'limit'), or mode 'get' for any endpoint. Only the "
+        "requested 'fields' (dotted paths such as 'status.name') are returned, as compact JSON; issue reads "
+        "are cached for a few minutes unless 'fresh' is set."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
+            "mode": {
+                "type": "string",
+                "enum": ["get", "search"],
+                "description": "'get' calls an endpoint, 'search' runs a JQL query (default: get)",
+                "default": "get",
+            },
             "endpoint": {
                 "type": "string",
                 "description": (
-                    "JIRA API endpoint path, e.g., '/rest/api/3/issue/ISSUE-123' or '/rest/api/3/project'"
+                    "JIRA API endpoint path for mode 'get', e.g., '/rest/api/3/issue/ISSUE-123' or '/rest/api/3/project'"
                 ),
             },
             "params": {
                 "type": "object",
                 "description": "Optional query parameters as a key-value object",
             },
+            "jql": {
+                "type": "string",
+                "description": "JQL query for mode 'search', e.g., 'project = ABC AND status = \"In Progress\"'",
+            },
+            "fields": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": (
+                    "Dotted field paths to return (default for issues: summary, status, type, priority, "
+                    "assignee, reporter, created, updated). Use ['*all'] for the full payload."
+                ),
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum issues to return in mode 'search' (default: {DEFAULT_LIMIT}, max: {MAX_LIMIT})",
+                "default": DEFAULT_LIMIT,
+            },
+            "fresh": {
+                "type": "boolean",
+                "description": "Bypass the issue cache (default: false)",
+                "default": False,
+            },
         },
-        "required": ["endpoint"],
     },
 }
 
 
-def handle_call(input_data):
-    if not all([JIRA_BASE_URL, JIRA_EMAIL, JIRA_API_TOKEN]):
-        return "Missing JIRA credentials. Please set JIRA_BASE_URL, JIRA_EMAIL, and JIRA_API_TOKEN in your .env file."
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache("jira")
+    return _cache
+
 
-    endpoint = input_data["endpoint"]
-    params = input_data.get("params", {})
+def _get(endpoint, params):
+    response = get_session().get(
+        JIRA_BASE_URL.rstrip("/") + endpoint,
+        auth=(JIRA_EMAIL, JIRA_API_TOKEN),
+        params=params,
+        headers={"Accept": "application/json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json()
 
+
+def _server_fields(fields):
+    """Top-level field names for Jira's `fields=` parameter."""
+    return ",".join(dict.fromkeys(path.split(".")[0] for path in fields))
+
+
+def _project_issue(issue, fields):
+    return {"key": issue.get("key"), **project(issue.get("fields") or {}, fields)}
+
+
+def _get_issue(endpoint, params, fields, fresh):
+    full = fields == ["*all"]
+    params = dict(params)
+    if not full:
+        params.setdefault("fields", _server_fields(fields))
+    key = hashlib.sha1(
+        json.dumps([JIRA_BASE_URL, endpoint, sorted(params.items())]).encode("utf-8")
+    ).hexdigest()
+    issue = None if fresh else _get_cache().get(key)
+    if issue is None:
+        issue = _get(endpoint, params)
+        _get_cache().set(key, issue, ttl=ISSUE_TTL)
+    return issue if full else _project_issue(issue, fields)
+
+
+def _search(jql, fields, limit):
+    full = fields == ["*all"]
+    base = {"jql": jql, "fields": "*all" if full else _server_fields(fields)}
+    issues = []
+    more = False
+    token = None
+    # The enhanced search pages with an opaque cursor, so pages are sequential
+    while len(issues) < limit:
+        params = {**base, "maxResults": min(PAGE_SIZE, limit - len(issues))}
+        if token:
+            params["nextPageToken"] = token
+        page = _get("/rest/api/3/search/jql", params)
+        issues.extend(page.get("issues", []))
+        token = page.get("nextPageToken")
+        more = bool(token) and not page.get("isLast", False)
+        if not more or not page.get("issues"):
+            break
+    issues = issues[:limit]
+    return {
+        "returned": len(issues),
+        "more": more,
+        "issues": [
+            issue if full else _project_issue(issue, fields) for issue in issues
+        ],
+    }
+
+
+def _run(input_data):
+    mode = input_data.get("mode", "get")
+    fields = input_data.get("fields") or DEFAULT_FIELDS
+
+    if mode == "search":
+        jql = input_data.get("jql")
+        if not jql:
+            return "❌ 'jql' is required for mode 'search'"
+        limit = max(1, min(int(input_data.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+        return compact_json(_search(jql, fields, limit))
+
+    endpoint = input_data.get("endpoint")
+    if not endpoint:
+        return "❌ 'endpoint' is required for mode 'get'"
     if not endpoint.startswith("/"):
         endpoint = "/" + endpoint
+    params = input_data.get("params") or {}
+
+    if _ISSUE_ENDPOINT.match(endpoint):
+        return compact_json(
+            _get_issue(endpoint, params, fields, input_data.get("fresh", False))
+        )
+    result = _get(endpoint, params)
+    if input_data.get("fields") and fields != ["*all"]:
+        result = project(result, fields)
+    return compact_json(result)
 
-    url = JIRA_BASE_URL.rstrip("/") + endpoint
+
+async def handle_call(input_data):
+    if not all([JIRA_BASE_URL, JIRA_EMAIL, JIRA_API_TOKEN]):
+        return "Missing JIRA credentials. Please set JIRA_BASE_URL, JIRA_EMAIL, and JIRA_API_TOKEN in your .env file."
 
     try:
-        response = requests.get(
-            url,
-            auth=(JIRA_EMAIL, JIRA_API_TOKEN),
-            params=params,
-            headers={"Accept": "application/json"},
-            timeout=10,
-        )
-        response.raise_for_status()
-        return f"Response ({response.status_code}):\n{response.json()}"
+        return await asyncio.to_thread(_run, input_data)
     except requests.exceptions.HTTPError as e:
-        return f"HTTP Error: {e.response.status_code} {e.response.text}"
+        return f"HTTP Error: {e.response.status_code} {e.response.text[:2000]}"
     except requests.exceptions.RequestException as e:
         return f"Request failed: {e}"
+    except ValueError as e:
+        return f"❌ Invalid response or input: {e}"
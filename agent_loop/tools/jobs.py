@@ -0,0 +1,80 @@
+import asyncio
+
+from agent_loop.jobs import (
+    JobError,
+    cancel_job,
+    get_job,
+    list_jobs,
+    read_output,
+    wait_job,
+)
+
+MAX_WAIT_SECONDS = 600
+
+tool_definition = {
+    "name": "jobs",
+    "description": (
+        "Manage background jobs started with 'background': true by the bash, git, docker, kubectl and "
+        "aws_cli tools. List jobs, check a job's status, read its output incrementally (pass back "
+        "'next_offset' as 'offset' to get only new output), wait for it with a deadline, or cancel it."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "operation": {
+                "type": "string",
+                "enum": ["list", "status", "output", "wait", "cancel"],
+                "description": "What to do",
+            },
+            "job_id": {
+                "type": "string",
+                "description": "Job id, e.g. 'job-3' (all operations except list)",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Byte offset to read output from (output, wait)",
+                "default": 0,
+            },
+            "max_bytes": {
+                "type": "integer",
+                "description": "Maximum bytes of output to return (default: 16384)",
+                "default": 16384,
+            },
+            "timeout": {
+                "type": "integer",
+                "description": f"Seconds to wait for the job to finish (wait; default: 30, max: {MAX_WAIT_SECONDS})",
+                "default": 30,
+            },
+        },
+        "required": ["operation"],
+    },
+}
+
+
+async def handle_call(input_data):
+    operation = input_data["operation"]
+    job_id = input_data.get("job_id")
+    offset = input_data.get("offset", 0)
+    max_bytes = max(1, input_data.get("max_bytes", 16384))
+
+    try:
+        if operation == "list":
+            return {"jobs": list_jobs()}
+        if not job_id:
+            return {"error": f"'job_id' is required for {operation}"}
+        if operation == "status":
+            return get_job(job_id).summary()
+        if operation == "output":
+            return read_output(job_id, offset, max_bytes)
+        if operation == "wait":
+            timeout = max(0, min(input_data.get("timeout", 30), MAX_WAIT_SECONDS))
+            await asyncio.to_thread(wait_job, job_id, timeout)
+            return read_output(job_id, offset, max_bytes)
+        if operation == "cancel":
+            summary = await asyncio.to_thread(cancel_job, job_id)
+            return {**summary, **read_output(job_id, offset, max_bytes)}
+        return {"error": f"Unsupported operation: {operation}"}
+    except JobError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Job operation failed: {e}"}
@@ -1,8 +1,26 @@
+import io
 import json
+import os
+
+from agent_loop.json_query import QueryError, run_query
+from agent_loop.json_stream import JSONStreamError, validate
+from agent_loop.projection import compact_json
+
+# Files larger than this are only queried or validated, never re-printed whole
+MAX_FORMAT_BYTES = 5_000_000
+MAX_OUTPUT_CHARS = 20_000
+DEFAULT_LIMIT = 20
+_JSONL_EXTENSIONS = (".jsonl", ".ndjson")
 
 tool_definition = {
     "name": "json",
-    "description": "Validate and format JSON. Supports pretty-printing, minifying, and sorting keys.",
+    "description": (
+        "Validate, format and query JSON. Works on an inline 'json_string' or on a file 'path' (JSON or JSON "
+        "lines), which is read incrementally, so large API dumps can be queried with bounded memory. "
+        "Mode 'query' takes a jq-like 'query': paths (.a.b, .a[0], .items[]), select(.x > 1 and .y == \"z\"), "
+        "projections {id, name: .user.name}, length and keys, joined with '|'. Add 'count', 'count_by', "
+        "'sort_by' (top-N) and 'limit' to keep outputs small."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
@@ -10,39 +28,149 @@ tool_definition = {
                 "type": "string",
                 "description": "The raw JSON string to validate and format",
             },
+            "path": {
+                "type": "string",
+                "description": "Path to a JSON or JSON-lines file to read instead of 'json_string'",
+            },
             "mode": {
                 "type": "string",
-                "description": "Choose 'pretty', 'minify', or 'validate'",
-                "enum": ["pretty", "minify", "validate"],
+                "description": "Choose 'pretty', 'minify', 'validate' or 'query'",
+                "enum": ["pretty", "minify", "validate", "query"],
             },
             "sort_keys": {
                 "type": "boolean",
                 "description": "Sort JSON object keys alphabetically (applies to pretty or minify)",
                 "default": False,
             },
+            "query": {
+                "type": "string",
+                "description": "jq-like query for mode 'query', e.g. '.items[] | select(.status == \"open\") | {id, title}'",
+                "default": ".",
+            },
+            "jsonl": {
+                "type": "boolean",
+                "description": "Treat the input as JSON lines, one document per line (default: by file extension)",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum results (or groups for count_by) to return (default: {DEFAULT_LIMIT})",
+                "default": DEFAULT_LIMIT,
+            },
+            "count": {
+                "type": "boolean",
+                "description": "Return only the number of query results",
+                "default": False,
+            },
+            "count_by": {
+                "type": "string",
+                "description": "Path within each result to group and count by, e.g. '.status'",
+            },
+            "sort_by": {
+                "type": "string",
+                "description": "Numeric path within each result; returns the top 'limit' results",
+            },
+            "order": {
+                "type": "string",
+                "enum": ["desc", "asc"],
+                "description": "Order for sort_by (default: desc)",
+                "default": "desc",
+            },
         },
-        "required": ["json_string", "mode"],
+        "required": ["mode"],
     },
 }
 
 
+def _open(input_data):
+    """A text stream over the input and whether it is JSON lines."""
+    if input_data.get("path"):
+        path = os.path.expanduser(input_data["path"])
+        jsonl = input_data.get("jsonl")
+        if jsonl is None:
+            jsonl = path.lower().endswith(_JSONL_EXTENSIONS)
+        return open(path, "r", encoding="utf-8"), jsonl
+    if "json_string" not in input_data:
+        raise ValueError("Provide either 'json_string' or 'path'.")
+    return io.StringIO(input_data["json_string"]), bool(input_data.get("jsonl"))
+
+
+def _format(obj, mode, sort_keys):
+    if mode == "pretty":
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, ensure_ascii=False)
+    return json.dumps(
+        obj, separators=(",", ":"), sort_keys=sort_keys, ensure_ascii=False
+    )
+
+
+def _cap(text):
+    if len(text) > MAX_OUTPUT_CHARS:
+        return (
+            text[:MAX_OUTPUT_CHARS]
+            + f"\n[... {len(text) - MAX_OUTPUT_CHARS} more characters truncated; use mode 'query' to narrow it down]"
+        )
+    return text
+
+
 def handle_call(input_data):
-    raw = input_data["json_string"]
     mode = input_data["mode"]
     sort_keys = input_data.get("sort_keys", False)
 
+    if mode not in ("pretty", "minify", "validate", "query"):
+        return "⚠️ Unknown mode. Please use 'pretty', 'minify', 'validate' or 'query'."
+
     try:
-        obj = json.loads(raw)
-    except json.JSONDecodeError as e:
-        return f"❌ Invalid JSON: {e}"
+        stream, jsonl = _open(input_data)
+    except (OSError, ValueError) as e:
+        return f"❌ {e}"
 
-    if mode == "validate":
-        return "✅ JSON is valid."
+    with stream:
+        try:
+            if mode == "query":
+                result = run_query(
+                    stream,
+                    input_data.get("query") or ".",
+                    jsonl=jsonl,
+                    limit=max(1, int(input_data.get("limit", DEFAULT_LIMIT))),
+                    count=input_data.get("count", False),
+                    count_by=input_data.get("count_by"),
+                    sort_by=input_data.get("sort_by"),
+                    descending=input_data.get("order", "desc") != "asc",
+                )
+                return _cap(compact_json(result))
 
-    if mode == "pretty":
-        return json.dumps(obj, indent=2, sort_keys=sort_keys)
+            if jsonl:
+                lines = 0
+                for number, line in enumerate(stream, 1):
+                    if line.strip():
+                        try:
+                            json.loads(line)
+                        except json.JSONDecodeError as e:
+                            return f"❌ Invalid JSON on line {number}: {e}"
+                        lines += 1
+                if mode == "validate":
+                    return f"✅ JSON lines are valid ({lines} documents)."
+                return "⚠️ Use mode 'query' to read JSON lines."
 
-    if mode == "minify":
-        return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys)
+            if mode == "validate":
+                items = validate(stream)
+                return f"✅ JSON is valid ({items} top-level items)."
 
-    return "⚠️ Unknown mode. Please use 'pretty', 'minify', or 'validate'."
+            if (
+                input_data.get("path")
+                and os.path.getsize(os.path.expanduser(input_data["path"]))
+                > MAX_FORMAT_BYTES
+            ):
+                return (
+                    f"⚠️ File is larger than {MAX_FORMAT_BYTES} bytes; "
+                    "use mode 'query' to extract the part you need."
+                )
+            obj = json.load(stream)
+            return _cap(_format(obj, mode, sort_keys))
+        except json.JSONDecodeError as e:
+            return f"❌ Invalid JSON: {e}"
+        except JSONStreamError as e:
+            return f"❌ Invalid JSON: {e}"
+        except QueryError as e:
+            return f"❌ Invalid query: {e}"
+        except (OSError, UnicodeDecodeError) as e:
+            return f"❌ Could not read input: {e}"
@@ -1,4 +1,7 @@
-import subprocess
+from agent_loop.jobs import background_message, start_job
+from agent_loop.subprocess_runner import format_result, run_command
+
+TIMEOUT = 15
 
 tool_definition = {
     "name": "kubectl",
@@ -9,21 +12,26 @@ tool_definition = {
             "args": {
                 "type": "string",
                 "description": "Arguments to pass to kubectl (e.g., 'get pods -n default')",
-            }
+            },
+            "background": {
+                "type": "boolean",
+                "description": "Run as a background job and return its id immediately (see the jobs tool)",
+                "default": False,
+            },
         },
         "required": ["args"],
     },
 }
 
 
-def handle_call(input_data):
+async def handle_call(input_data):
     args = input_data["args"]
     cmd = ["kubectl"] + args.strip().split()
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        return f"STDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}\nEXIT CODE: {result.returncode}"
-    except subprocess.TimeoutExpired:
-        return "kubectl command timed out."
+        if input_data.get("background"):
+            return background_message(start_job(cmd))
+        result = await run_command(cmd, TIMEOUT)
+        return format_result(result, TIMEOUT)
     except Exception as e:
         return f"Error executing kubectl command: {e}"
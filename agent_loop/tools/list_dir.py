@@ -1,11 +1,21 @@
+import base64
+import datetime
+import fnmatch
+import heapq
+import json
 import os
 
+TYPE_ORDER = {"directory": 0, "file": 1, "other": 2}
+MAX_SUBDIRS = 50
+
 tool_definition = {
     "name": "list_dir",
     "description": (
         "List the contents of a directory. The quick tool to use for discovery, "
         "before using more targeted tools like semantic search or file reading. "
-        "Useful to try to understand the file structure before diving deeper into specific files."
+        "Useful to try to understand the file structure before diving deeper into specific files. "
+        "Results are paginated: pass back 'next_cursor' as 'cursor' to get the next page. "
+        "Supports glob/type/size/mtime filters, sorting, size/mtime columns and depth-bounded entry counts for subdirectories."
     ),
     "input_schema": {
         "type": "object",
@@ -18,29 +28,228 @@ tool_definition = {
                 "type": "string",
                 "description": "Why the agent is listing this directory and how it helps.",
             },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of entries per page (default: 200)",
+                "default": 200,
+            },
+            "cursor": {
+                "type": "string",
+                "description": "Opaque cursor returned as 'next_cursor' by the previous page",
+            },
+            "sort": {
+                "type": "string",
+                "enum": ["name", "size", "mtime", "type"],
+                "description": "Sort key (default: name)",
+                "default": "name",
+            },
+            "reverse": {
+                "type": "boolean",
+                "description": "Sort in descending order",
+                "default": False,
+            },
+            "glob": {
+                "type": "string",
+                "description": "Only include names matching this glob, e.g. '*.py'",
+            },
+            "type": {
+                "type": "string",
+                "enum": ["file", "directory", "other"],
+                "description": "Only include entries of this type",
+            },
+            "min_size": {
+                "type": "integer",
+                "description": "Only include files of at least this many bytes",
+            },
+            "max_size": {
+                "type": "integer",
+                "description": "Only include files of at most this many bytes",
+            },
+            "modified_after": {
+                "type": "string",
+                "description": "Only include entries modified after this ISO date/time, e.g. '2024-05-01'",
+            },
+            "modified_before": {
+                "type": "string",
+                "description": "Only include entries modified before this ISO date/time",
+            },
+            "details": {
+                "type": "boolean",
+                "description": "Include size (bytes) and modified (ISO time) columns",
+                "default": False,
+            },
+            "depth": {
+                "type": "integer",
+                "description": (
+                    "Recurse into listed subdirectories up to this depth, reporting entry counts "
+                    "(files/dirs) per directory instead of their full listings (default: 0)"
+                ),
+                "default": 0,
+            },
         },
         "required": ["relative_workspace_path"],
     },
 }
 
 
+def _entry_type(entry):
+    if entry.is_dir():
+        return "directory"
+    if entry.is_file():
+        return "file"
+    return "other"
+
+
+def _timestamp(value):
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _encode_cursor(key, state):
+    raw = json.dumps({"key": key, **state}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+
+
+def _count_entries(path, depth):
+    """Count immediate children of a directory; recurse into subdirectories while depth > 1."""
+    counts = {"files": 0, "dirs": 0, "other": 0}
+    subdirs = {}
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry_type = _entry_type(entry)
+            if entry_type == "directory":
+                counts["dirs"] += 1
+                if depth > 1 and len(subdirs) < MAX_SUBDIRS:
+                    try:
+                        subdirs[entry.name] = _count_entries(entry.path, depth - 1)
+                    except OSError as e:
+                        subdirs[entry.name] = {"error": str(e)}
+            elif entry_type == "file":
+                counts["files"] += 1
+            else:
+                counts["other"] += 1
+    if subdirs:
+        counts["subdirs"] = subdirs
+        if counts["dirs"] > len(subdirs):
+            counts["subdirs_truncated"] = counts["dirs"] - len(subdirs)
+    return counts
+
+
 def handle_call(input_data):
     path = input_data["relative_workspace_path"]
+    limit = max(1, input_data.get("limit", 200))
+    cursor = input_data.get("cursor")
+    sort = input_data.get("sort", "name")
+    reverse = input_data.get("reverse", False)
+    pattern = input_data.get("glob")
+    wanted_type = input_data.get("type")
+    min_size = input_data.get("min_size")
+    max_size = input_data.get("max_size")
+    details = input_data.get("details", False)
+    depth = input_data.get("depth", 0)
 
     try:
-        entries = os.listdir(path)
-        entries_info = []
-        for entry in sorted(entries):
-            full_path = os.path.join(path, entry)
-            if os.path.isdir(full_path):
-                entry_type = "directory"
-            elif os.path.isfile(full_path):
-                entry_type = "file"
-            else:
-                entry_type = "other"
-            entries_info.append({"name": entry, "type": entry_type})
+        after = (
+            _timestamp(input_data["modified_after"])
+            if input_data.get("modified_after")
+            else None
+        )
+        before = (
+            _timestamp(input_data["modified_before"])
+            if input_data.get("modified_before")
+            else None
+        )
+        state = {"path": os.path.abspath(path), "sort": sort, "reverse": reverse}
+        last_key = None
+        if cursor:
+            decoded = _decode_cursor(cursor)
+            if any(decoded.get(k) != v for k, v in state.items()):
+                return {
+                    "error": "Cursor does not match this listing; restart without 'cursor'."
+                }
+            last_key = tuple(decoded["key"])
+
+        # Only stat when a column, filter or sort key needs it; DirEntry already knows the type
+        needs_stat = (
+            details
+            or sort in ("size", "mtime")
+            or any(v is not None for v in (min_size, max_size, after, before))
+        )
+
+        total = 0
+        candidates = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                if pattern and not fnmatch.fnmatch(name, pattern):
+                    continue
+                entry_type = _entry_type(entry)
+                if wanted_type and entry_type != wanted_type:
+                    continue
+                size = mtime = None
+                if needs_stat:
+                    stat = entry.stat()
+                    size = stat.st_size if entry_type == "file" else 0
+                    mtime = stat.st_mtime
+                    if min_size is not None and (
+                        entry_type != "file" or size < min_size
+                    ):
+                        continue
+                    if max_size is not None and (
+                        entry_type != "file" or size > max_size
+                    ):
+                        continue
+                    if after is not None and mtime <= after:
+                        continue
+                    if before is not None and mtime >= before:
+                        continue
+                total += 1
+
+                if sort == "size":
+                    key = (size, name)
+                elif sort == "mtime":
+                    key = (mtime, name)
+                elif sort == "type":
+                    key = (TYPE_ORDER[entry_type], name)
+                else:
+                    key = (name,)
+                if last_key is not None and (
+                    key <= last_key if not reverse else key >= last_key
+                ):
+                    continue
+                candidates.append((key, name, entry_type, size, mtime, entry.path))
+                # Keep memory bounded by the page size, not the directory size
+                if len(candidates) > 4 * (limit + 1):
+                    select = heapq.nlargest if reverse else heapq.nsmallest
+                    candidates = select(limit + 1, candidates)
+
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        page = select(limit + 1, candidates)
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        contents = []
+        for key, name, entry_type, size, mtime, full_path in page:
+            item = {"name": name, "type": entry_type}
+            if details:
+                item["size"] = size
+                item["modified"] = datetime.datetime.fromtimestamp(mtime).isoformat(
+                    timespec="seconds"
+                )
+            if depth > 0 and entry_type == "directory":
+                try:
+                    item["entries"] = _count_entries(full_path, depth)
+                except OSError as e:
+                    item["entries"] = {"error": str(e)}
+            contents.append(item)
 
-        return {"path": path, "contents": entries_info}
+        result = {"path": path, "total": total, "contents": contents}
+        if has_more:
+            result["next_cursor"] = _encode_cursor(list(page[-1][0]), state)
+        return result
 
     except Exception as e:
         return {"error": f"Could not list directory '{path}': {e}"}
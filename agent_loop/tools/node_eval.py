@@ -1,6 +1,9 @@
-import subprocess
-import tempfile
 import os
+import tempfile
+
+from agent_loop.subprocess_runner import format_result, run_command
+
+TIMEOUT = 5
 
 tool_definition = {
     "name": "node",
@@ -15,7 +18,7 @@ tool_definition = {
 }
 
 
-def handle_call(input_data):
+async def handle_call(input_data):
     code = input_data["code"]
 
     try:
@@ -24,18 +27,11 @@ def handle_call(input_data):
             temp_path = temp_file.name
 
         # Run the code in a subprocess
-        result = subprocess.run(
-            ["node", temp_path], capture_output=True, text=True, timeout=5
-        )
-
-        os.remove(temp_path)
-
-        return (
-            f"STDOUT:\n{result.stdout}\n"
-            f"STDERR:\n{result.stderr}\n"
-            f"EXIT CODE: {result.returncode}"
-        )
-    except subprocess.TimeoutExpired:
-        return "Node.js code execution timed out."
+        try:
+            result = await run_command(["node", temp_path], TIMEOUT)
+        finally:
+            os.remove(temp_path)
+
+        return format_result(result, TIMEOUT)
     except Exception as e:
         return f"Error executing sandboxed Node.js: {e}"
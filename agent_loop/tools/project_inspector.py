@@ -1,8 +1,43 @@
 import os
+from collections import OrderedDict
+
+from agent_loop.walker import BINARY_EXTENSIONS, is_binary_file, walk
+
+# Files that say the most about a project, previewed first
+MANIFEST_FILES = {
+    "pyproject.toml",
+    "setup.py",
+    "setup.cfg",
+    "requirements.txt",
+    "Pipfile",
+    "package.json",
+    "tsconfig.json",
+    "Cargo.toml",
+    "go.mod",
+    "pom.xml",
+    "build.gradle",
+    "build.gradle.kts",
+    "Gemfile",
+    "composer.json",
+    "Makefile",
+    "Dockerfile",
+    "docker-compose.yml",
+    "docker-compose.yaml",
+    "CMakeLists.txt",
+}
+
+# Snapshots of previously inspected trees, keyed by (path, max_depth); the
+# least recently inspected are dropped beyond MAX_SNAPSHOTS
+MAX_SNAPSHOTS = 16
+_SNAPSHOTS: "OrderedDict[tuple, dict]" = OrderedDict()
 
 tool_definition = {
     "name": "project_inspector",
-    "description": "Inspect the current project directory and preview source files",
+    "description": (
+        "Inspect a project directory: key files (manifests, READMEs) with previews and a size-capped tree. "
+        "Honours .gitignore and skips VCS/dependency folders. Repeat calls on the same path return only "
+        "what changed since the last inspection unless 'full' is true."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
@@ -18,43 +53,153 @@ tool_definition = {
             },
             "preview_bytes": {
                 "type": "integer",
-                "description": "Number of bytes to preview from each file",
+                "description": "Number of bytes to preview from each key file",
                 "default": 500,
             },
+            "max_files": {
+                "type": "integer",
+                "description": "Maximum number of files listed in the tree",
+                "default": 200,
+            },
+            "max_output_chars": {
+                "type": "integer",
+                "description": "Maximum size of the whole answer in characters",
+                "default": 12000,
+            },
+            "full": {
+                "type": "boolean",
+                "description": "Return the full snapshot even if this path was inspected before",
+                "default": False,
+            },
         },
         "required": [],
     },
 }
 
 
+def _format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _is_key_file(name):
+    lower = name.lower()
+    return (
+        name in MANIFEST_FILES
+        or lower.startswith("readme")
+        or (lower.startswith("requirements") and lower.endswith(".txt"))
+    )
+
+
+def _preview(path, preview_bytes):
+    if is_binary_file(path):
+        return "[binary]"
+    with open(path, "r", encoding="utf-8", errors="ignore") as fp:
+        content = fp.read(preview_bytes)
+    return content.strip().replace("\n", " ")[:200]
+
+
+def _render_snapshot(root, entries, preview_bytes, max_files, max_output_chars):
+    files = [e for e in entries if e["type"] == "file"]
+    dirs = [e for e in entries if e["type"] == "directory"]
+    total_size = sum(e["size"] for e in files)
+    output = [
+        f"{os.path.basename(root) or root}/ — {len(files)} files, {len(dirs)} directories, {_format_size(total_size)}"
+    ]
+
+    key_files = sorted(
+        (e for e in files if _is_key_file(os.path.basename(e["path"]))),
+        key=lambda e: (e["depth"], e["path"]),
+    )
+    if key_files:
+        output.append("\nKey files:")
+        for entry in key_files[:10]:
+            output.append(f"  {entry['path']}")
+            try:
+                output.append(
+                    f"    Preview: {_preview(os.path.join(root, entry['path']), preview_bytes)}"
+                )
+            except Exception as e:
+                output.append(f"    Error reading file: {e}")
+
+    output.append("\nTree:")
+    used = sum(len(line) + 1 for line in output)
+    listed = 0
+    # Sort by path components so "a/b" stays under "a/", ahead of "a-b"
+    for entry in sorted(entries, key=lambda e: e["path"].split("/")):
+        indent = "  " * (entry["depth"] + 1)
+        name = os.path.basename(entry["path"])
+        if entry["type"] == "directory":
+            line = f"{indent}{name}/"
+        else:
+            if listed >= max_files:
+                continue
+            listed += 1
+            marker = (
+                " [binary]"
+                if os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS
+                else ""
+            )
+            line = f"{indent}{name} ({_format_size(entry['size'])}){marker}"
+        if used + len(line) + 1 > max_output_chars:
+            break
+        output.append(line)
+        used += len(line) + 1
+
+    hidden = len(files) - listed
+    if hidden > 0 or used >= max_output_chars:
+        output.append(
+            f"\n[truncated: {max(hidden, 0)} more files not shown; narrow 'path' or lower 'max_depth']"
+        )
+    return "\n".join(output)
+
+
+def _render_diff(previous, current, max_files):
+    added = sorted(set(current) - set(previous))
+    removed = sorted(set(previous) - set(current))
+    modified = sorted(p for p in current if p in previous and current[p] != previous[p])
+    if not (added or removed or modified):
+        return "No changes since the last inspection. Use 'full': true to see the whole snapshot."
+
+    output = ["Changes since the last inspection:"]
+    for label, paths in (
+        ("Added", added),
+        ("Removed", removed),
+        ("Modified", modified),
+    ):
+        if paths:
+            output.append(f"{label} ({len(paths)}):")
+            output.extend(f"  {p}" for p in paths[:max_files])
+            if len(paths) > max_files:
+                output.append(f"  ... {len(paths) - max_files} more")
+    return "\n".join(output)
+
+
 def handle_call(input_data):
     path = input_data.get("path", ".")
     max_depth = input_data.get("max_depth", 2)
     preview_bytes = input_data.get("preview_bytes", 500)
-
-    output = []
+    max_files = input_data.get("max_files", 200)
+    max_output_chars = input_data.get("max_output_chars", 12000)
+    full = input_data.get("full", False)
 
     try:
-        for root, dirs, files in os.walk(path):
-            depth = os.path.relpath(root, path).count(os.sep)
-            if depth > max_depth:
-                dirs[:] = []
-                continue
-
-            indent = "  " * depth
-            output.append(f"{indent}{os.path.basename(root)}/")
-
-            for f in files:
-                file_path = os.path.join(root, f)
-                output.append(f"{indent}  {f}")
-                try:
-                    with open(file_path, "r", encoding="utf-8", errors="ignore") as fp:
-                        content = fp.read(preview_bytes)
-                        snippet = content.strip().replace("\n", " ")[:200]
-                        output.append(f"{indent}    Preview: {snippet}")
-                except Exception as e:
-                    output.append(f"{indent}    Error reading file: {e}")
+        root = os.path.abspath(path)
+        if not os.path.isdir(root):
+            return f"Error walking project directory: not a directory: {path}"
+        entries = list(walk(root, max_depth=max_depth))
     except Exception as e:
         return f"Error walking project directory: {e}"
 
-    return "\n".join(output)
+    snapshot = {e["path"]: (e.get("size"), e.get("mtime_ns")) for e in entries}
+    key = (root, max_depth)
+    previous = _SNAPSHOTS.pop(key, None)
+    _SNAPSHOTS[key] = snapshot
+    while len(_SNAPSHOTS) > MAX_SNAPSHOTS:
+        _SNAPSHOTS.popitem(last=False)
+
+    if previous is not None and not full:
+        return _render_diff(previous, snapshot, max_files)
+    return _render_snapshot(root, entries, preview_bytes, max_files, max_output_chars)
@@ -1,41 +1,106 @@
-import subprocess
-import tempfile
+import asyncio
 import os
 
+from agent_loop.worker_pool import WorkerError, WorkerPool, WorkerTimeout
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python_worker.py"
+)
+DEFAULT_TIMEOUT = 30
+MAX_TIMEOUT = 300
+MAX_OUTPUT_CHARS = 20000
+
 tool_definition = {
     "name": "python",
-    "description": "Evaluate Python code in a sandboxed subprocess",
+    "description": (
+        "Evaluate Python code in a persistent sandboxed kernel. Variables, imports and functions defined in "
+        "a session survive between calls, so compute intermediate data once and reuse it. The value of a "
+        "final expression is returned like in a REPL. Calls have CPU/memory limits and a timeout; a kernel "
+        "that crashes or times out is restarted and its sessions are lost."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
-            "code": {"type": "string", "description": "Python code to evaluate"}
+            "code": {"type": "string", "description": "Python code to evaluate"},
+            "session": {
+                "type": "string",
+                "description": "Namespace to run in; calls with the same session share state (default: 'default')",
+                "default": "default",
+            },
+            "reset": {
+                "type": "boolean",
+                "description": "Clear the session's namespace before running the code",
+                "default": False,
+            },
+            "timeout": {
+                "type": "integer",
+                "description": f"Wall-clock and CPU limit in seconds (default: {DEFAULT_TIMEOUT}, max: {MAX_TIMEOUT})",
+                "default": DEFAULT_TIMEOUT,
+            },
         },
         "required": ["code"],
     },
 }
 
+_pool = None
 
-def handle_call(input_data):
-    code = input_data["code"]
 
-    try:
-        with tempfile.NamedTemporaryFile("w", delete=False, suffix=".py") as temp_file:
-            temp_file.write(code)
-            temp_path = temp_file.name
+def _get_pool():
+    global _pool
+    if _pool is None:
+        env = dict(os.environ)
+        env.setdefault("AGENT_LOOP_PYTHON_MEMORY_MB", "2048")
+        size = int(os.getenv("AGENT_LOOP_PYTHON_WORKERS", "2"))
+        _pool = WorkerPool(["python3", WORKER_SCRIPT], size=size, env=env)
+    return _pool
 
-        # Run the code in a subprocess
-        result = subprocess.run(
-            ["python3", temp_path], capture_output=True, text=True, timeout=5
+
+def _run(pool, input_data):
+    session = input_data.get("session") or "default"
+    timeout = max(1, min(int(input_data.get("timeout", DEFAULT_TIMEOUT)), MAX_TIMEOUT))
+    notes = []
+    if pool.was_lost(session):
+        notes.append(
+            f"⚠️ Session '{session}' was lost when its kernel restarted; its variables are gone."
         )
+    if input_data.get("reset"):
+        pool.call({"op": "reset", "session": session}, timeout=10, key=session)
+    response = pool.call(
+        {
+            "op": "exec",
+            "session": session,
+            "code": input_data["code"],
+            "cpu_seconds": timeout,
+            "max_output": MAX_OUTPUT_CHARS,
+        },
+        # Leave the worker's CPU limit a chance to fire before the wall clock does
+        timeout=timeout + 2,
+        key=session,
+    )
+    output = f"STDOUT:\n{response.get('stdout', '')}\nSTDERR:\n{response.get('stderr', '')}\n"
+    if response.get("result") is not None:
+        output += f"RESULT:\n{response['result']}\n"
+    output += f"EXIT CODE: {response.get('exit_code', 0)}"
+    return "\n".join(notes + [output])
 
-        os.remove(temp_path)
 
+async def handle_call(input_data):
+    pool = _get_pool()
+    session = input_data.get("session") or "default"
+    try:
+        return await asyncio.to_thread(_run, pool, input_data)
+    except asyncio.CancelledError:
+        # Interrupted by the user: stop the running code so the kernel is free again
+        pool.interrupt(session)
+        raise
+    except WorkerTimeout:
+        pool.was_lost(session)
         return (
-            f"STDOUT:\n{result.stdout}\n"
-            f"STDERR:\n{result.stderr}\n"
-            f"EXIT CODE: {result.returncode}"
+            "Python code execution timed out. The kernel was restarted and the "
+            f"session '{session}' state was lost."
         )
-    except subprocess.TimeoutExpired:
-        return "Python code execution timed out."
+    except WorkerError as e:
+        pool.was_lost(session)
+        return f"Python kernel crashed ({e}). It was restarted and the session '{session}' state was lost."
     except Exception as e:
         return f"Error executing sandboxed Python: {e}"
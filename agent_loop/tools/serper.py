@@ -1,36 +1,150 @@
-import os
-import http.client
+import asyncio
+import hashlib
 import json
+import os
+import re
+
+import requests
+
+from agent_loop.cache import DiskCache
+from agent_loop.http_client import get_session
+from agent_loop.projection import compact_json
+
+# Override to point the tool at a stand-in endpoint
+SERPER_URL = os.environ.get("SERPER_URL", "https://google.serper.dev")
+CACHE_TTL = 24 * 3600
+TIMEOUT = 15
+MAX_QUERIES = 10
+
+_cache = None
 
 # Tool definition for Serper
 
 tool_definition = {
     "name": "serper",
-    "description": "Search using the Serper API (Google Search)",
+    "description": (
+        "Search using the Serper API (Google Search). Returns compact results (title, link, snippet). "
+        "Pass several queries in 'queries' to run them concurrently in one call. Results are cached for a day."
+    ),
     "input_schema": {
         "type": "object",
         "properties": {
             "q": {"type": "string", "description": "Search query"},
+            "queries": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": f"Several search queries to run concurrently (max {MAX_QUERIES})",
+            },
+            "type": {
+                "type": "string",
+                "enum": ["search", "news"],
+                "description": "Web or news search (default: search)",
+                "default": "search",
+            },
+            "num": {
+                "type": "integer",
+                "description": "Results per query (default: 10)",
+                "default": 10,
+            },
+            "gl": {"type": "string", "description": "Country code, e.g. 'us'"},
+            "hl": {"type": "string", "description": "Language code, e.g. 'en'"},
+            "raw": {
+                "type": "boolean",
+                "description": "Return the full Serper response instead of the compact projection",
+                "default": False,
+            },
+            "fresh": {
+                "type": "boolean",
+                "description": "Bypass the result cache (default: false)",
+                "default": False,
+            },
         },
-        "required": ["q"],
     },
 }
 
 
-def handle_call(input_data):
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache("serper")
+    return _cache
+
+
+def _normalize(query):
+    return re.sub(r"\s+", " ", query.strip())
+
+
+def _search(api_key, search_type, payload, fresh):
+    # Queries differing only in spacing share a cache entry (case is kept, as
+    # operators such as OR depend on it); the API gets the query as written
+    identity = {**payload, "q": _normalize(payload["q"])}
+    key = hashlib.sha1(
+        json.dumps([search_type, identity], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    data = None if fresh else _get_cache().get(key)
+    if data is not None:
+        return data, True
+    response = get_session().post(
+        f"{SERPER_URL.rstrip('/')}/{search_type}",
+        json=payload,
+        headers={"X-API-KEY": api_key, "Content-Type": "application/json"},
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    data = response.json()
+    _get_cache().set(key, data, ttl=CACHE_TTL)
+    return data, False
+
+
+def _compact(data):
+    results = [
+        {
+            k: item[k]
+            for k in ("title", "link", "snippet", "date", "source")
+            if item.get(k)
+        }
+        for item in data.get("organic") or data.get("news") or []
+    ]
+    compact = {"results": results}
+    answer_box = data.get("answerBox") or {}
+    answer = answer_box.get("answer") or answer_box.get("snippet")
+    if answer:
+        compact["answer"] = answer
+    return compact
+
+
+async def _run_query(api_key, query, input_data):
+    search_type = input_data.get("type", "search")
+    payload = {"q": query, "num": input_data.get("num", 10)}
+    for param in ("gl", "hl"):
+        if input_data.get(param):
+            payload[param] = input_data[param].lower()
+    try:
+        data, cached = await asyncio.to_thread(
+            _search, api_key, search_type, payload, input_data.get("fresh", False)
+        )
+    except requests.exceptions.RequestException as e:
+        return {"query": query, "error": f"{e}"}
+    result = data if input_data.get("raw") else _compact(data)
+    return {"query": query, "cached": cached, **result}
+
+
+async def handle_call(input_data):
     api_key = os.environ.get("SERPER_API_KEY")
     if not api_key:
         return "Error: SERPER_API_KEY environment variable not set."
-    query = input_data["q"]
-    conn = http.client.HTTPSConnection("google.serper.dev")
-    payload = json.dumps({"q": query})
-    headers = {"X-API-KEY": api_key, "Content-Type": "application/json"}
+    queries = list(input_data.get("queries") or [])
+    if input_data.get("q"):
+        queries.insert(0, input_data["q"])
+    if not queries:
+        return "Error: provide 'q' or 'queries'."
+    if len(queries) > MAX_QUERIES:
+        return f"Error: at most {MAX_QUERIES} queries per call."
+
     try:
-        conn.request("POST", "/search", payload, headers)
-        res = conn.getresponse()
-        data = res.read()
-        return data.decode("utf-8")
+        results = await asyncio.gather(
+            *(_run_query(api_key, query, input_data) for query in queries)
+        )
+        return compact_json(results[0] if len(results) == 1 else results)
     except Exception as e:
         return f"Error executing Serper search: {e}"
-    finally:
-        conn.close()
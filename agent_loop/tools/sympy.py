@@ -1,5 +1,18 @@
-import sympy as sp
-from sympy import symbols, solve, factor, expand, simplify, limit, diff, integrate
+import asyncio
+import os
+import signal
+import sys
+
+from agent_loop.worker_pool import WorkerError, WorkerPool, WorkerTimeout
+
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sympy_worker.py"
+)
+DEFAULT_TIMEOUT = 20
+MAX_TIMEOUT = 120
+# Extra wall-clock time before a worker that ignores its alarm is killed
+KILL_GRACE = 3
+MAX_RESULT_CHARS = 10000
 
 tool_definition = {
     "name": "sympy",
@@ -7,11 +20,15 @@ tool_definition = {
         "### Instructions:\n"
         "Use this tool to perform symbolic mathematical operations using the SymPy library. "
         "This includes algebraic simplification, equation solving, limits, derivatives, integrals, and more. "
-        "It's suitable for performing exact, symbolic computation (not numerical approximation).\n\n"
+        "It's suitable for performing exact, symbolic computation; use `evaluate` when you need numbers.\n\n"
         "Always specify the `operation` and a valid `expression`. "
         "Use `variables` to indicate which variables to differentiate, integrate, or solve for.\n"
         "Use `assumptions` if needed to guide symbolic behavior (e.g., assume variable is `positive`, `real`, or `integer`).\n"
-        "Use `point` only when computing limits.\n\n"
+        "Use `point` only when computing limits (exact values such as `1/3` or `pi` are allowed).\n"
+        "Use `grid` with `evaluate` to compute the expression over many points in one vectorized call "
+        "instead of looping in the python tool.\n"
+        "Each call runs in a separate worker process under a time limit (`timeout`), and results are "
+        "memoised, so repeating a step is instant.\n\n"
         "### Supported Operations:\n"
         "- `solve`: Solve algebraic equations.\n"
         "- `factor`: Factor an expression.\n"
@@ -21,12 +38,16 @@ tool_definition = {
         "- `differentiate`: Compute the derivative with respect to a variable.\n"
         "- `integrate`: Compute the indefinite integral.\n"
         "- `series`: Compute a Taylor series expansion at 0 up to the 4th order.\n"
-        "- `matrix`: Compute determinant, inverse, and eigenvalues of a symbolic matrix (input must be a 2D list).\n\n"
+        "- `matrix`: Compute determinant, inverse, and eigenvalues of a symbolic matrix (input must be a 2D list).\n"
+        "- `evaluate`: Evaluate numerically over `grid` (lists, ranges or a meshgrid of several variables), "
+        "returning min/max/mean/std or, with `output: series`, a downsampled table of values.\n\n"
         "### Example Expression Formats:\n"
         "- `x**2 + 2*x + 1`\n"
         "- `sin(x)/x`\n"
         "- `diff(x**2, x)` (if using operation `differentiate`)\n"
         "- `[[1, 2], [3, 4]]` (if using operation `matrix`)\n"
+        '- `exp(-a*t)*sin(t)` with grid `{"t": {"start": 0, "stop": 10, "num": 1001}, "a": [0.1, 0.5, 1]}` '
+        "(if using operation `evaluate`)\n"
     ),
     "input_schema": {
         "type": "object",
@@ -44,6 +65,7 @@ tool_definition = {
                     "integrate",
                     "series",
                     "matrix",
+                    "evaluate",
                 ],
             },
             "expression": {
@@ -65,107 +87,98 @@ tool_definition = {
                 "description": "Point to evaluate limit at (e.g., '0', 'oo', '-oo'). Only used with the 'limit' operation.",
                 "default": "",
             },
+            "grid": {
+                "type": "object",
+                "description": (
+                    "For 'evaluate': values per variable, each a list of numbers, {start, stop, num} "
+                    "(inclusive, evenly spaced) or {start, stop, step}."
+                ),
+            },
+            "mesh": {
+                "type": "boolean",
+                "description": "For 'evaluate': combine the grid axes as a meshgrid (default) or zip them pointwise",
+                "default": True,
+            },
+            "output": {
+                "type": "string",
+                "enum": ["summary", "series"],
+                "description": "For 'evaluate': statistics only (default) or also a downsampled series of values",
+                "default": "summary",
+            },
+            "max_points": {
+                "type": "integer",
+                "description": "For 'evaluate' with output 'series': maximum rows returned (default: 50)",
+                "default": 50,
+            },
+            "timeout": {
+                "type": "integer",
+                "description": f"Time limit in seconds (default: {DEFAULT_TIMEOUT}, max: {MAX_TIMEOUT})",
+                "default": DEFAULT_TIMEOUT,
+            },
         },
         "required": ["operation", "expression"],
     },
 }
 
 
-def handle_call(input_data):
-    operation = input_data["operation"]
-    expr_str = input_data["expression"]
-    var_str = input_data.get("variables", "x")
-    assumptions_str = input_data.get("assumptions", "")
-    point_str = input_data.get("point", "")
-
-    try:
-        # Parse variables
-        var_list = [s.strip() for s in var_str.split(",")]
-        var_symbols = {}
-
-        # Apply assumptions if provided
-        assumptions = {}
-        if assumptions_str:
-            assumption_list = [a.strip() for a in assumptions_str.split(",")]
-            for a in assumption_list:
-                if a == "positive":
-                    assumptions["positive"] = True
-                elif a == "real":
-                    assumptions["real"] = True
-                elif a == "integer":
-                    assumptions["integer"] = True
-
-        # Create symbols with assumptions
-        for v in var_list:
-            var_symbols[v] = symbols(v, **assumptions)
-
-        # Get main variable for operations like diff and integrate
-        main_var = var_symbols.get(var_list[0], symbols("x"))
-
-        # Parse expression with variables
-        expr = sp.sympify(expr_str, locals=var_symbols)
-
-        # Perform the requested operation
-        if operation == "solve":
-            result = solve(expr, main_var)
-            return f"Solutions: {result}"
-
-        elif operation == "factor":
-            result = factor(expr)
-            return f"Factorized: {result}"
-
-        elif operation == "expand":
-            result = expand(expr)
-            return f"Expanded: {result}"
-
-        elif operation == "simplify":
-            result = simplify(expr)
-            return f"Simplified: {result}"
-
-        elif operation == "limit":
-            # Parse point value
-            if point_str == "oo" or point_str == "infinity":
-                point = sp.oo
-            elif point_str == "-oo" or point_str == "-infinity":
-                point = -sp.oo
-            else:
-                point = float(point_str) if point_str else 0
-
-            result = limit(expr, main_var, point)
-            return f"Limit as {main_var} → {point}: {result}"
-
-        elif operation == "differentiate":
-            result = diff(expr, main_var)
-            return f"Derivative with respect to {main_var}: {result}"
-
-        elif operation == "integrate":
-            result = integrate(expr, main_var)
-            return f"Indefinite integral with respect to {main_var}: {result}"
-
-        elif operation == "series":
-            result = expr.series(main_var, n=5)
-            return f"Series expansion around {main_var}=0: {result}"
-
-        elif operation == "matrix":
-            # Special case for matrix operations
-            # For matrices, the expression should be in the form "[[a,b],[c,d]]"
-            try:
-                matrix = sp.Matrix(eval(expr_str))
-                det = matrix.det()
-                inv = matrix.inv() if det != 0 else "Singular matrix (no inverse)"
-                eigenvals = matrix.eigenvals()
-
-                return (
-                    f"Matrix:\n{matrix}\n"
-                    f"Determinant: {det}\n"
-                    f"Inverse:\n{inv}\n"
-                    f"Eigenvalues: {eigenvals}"
-                )
-            except:
-                return "Invalid matrix format. Use [[a,b],[c,d]] syntax."
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        env = dict(os.environ)
+        env.setdefault("AGENT_LOOP_SYMPY_MEMORY_MB", "2048")
+        size = int(os.getenv("AGENT_LOOP_SYMPY_WORKERS", "2"))
+        # sympy is a dependency of agent-loop itself, so use this interpreter
+        _pool = WorkerPool([sys.executable, WORKER_SCRIPT], size=size, env=env)
+        _pool.warm()
+    return _pool
+
+
+def _run(pool, input_data, timeout):
+    return pool.call(
+        {
+            "op": "run",
+            "operation": input_data["operation"],
+            "expression": input_data["expression"],
+            "variables": input_data.get("variables", "x"),
+            "assumptions": input_data.get("assumptions", ""),
+            "point": input_data.get("point", ""),
+            "grid": input_data.get("grid"),
+            "mesh": input_data.get("mesh", True),
+            "output": input_data.get("output", "summary"),
+            "max_points": input_data.get("max_points", 50),
+            "timeout": timeout,
+            "max_chars": MAX_RESULT_CHARS,
+        },
+        timeout=timeout + KILL_GRACE,
+    )
 
-        else:
-            return f"Unsupported operation: {operation}"
 
+async def handle_call(input_data):
+    pool = _get_pool()
+    timeout = max(1, min(int(input_data.get("timeout", DEFAULT_TIMEOUT)), MAX_TIMEOUT))
+    task = asyncio.ensure_future(asyncio.to_thread(_run, pool, input_data, timeout))
+    try:
+        response = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # Ask the worker to abandon the computation; kill it if it does not
+        pool.signal_busy(signal.SIGINT)
+        try:
+            await asyncio.wait_for(asyncio.shield(task), KILL_GRACE)
+        except Exception:
+            pool.interrupt()
+        raise
+    except WorkerTimeout:
+        return f"Error performing symbolic math operation: no result after {timeout}s; the worker was restarted."
+    except WorkerError as e:
+        return f"Error performing symbolic math operation: worker crashed ({e}); it was restarted."
     except Exception as e:
         return f"Error performing symbolic math operation: {e}"
+
+    if not response.get("ok"):
+        if response.get("interrupted"):
+            return f"Error performing symbolic math operation: {response['error']} ({timeout}s)."
+        return f"Error performing symbolic math operation: {response.get('error')}"
+    return response["result"]
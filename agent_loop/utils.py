@@ -21,3 +21,16 @@ def load_system_prompt() -> str:
         raise FileNotFoundError(
             "SYSTEM_PROMPT.txt not found in package or config directory."
         )
+
+
+def get_cache_dir(*parts: str) -> str:
+    """
+    Return (and create) a directory under the agent-loop cache root.
+    The root defaults to ~/.cache/agent-loop and can be moved with AGENT_LOOP_CACHE_DIR.
+    """
+    root = os.getenv("AGENT_LOOP_CACHE_DIR") or os.path.expanduser(
+        "~/.cache/agent-loop"
+    )
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,236 @@
+"""
+Pool of long-lived worker processes speaking newline-delimited JSON.
+
+Each worker is started in its own process group and answers one request at a
+time on a private pipe: the pool writes a JSON line to its stdin and reads one
+JSON line back. A worker that exceeds the wall-clock timeout, or dies, is killed
+together with its process group and replaced by a fresh one that warms up in
+the background. Requests may carry an affinity key (e.g. a session name) so all
+calls for that key land on the same worker and can share its in-memory state.
+"""
+
+import atexit
+import json
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+STARTUP_TIMEOUT = 60
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024
+
+
+class WorkerError(RuntimeError):
+    """The worker died or answered with something other than a JSON line."""
+
+
+class WorkerTimeout(TimeoutError):
+    """The worker did not answer in time and was recycled."""
+
+
+class _Worker:
+    def __init__(self, command: Sequence[str], env: Optional[Dict[str, str]]):
+        self.process = subprocess.Popen(
+            list(command),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            start_new_session=True,
+            bufsize=0,
+        )
+        self.lock = threading.Lock()
+        self.ready = False
+        self._buffer = b""
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_line(self, deadline: float) -> bytes:
+        stdout = self.process.stdout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout("worker did not answer in time")
+            try:
+                readable, _, _ = select.select([stdout], [], [], remaining)
+                if not readable:
+                    continue
+                chunk = os.read(stdout.fileno(), 65536)
+            except (OSError, ValueError):
+                # The pipe was closed under us by recycle()
+                raise WorkerError("worker was stopped")
+            if not chunk:
+                raise WorkerError(
+                    f"worker exited unexpectedly (code {self.process.wait()})"
+                )
+            self._buffer += chunk
+            if len(self._buffer) > MAX_RESPONSE_BYTES:
+                raise WorkerError("worker response too large")
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+
+    def _receive(self, deadline: float) -> Dict:
+        line = self._read_line(deadline)
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"malformed worker response: {line[:200]!r}")
+
+    def request(self, payload: Dict, timeout: float) -> Dict:
+        if not self.ready:
+            self._receive(time.monotonic() + STARTUP_TIMEOUT)
+            self.ready = True
+        try:
+            self.process.stdin.write(json.dumps(payload).encode("utf-8") + b"\n")
+        except (BrokenPipeError, OSError):
+            raise WorkerError(
+                f"worker exited unexpectedly (code {self.process.wait()})"
+            )
+        return self._receive(time.monotonic() + timeout)
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of workers started from `command`. Workers are spawned on
+    first use and respawned immediately after being recycled, so a replacement
+    is usually warm by the time it is needed.
+    """
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        size: int = 2,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.command = list(command)
+        self.size = max(1, size)
+        self.env = env
+        self._workers: List[Optional[_Worker]] = [None] * self.size
+        self._affinity: Dict[str, int] = {}
+        self._lost: set = set()
+        self._next = 0
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _slot_for(self, key: Optional[str]) -> int:
+        with self._lock:
+            if key is not None and key in self._affinity:
+                return self._affinity[key]
+            if key is None:
+                # Prefer a worker that is not busy
+                for slot, worker in enumerate(self._workers):
+                    if worker is None or not worker.lock.locked():
+                        return slot
+                slot = self._next % self.size
+                self._next += 1
+                return slot
+            counts = [0] * self.size
+            for assigned in self._affinity.values():
+                counts[assigned] += 1
+            slot = counts.index(min(counts))
+            self._affinity[key] = slot
+            return slot
+
+    def _worker(self, slot: int) -> _Worker:
+        with self._lock:
+            worker = self._workers[slot]
+            if worker is None or not worker.alive():
+                if worker is not None:
+                    self._forget_slot(slot)
+                worker = self._workers[slot] = _Worker(self.command, self.env)
+            return worker
+
+    def _forget_slot(self, slot: int) -> None:
+        for key, assigned in list(self._affinity.items()):
+            if assigned == slot:
+                del self._affinity[key]
+                self._lost.add(key)
+
+    def warm(self) -> None:
+        """Start every worker now so later calls do not pay for the start-up."""
+        for slot in range(self.size):
+            self._worker(slot)
+
+    def recycle(self, slot: int) -> None:
+        """Kill the worker in `slot` and start a replacement."""
+        with self._lock:
+            worker = self._workers[slot]
+            self._forget_slot(slot)
+            self._workers[slot] = _Worker(self.command, self.env)
+        if worker is not None:
+            worker.kill()
+
+    def call(self, payload: Dict, timeout: float, key: Optional[str] = None) -> Dict:
+        """
+        Send one request and return the decoded response. Raises WorkerTimeout or
+        WorkerError after recycling the worker; state held for its keys is lost.
+        """
+        slot = self._slot_for(key)
+        worker = self._worker(slot)
+        with worker.lock:
+            try:
+                return worker.request(payload, timeout)
+            except (WorkerTimeout, WorkerError):
+                if self._workers[slot] is worker:
+                    self.recycle(slot)
+                raise
+
+    def interrupt(self, key: Optional[str] = None) -> None:
+        """Recycle the worker serving `key` (or every busy worker when key is None)."""
+        with self._lock:
+            if key is not None:
+                slots = [self._affinity[key]] if key in self._affinity else []
+            else:
+                slots = [
+                    slot
+                    for slot, worker in enumerate(self._workers)
+                    if worker is not None and worker.lock.locked()
+                ]
+        for slot in slots:
+            self.recycle(slot)
+
+    def signal_busy(self, sig: int) -> None:
+        """Send `sig` to every busy worker, letting it abandon the request itself."""
+        with self._lock:
+            busy = [
+                worker
+                for worker in self._workers
+                if worker is not None and worker.lock.locked()
+            ]
+        for worker in busy:
+            try:
+                os.kill(worker.process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def was_lost(self, key: str) -> bool:
+        """True once if the state for `key` was lost to a recycled worker."""
+        with self._lock:
+            if key in self._lost:
+                self._lost.discard(key)
+                return True
+            return False
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, [None] * self.size
+            self._affinity.clear()
+        for worker in workers:
+            if worker is not None:
+                worker.kill()
@@ -0,0 +1,29 @@
+import unittest
+
+from agent_loop.patching import PatchError, apply_unified_diff
+
+
+class UnifiedDiffHunkCountsTest(unittest.TestCase):
+    def test_applies_hunk_matching_its_counts(self):
+        diff = "@@ -1,2 +1,2 @@\n-a\n+A\n b\n"
+        self.assertEqual(
+            apply_unified_diff("a\nb\nc\n", diff), ("A\nb\nc\n", [(1, 1, 1)])
+        )
+
+    def test_rejects_lines_past_the_header_counts(self):
+        diff = "@@ -1,1 +1,1 @@\n-a\n+A\n-b\n+B\n"
+        with self.assertRaises(PatchError):
+            apply_unified_diff("a\nb\nc\n", diff)
+
+    def test_rejects_hunk_shorter_than_its_header_counts(self):
+        diff = "@@ -1,3 +1,3 @@\n-a\n+A\n b\n"
+        with self.assertRaises(PatchError):
+            apply_unified_diff("a\nb\nc\n", diff)
+
+    def test_allows_no_newline_marker_after_the_last_line(self):
+        diff = "--- a/f\n+++ b/f\n@@ -1 +1 @@\n-a\n\\ No newline at end of file\n+A\n"
+        self.assertEqual(apply_unified_diff("a", diff)[0], "A")
+
+
+if __name__ == "__main__":
+    unittest.main()